@@ -16,17 +16,16 @@
 # SPDX-License-Identifier: Apache-2.0
 
 # flake8: noqa: F403,F405
+import pathlib
+
 from isaac_ros_launch_utils.all_types import *
 import isaac_ros_launch_utils as lu
 import isaac_ros_perceptor_python_utils.constants as pc
+from isaac_ros_perceptor_python_utils.perceptor_configuration import STEREO_CAMERAS, parse_modules
 
 
 def create_imager_pipeline(stereo_camera_name: str, identifier: str,
                            args: lu.ArgumentContainer) -> list[Action]:
-    stereo_camera_config = getattr(args, stereo_camera_name)
-
-    actions: list[Action] = []
-
     rectify_composable_node = ComposableNode(
         name='rectify_node',
         package='isaac_ros_image_proc',
@@ -37,44 +36,33 @@ def create_imager_pipeline(stereo_camera_name: str, identifier: str,
             'output_height': pc.HAWK_IMAGE_HEIGHT,
         }],
     )
-    rectify_condition = IfCondition(lu.has_substring(stereo_camera_config, 'rectify'))
-    actions.append(
-        lu.load_composable_nodes(
-            args.container_name,
-            [rectify_composable_node],
-            condition=rectify_condition,
-        ))
-
-    return actions
+    return [lu.load_composable_nodes(args.container_name, [rectify_composable_node])]
 
 
 def create_hawk_pipeline(stereo_camera_name: str, args: lu.ArgumentContainer) -> list[Action]:
     actions = []
 
     # Load the configuration for the stereo camera
-    stereo_camera_config = getattr(args, stereo_camera_name)
-    run_ess_light = lu.has_substring(stereo_camera_config, 'ess_light')
-    run_ess_full = lu.has_substring(stereo_camera_config, 'ess_full')
-    run_ess = OrSubstitution(run_ess_light, run_ess_full)
-
-    actions.append(
-        lu.assert_condition(
-            'Camera config invalid. Can not run ess_light and ess_full at the same time.',
-            IfCondition(AndSubstitution(run_ess_light, run_ess_full))),
-    )
-    engine_file_path = lu.if_else_substitution(run_ess_light, args.ess_light_engine_file_path,
-                                               args.ess_full_engine_file_path)
-    actions.append(lu.assert_path_exists(
-        engine_file_path,
-        condition=IfCondition(run_ess),
-    ))
-    ess_skip_frames = lu.has_substring(stereo_camera_config, 'ess_skip_frames')
-    throttler_skip = lu.if_else_substitution(ess_skip_frames, args.ess_number_of_frames_to_skip,
-                                             '0')
+    modules = parse_modules(getattr(args, stereo_camera_name))
+    run_ess_light = 'ess_light' in modules
+    run_ess_full = 'ess_full' in modules
+    if run_ess_light and run_ess_full:
+        raise ValueError(f"Camera config '{stereo_camera_name}' invalid. Can not run ess_light "
+                         'and ess_full at the same time.')
 
     # Run the left/right imager pipelines (rectify)
-    actions.extend(create_imager_pipeline(stereo_camera_name, 'left', args))
-    actions.extend(create_imager_pipeline(stereo_camera_name, 'right', args))
+    if 'rectify' in modules:
+        actions.extend(create_imager_pipeline(stereo_camera_name, 'left', args))
+        actions.extend(create_imager_pipeline(stereo_camera_name, 'right', args))
+
+    if not (run_ess_light or run_ess_full):
+        return actions
+
+    engine_file_path = args.ess_light_engine_file_path if run_ess_light \
+        else args.ess_full_engine_file_path
+    if not pathlib.Path(engine_file_path).exists():
+        raise FileNotFoundError(f'ESS engine file {engine_file_path} does not exist.')
+    throttler_skip = args.ess_number_of_frames_to_skip if 'ess_skip_frames' in modules else '0'
 
     # Run the depth estimation
     ess_composable_node = ComposableNode(
@@ -85,7 +73,7 @@ def create_hawk_pipeline(stereo_camera_name: str, args: lu.ArgumentContainer) ->
         parameters=[{
             'engine_file_path': engine_file_path,
             'threshold': 0.4,
-            'throttler_skip': throttler_skip,
+            'throttler_skip': int(throttler_skip),
         }],
         remappings=[
             ('left/camera_info', 'left/camera_info_rect'),
@@ -100,20 +88,28 @@ def create_hawk_pipeline(stereo_camera_name: str, args: lu.ArgumentContainer) ->
         plugin='nvidia::isaac_ros::stereo_image_proc::DisparityToDepthNode',
         namespace=stereo_camera_name,
     )
-    depth_action = lu.load_composable_nodes(
-        args.container_name, [ess_composable_node, disparity_composable_node],
-        condition=IfCondition(run_ess))
-    actions.append(depth_action)
+    actions.append(
+        lu.load_composable_nodes(args.container_name,
+                                 [ess_composable_node, disparity_composable_node]))
 
     return actions
 
 
+def add_hawks(args: lu.ArgumentContainer) -> list[Action]:
+    # Create pipelines for each camera according to the camera config
+    actions = []
+    for stereo_camera_name in STEREO_CAMERAS:
+        actions.extend(create_hawk_pipeline(stereo_camera_name, args))
+    return actions
+
+
 def generate_launch_description() -> LaunchDescription:
     args = lu.ArgumentContainer()
 
     # Config strings for all stereo cameras.
     # The config string must be a subset of:
-    # - driver,rectify,resize,ess_full,ess_light,ess_skip_frames,cuvslam,nvblox
+    # - driver,rectify,resize,reformat,ess_full,ess_light,ess_skip_frames,vgl,cuvslam,nvblox,
+    #   nvblox_people
     args.add_arg('front_stereo_camera')
     args.add_arg('back_stereo_camera')
     args.add_arg('left_stereo_camera')
@@ -131,11 +127,5 @@ def generate_launch_description() -> LaunchDescription:
                  '/isaac_ros_assets/models/dnn_stereo_disparity/dnn_stereo_disparity_v4.1.0_onnx/'
                  'light_ess.engine')
 
-    # Create pipelines for each camera according to the camera config
-    actions = args.get_launch_actions()
-    actions.extend(create_hawk_pipeline('front_stereo_camera', args))
-    actions.extend(create_hawk_pipeline('back_stereo_camera', args))
-    actions.extend(create_hawk_pipeline('left_stereo_camera', args))
-    actions.extend(create_hawk_pipeline('right_stereo_camera', args))
-
-    return LaunchDescription(actions)
+    args.add_opaque_function(add_hawks)
+    return LaunchDescription(args.get_launch_actions())
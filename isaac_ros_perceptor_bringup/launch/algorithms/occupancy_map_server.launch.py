@@ -17,8 +17,9 @@
 
 from isaac_ros_launch_utils.all_types import *
 import isaac_ros_launch_utils as lu
+from launch.condition import Condition
 
-def create_map_server(map_yaml_file:str, map_frame:str) -> Node:
+def create_map_server(map_yaml_file:str, map_frame:str, condition: Condition) -> Node:
     return Node(
         package='nav2_map_server',
         executable='map_server',
@@ -29,12 +30,32 @@ def create_map_server(map_yaml_file:str, map_frame:str) -> Node:
             'frame_id': map_frame,
             'output': 'screen',
         }],
+        condition=condition,
     )
 
 
-def create_lifecycle_manager() -> TimerAction:
+def create_tiled_map_server(map_yaml_file: str, tiles_folder: str, map_frame: str,
+                            region_size_m: str, condition: Condition) -> Node:
+    # Serves the region around the robot from the tiles created by create_map.py.
+    return Node(
+        package='isaac_ros_perceptor_bringup',
+        executable='tiled_map_server.py',
+        name='tiled_map_server',
+        output='screen',
+        arguments=[
+            '--map_yaml_file', map_yaml_file,
+            '--tiles_folder', tiles_folder,
+            '--map_frame', map_frame,
+            '--region_size_m', region_size_m,
+        ],
+        condition=condition,
+    )
+
+
+def create_lifecycle_manager(condition: Condition) -> TimerAction:
     return TimerAction(
         period=5.0,
+        condition=condition,
         actions=[
             Node(
                 package='nav2_lifecycle_manager',
@@ -52,10 +73,18 @@ def generate_launch_description() -> LaunchDescription:
     args = lu.ArgumentContainer()
     args.add_arg('omap_frame', default='map')
     args.add_arg('occupancy_map_yaml_file')
+    args.add_arg('use_tiled_map_server', False)
+    args.add_arg('occupancy_map_tiles_folder', '')
+    args.add_arg('tiled_map_region_size_m', 100.0)
 
     actions = args.get_launch_actions()
     actions.append(lu.log_info(["Loading occupancy map file from '", args.occupancy_map_yaml_file, "'"]))
-    actions.append(create_map_server(args.occupancy_map_yaml_file, args.omap_frame))
-    actions.append(create_lifecycle_manager())
+    actions.append(create_map_server(args.occupancy_map_yaml_file, args.omap_frame,
+                                     UnlessCondition(args.use_tiled_map_server)))
+    actions.append(create_lifecycle_manager(UnlessCondition(args.use_tiled_map_server)))
+    actions.append(
+        create_tiled_map_server(args.occupancy_map_yaml_file, args.occupancy_map_tiles_folder,
+                                args.omap_frame, args.tiled_map_region_size_m,
+                                IfCondition(args.use_tiled_map_server)))
 
     return LaunchDescription(actions)
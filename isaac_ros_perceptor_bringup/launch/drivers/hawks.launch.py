@@ -16,6 +16,7 @@
 # SPDX-License-Identifier: Apache-2.0
 from isaac_ros_launch_utils.all_types import *
 import isaac_ros_launch_utils as lu
+from isaac_ros_perceptor_python_utils.nova_system_info import load_nova_system_info
 
 
 def add_hawk(name: str, module_id: int, args: lu.ArgumentContainer) -> ComposableNode:
@@ -57,10 +58,8 @@ def generate_launch_description() -> LaunchDescription:
     args.add_arg('enabled_stereo_cameras')
     actions = args.get_launch_actions()
 
-    system_info = lu.get_nova_system_info()
-    for sensor_name, sensor_config in system_info['sensors'].items():
-        if sensor_config['type'] != 'hawk':
-            continue
+    system_info = load_nova_system_info()
+    for sensor_name, sensor_config in system_info.get_sensors('hawk').items():
         if 'module_id' not in sensor_config:
             # This happens for the front_stereo_imu.
             continue
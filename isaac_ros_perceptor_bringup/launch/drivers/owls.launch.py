@@ -17,6 +17,7 @@
 
 from isaac_ros_launch_utils.all_types import *
 import isaac_ros_launch_utils as lu
+from isaac_ros_perceptor_python_utils.nova_system_info import load_nova_system_info
 
 
 def add_owl(name: str, module_id: int, camera_id: int,
@@ -58,10 +59,8 @@ def generate_launch_description() -> LaunchDescription:
     args.add_arg('enabled_fisheye_cameras')
     actions = args.get_launch_actions()
 
-    system_info = lu.get_nova_system_info()
-    for sensor_name, sensor_config in system_info['sensors'].items():
-        if sensor_config['type'] != 'owl':
-            continue
+    system_info = load_nova_system_info()
+    for sensor_name, sensor_config in system_info.get_sensors('owl').items():
         actions.append(
             add_owl(sensor_name, sensor_config['module_id'], sensor_config['camera_id'], args))
 
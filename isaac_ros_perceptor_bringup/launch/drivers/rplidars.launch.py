@@ -17,6 +17,7 @@
 
 from isaac_ros_launch_utils.all_types import *
 import isaac_ros_launch_utils as lu
+from isaac_ros_perceptor_python_utils.nova_system_info import load_nova_system_info
 
 
 def add_rplidar(name: str, ip: str, enabled_2d_lidars: LaunchConfiguration,
@@ -69,10 +70,8 @@ def generate_launch_description() -> LaunchDescription:
     actions.append(
         lu.log_info(["Enabling 2D lidars: '", args.enabled_2d_lidars, "'"]))
 
-    system_info = lu.get_nova_system_info()
-    for sensor_name, sensor_config in system_info['sensors'].items():
-        if sensor_config['type'] != 'rplidar':
-            continue
+    system_info = load_nova_system_info()
+    for sensor_name, sensor_config in system_info.get_sensors('rplidar').items():
         actions.append(
             add_rplidar(sensor_name, sensor_config['ip'],
                         args.enabled_2d_lidars, args.container_name))
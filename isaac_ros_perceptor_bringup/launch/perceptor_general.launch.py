@@ -17,6 +17,72 @@
 
 import isaac_ros_launch_utils.all_types as lut
 import isaac_ros_launch_utils as lu
+from isaac_ros_perceptor_python_utils.perceptor_configuration import (PerceptorConfiguration,
+                                                                       STEREO_CAMERAS)
+
+
+def add_perceptor(args: lu.ArgumentContainer) -> list[lut.Action]:
+    # Parse the configuration once, modules are matched exactly (e.g. 'nvblox' does not match
+    # 'nvblox_people').
+    configuration = PerceptorConfiguration.parse(args.perceptor_configuration)
+
+    actions = []
+    actions.append(
+        lu.include(
+            'isaac_ros_perceptor_bringup',
+            'launch/algorithms/hawks_processing.launch.py',
+            launch_arguments={
+                camera: configuration.get_camera_config(camera)
+                for camera in STEREO_CAMERAS
+            },
+        ))
+    actions.append(
+        lu.include(
+            'isaac_ros_perceptor_bringup',
+            'launch/algorithms/owls_processing.launch.py',
+        ))
+    if configuration.is_enabled('vgl'):
+        actions.append(
+            lu.include(
+                'isaac_ros_visual_global_localization',
+                'launch/include/visual_global_localization.launch.py',
+                launch_arguments={
+                    'container_name': 'nova_container',
+                    'vgl_enabled_stereo_cameras': ','.join(configuration.get_cameras_with('vgl')),
+                    'vgl_rectified_images': True,
+                },
+            ))
+    if configuration.is_enabled('cuvslam'):
+        actions.append(
+            lu.include(
+                'isaac_ros_perceptor_bringup',
+                'launch/algorithms/vslam.launch.py',
+                launch_arguments={
+                    'vslam_enabled_stereo_cameras': ','.join(
+                        configuration.get_cameras_with('cuvslam')),
+                    'vslam_map_frame': args.vslam_map_frame,
+                    'vslam_odom_frame': args.vslam_odom_frame,
+                    'vslam_image_qos': args.vslam_image_qos,
+                    'invert_odom_to_base_tf': args.invert_odom_to_base_tf,
+                    'is_sim': args.is_sim,
+                },
+            ))
+    if configuration.is_enabled('nvblox'):
+        actions.append(
+            lu.include(
+                'isaac_ros_perceptor_bringup',
+                'launch/algorithms/nvblox.launch.py',
+                launch_arguments={
+                    'enabled_stereo_cameras_for_nvblox': ','.join(
+                        configuration.get_cameras_with('nvblox')),
+                    'enabled_stereo_cameras_for_nvblox_people': ','.join(
+                        configuration.get_cameras_with('nvblox_people')),
+                    'nvblox_global_frame': args.nvblox_global_frame,
+                    'param_filename': args.nvblox_param_filename,
+                    'after_shutdown_map_save_path': args.nvblox_after_shutdown_map_save_path
+                },
+            ))
+    return actions
 
 
 def generate_launch_description() -> lut.LaunchDescription:
@@ -27,7 +93,8 @@ def generate_launch_description() -> lut.LaunchDescription:
     # The value of each camera key contains a config string listing
     # all the modules and options that should be run for this camera.
     # The config string must be a subset of:
-    # - driver,rectify,resize,reformat,ess_full,ess_light,ess_skip_frames,cuvslam,nvblox,vgl
+    # - driver,rectify,resize,reformat,ess_full,ess_light,ess_skip_frames,cuvslam,nvblox,
+    #   nvblox_people,vgl
     # See an example configuration below:
     # {
     #     'front_stereo_camera': 'driver,rectify,resize,reformat,ess_light,ess_skip_frames,cuvslam,
@@ -45,84 +112,12 @@ def generate_launch_description() -> lut.LaunchDescription:
     args.add_arg('nvblox_param_filename', 'params/nvblox_perceptor.yaml', cli=True)
     args.add_arg('nvblox_after_shutdown_map_save_path', '', cli=True)
     args.add_arg('occupancy_map_yaml_file', '')
+    args.add_arg('use_tiled_map_server', False)
     args.add_arg('is_sim', False)
     args.add_arg('enable_3d_lidar', False)
 
-    enable_vslam = lu.dict_values_contain_substring(args.perceptor_configuration, 'cuvslam')
-    enable_nvblox = lu.dict_values_contain_substring(args.perceptor_configuration, 'nvblox')
-    enable_visual_global_localization = lu.dict_values_contain_substring(
-        args.perceptor_configuration, 'vgl')
-
-    vgl_enabled_stereo_cameras = lu.get_keys_with_substring_in_value(
-        args.perceptor_configuration, 'vgl')
-    vslam_enabled_stereo_cameras = lu.get_keys_with_substring_in_value(
-        args.perceptor_configuration, 'cuvslam')
-    enabled_stereo_cameras_for_nvblox = lu.get_keys_with_substring_in_value(
-        args.perceptor_configuration, 'nvblox')
-    enabled_stereo_cameras_for_nvblox_people = lu.get_keys_with_substring_in_value(
-        args.perceptor_configuration, 'nvblox_people')
-
+    args.add_opaque_function(add_perceptor)
     actions = args.get_launch_actions()
-    actions.append(
-        lu.include(
-            'isaac_ros_perceptor_bringup',
-            'launch/algorithms/hawks_processing.launch.py',
-            launch_arguments={
-                'front_stereo_camera': lu.get_dict_value(args.perceptor_configuration,
-                                                         'front_stereo_camera'),
-                'back_stereo_camera': lu.get_dict_value(args.perceptor_configuration,
-                                                        'back_stereo_camera'),
-                'left_stereo_camera': lu.get_dict_value(args.perceptor_configuration,
-                                                        'left_stereo_camera'),
-                'right_stereo_camera': lu.get_dict_value(args.perceptor_configuration,
-                                                         'right_stereo_camera'),
-            },
-        ))
-    actions.append(
-        lu.include(
-            'isaac_ros_perceptor_bringup',
-            'launch/algorithms/owls_processing.launch.py',
-        ))
-    actions.append(
-        lu.include(
-            'isaac_ros_visual_global_localization',
-            'launch/include/visual_global_localization.launch.py',
-            launch_arguments={
-                'container_name': 'nova_container',
-                'vgl_enabled_stereo_cameras': vgl_enabled_stereo_cameras,
-                'vgl_rectified_images': True,
-            },
-            condition=lut.IfCondition(enable_visual_global_localization),
-        ))
-    actions.append(
-        lu.include(
-            'isaac_ros_perceptor_bringup',
-            'launch/algorithms/vslam.launch.py',
-            launch_arguments={
-                'vslam_enabled_stereo_cameras': vslam_enabled_stereo_cameras,
-                'vslam_map_frame': args.vslam_map_frame,
-                'vslam_odom_frame': args.vslam_odom_frame,
-                'vslam_image_qos': args.vslam_image_qos,
-                'invert_odom_to_base_tf': args.invert_odom_to_base_tf,
-                'is_sim': args.is_sim,
-            },
-            condition=lut.IfCondition(enable_vslam),
-        ))
-    actions.append(
-        lu.include(
-            'isaac_ros_perceptor_bringup',
-            'launch/algorithms/nvblox.launch.py',
-            launch_arguments={
-                'enabled_stereo_cameras_for_nvblox': enabled_stereo_cameras_for_nvblox,
-                'enabled_stereo_cameras_for_nvblox_people': (
-                    enabled_stereo_cameras_for_nvblox_people),
-                'nvblox_global_frame': args.nvblox_global_frame,
-                'param_filename': args.nvblox_param_filename,
-                'after_shutdown_map_save_path': args.nvblox_after_shutdown_map_save_path
-            },
-            condition=lut.IfCondition(enable_nvblox),
-        ))
-
     actions.append(
         lu.include(
             'isaac_ros_perceptor_bringup',
@@ -130,6 +125,7 @@ def generate_launch_description() -> lut.LaunchDescription:
             condition=lut.IfCondition(lu.is_valid(args.occupancy_map_yaml_file)),
             launch_arguments={
                 'occupancy_map_yaml_file': args.occupancy_map_yaml_file,
+                'use_tiled_map_server': args.use_tiled_map_server,
             },
         ))
 
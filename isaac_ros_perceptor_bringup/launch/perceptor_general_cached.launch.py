@@ -0,0 +1,84 @@
+# SPDX-FileCopyrightText: NVIDIA CORPORATION & AFFILIATES
+# Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import isaac_ros_launch_utils.all_types as lut
+import isaac_ros_launch_utils as lu
+from isaac_ros_perceptor_python_utils import launch_plan_cache
+from launch import LaunchContext
+from launch.actions import OpaqueFunction
+
+# Takes the same launch arguments as perceptor_general.launch.py, which are passed on to it.
+# If a launch plan was created for the values of the arguments perceptor_general.launch.py (and
+# the files it includes) declares, the composable nodes are loaded directly from the plan instead.
+# Otherwise perceptor_general.launch.py is launched and a plan is created in the background, to be
+# used from the next launch on.
+# Nodes of a plan that do not depend on each other are loaded concurrently, up to
+# max_concurrent_loads at a time.
+
+
+def add_perceptor(context: LaunchContext) -> list[lut.Action]:
+    launch_file = lu.get_path('isaac_ros_perceptor_bringup', 'launch/perceptor_general.launch.py')
+    launch_configurations = dict(context.launch_configurations)
+    # Only affects how the plan is replayed, not the plan itself.
+    max_concurrent_loads = launch_configurations.pop('max_concurrent_loads')
+    plan_file = launch_plan_cache.find_plan_file(launch_file, launch_configurations)
+    plan, reason = launch_plan_cache.load_launch_plan(plan_file, launch_configurations)
+
+    if plan is not None and plan.is_replayable:
+        return [
+            lu.log_info(f'Replaying launch plan {plan_file}.'),
+            lut.Node(
+                package='isaac_ros_perceptor_bringup',
+                executable='replay_launch_plan.py',
+                arguments=[
+                    '--plan_file',
+                    str(plan_file),
+                    '--max_concurrent_loads',
+                    max_concurrent_loads,
+                ],
+                output='screen',
+            ),
+        ]
+
+    actions = []
+    actions.append(lu.include('isaac_ros_perceptor_bringup', 'launch/perceptor_general.launch.py'))
+    if plan is None:
+        actions.append(lu.log_info(f'Not using a launch plan: {reason}'))
+        actions.append(
+            lut.Node(
+                package='isaac_ros_perceptor_bringup',
+                executable='create_launch_plan.py',
+                arguments=[
+                    '--launch_file',
+                    str(launch_file),
+                    '--launch_arguments',
+                    *[f'{name}:={value}' for name, value in launch_configurations.items()],
+                ],
+                output='screen',
+            ))
+    else:
+        actions.append(lu.log_info(
+            'Not using a launch plan, because the launched nodes can not be replayed.'))
+    return actions
+
+
+def generate_launch_description() -> lut.LaunchDescription:
+    args = lu.ArgumentContainer()
+    args.add_arg('max_concurrent_loads', 8, cli=True)
+    actions = args.get_launch_actions()
+    actions.append(OpaqueFunction(function=add_perceptor))
+    return lut.LaunchDescription(actions)
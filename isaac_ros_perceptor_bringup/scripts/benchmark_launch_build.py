@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# SPDX-FileCopyrightText: NVIDIA CORPORATION & AFFILIATES
+# Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+"""
+Measure how long the launch files of the perceptor bringup take to build and resolve.
+
+Every launch file is built (imported and generate_launch_description called) and resolved against
+a launch context without starting any process, see launch_inspection. The time per launch file,
+opaque function and substitution class is reported. The benchmark fails if a launch file fails to
+resolve, and given a baseline, if a launch file got slower by more than the allowed regression.
+
+Launch files included by others often declare arguments without a default value, which can be given
+per launch file with --file_launch_arguments. Launch files that lack a required argument, or are
+given a value outside of the choices of an argument, are reported as skipped instead of failing the
+benchmark.
+
+The driver launch files read a stub of the Nova system info, such that the benchmark also runs on
+machines that are not a Nova robot.
+"""
+
+import argparse
+import dataclasses
+import json
+import os
+import pathlib
+import statistics
+import sys
+import tempfile
+
+import ament_index_python.packages
+import yaml
+
+from isaac_ros_perceptor_python_utils import launch_inspection
+from isaac_ros_perceptor_python_utils import nova_system_info
+
+# Absolute slowdown that is never considered a regression, to not fail on measurement noise of fast
+# launch files.
+MIN_REGRESSION_S = 0.05
+
+# System info of a Nova robot with all sensors, read by the driver launch files instead of the one
+# of the machine running the benchmark.
+STUB_NOVA_SYSTEM_INFO = {
+    'sensors': {
+        'front_stereo_camera': {'type': 'hawk', 'module_id': 5},
+        'back_stereo_camera': {'type': 'hawk', 'module_id': 6},
+        'left_stereo_camera': {'type': 'hawk', 'module_id': 7},
+        'right_stereo_camera': {'type': 'hawk', 'module_id': 2},
+        'front_stereo_imu': {'type': 'hawk'},
+        'front_fisheye_camera': {'type': 'owl', 'module_id': 1, 'camera_id': 0},
+        'back_fisheye_camera': {'type': 'owl', 'module_id': 1, 'camera_id': 1},
+        'left_fisheye_camera': {'type': 'owl', 'module_id': 3, 'camera_id': 0},
+        'right_fisheye_camera': {'type': 'owl', 'module_id': 3, 'camera_id': 1},
+        'front_2d_lidar': {'type': 'rplidar', 'ip': '192.168.1.123'},
+        'back_2d_lidar': {'type': 'rplidar', 'ip': '192.168.1.124'},
+    },
+}
+
+
+@dataclasses.dataclass
+class FileResult:
+    launch_file: str
+    build_time_s: float
+    resolve_time_s: float
+    num_processes: int
+    num_composable_nodes: int
+    errors: list[str]
+    missing_arguments: list[str] = dataclasses.field(default_factory=list)
+    invalid_arguments: list[str] = dataclasses.field(default_factory=list)
+
+    @property
+    def skipped(self) -> bool:
+        return bool(self.missing_arguments or self.invalid_arguments)
+
+    @property
+    def total_time_s(self) -> float:
+        return self.build_time_s + self.resolve_time_s
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Measure the time to build and resolve launch '
+                                     'files.')
+    parser.add_argument(
+        '--launch_files',
+        nargs='+',
+        type=pathlib.Path,
+        default=None,
+        help='Launch files to measure, defaults to all launch files of '
+        'isaac_ros_perceptor_bringup.',
+    )
+    parser.add_argument(
+        '--launch_arguments',
+        nargs='+',
+        default=[],
+        metavar='NAME:=VALUE',
+        help='Launch arguments passed to every launch file.',
+    )
+    parser.add_argument(
+        '--file_launch_arguments',
+        type=pathlib.Path,
+        default=None,
+        help='YAML file mapping the name of a launch file (e.g. hawks.launch.py) to the launch '
+        'arguments passed to it in addition to --launch_arguments.',
+    )
+    parser.add_argument(
+        '--nova_system_info',
+        type=pathlib.Path,
+        default=None,
+        help='Nova system info file read by the driver launch files, defaults to a stub of a '
+        'robot with all sensors.',
+    )
+    parser.add_argument(
+        '--num_runs',
+        type=int,
+        default=5,
+        help='Number of times every launch file is resolved, the median time is reported.',
+    )
+    parser.add_argument(
+        '--num_substitutions',
+        type=int,
+        default=15,
+        help='Number of the slowest substitutions and opaque functions that are reported.',
+    )
+    parser.add_argument(
+        '--output_file',
+        type=pathlib.Path,
+        default=None,
+        help='JSON file the results are written to, can be used as baseline of later runs.',
+    )
+    parser.add_argument(
+        '--baseline',
+        type=pathlib.Path,
+        default=None,
+        help='JSON file written by an earlier run with --output_file to compare against.',
+    )
+    parser.add_argument(
+        '--max_regression',
+        type=float,
+        default=0.25,
+        help='Relative slowdown of a launch file compared to the baseline that fails the '
+        'benchmark.',
+    )
+    args = parser.parse_args()
+    launch_arguments = {}
+    for value in args.launch_arguments:
+        name, separator, argument = value.partition(':=')
+        if not separator:
+            parser.error(f"Invalid launch argument '{value}', expected NAME:=VALUE.")
+        launch_arguments[name] = argument
+    args.launch_arguments = launch_arguments
+    args.file_launch_arguments = {
+        name: {key: str(value) for key, value in file_arguments.items()}
+        for name, file_arguments in (yaml.safe_load(args.file_launch_arguments.read_text())
+                                     if args.file_launch_arguments else {}).items()
+    }
+    if args.launch_files is None:
+        package_share = ament_index_python.packages.get_package_share_directory(
+            'isaac_ros_perceptor_bringup')
+        args.launch_files = sorted((pathlib.Path(package_share) / 'launch').rglob('*.launch.py'))
+    return args
+
+
+def print_table(rows: list[list[str]]):
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    for row in rows:
+        print('  '.join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip())
+
+
+def print_timing_stats(title: str, stats: dict[str, launch_inspection.TimingStats],
+                       num_runs: int, limit: int):
+    rows = [[title, 'Calls', 'Self time', 'Total time']]
+    for name, s in sorted(stats.items(), key=lambda item: -item[1].self_s)[:limit]:
+        # The stats are summed over all runs.
+        rows.append([
+            name,
+            str(s.count // num_runs),
+            f'{1000 * s.self_s / num_runs:.1f}ms',
+            f'{1000 * s.total_s / num_runs:.1f}ms',
+        ])
+    print_table(rows)
+
+
+def measure(args: argparse.Namespace) -> tuple[list[FileResult],
+                                                 launch_inspection.LaunchProfiler]:
+    results = []
+    with launch_inspection.LaunchProfiler() as profiler:
+        resolver = launch_inspection.LaunchResolver(args.launch_arguments, profiler)
+        for launch_file in args.launch_files:
+            launch_arguments = args.file_launch_arguments.get(pathlib.Path(launch_file).name)
+            runs = [resolver.resolve_file(launch_file, launch_arguments)]
+            if runs[0].missing_arguments or runs[0].invalid_arguments:
+                # The launch file can not be resolved without its arguments, timing it is moot.
+                runs *= args.num_runs
+            else:
+                runs += [resolver.resolve_file(launch_file, launch_arguments)
+                         for _ in range(args.num_runs - 1)]
+            results.append(FileResult(
+                launch_file=str(launch_file),
+                build_time_s=statistics.median(r.build_time_s for r in runs),
+                resolve_time_s=statistics.median(r.resolve_time_s for r in runs),
+                num_processes=len(runs[-1].processes),
+                num_composable_nodes=len(runs[-1].load_requests),
+                errors=runs[-1].errors,
+                missing_arguments=runs[-1].missing_arguments,
+                invalid_arguments=runs[-1].invalid_arguments,
+            ))
+    return results, profiler
+
+
+def find_regressions(results: list[FileResult], baseline_file: pathlib.Path,
+                     max_regression: float) -> list[str]:
+    baseline = {r['launch_file']: r for r in json.loads(baseline_file.read_text())['files']}
+    regressions = []
+    for result in results:
+        if result.launch_file not in baseline or result.skipped:
+            continue
+        # A launch file that fails resolves quickly, so it would not be slower than the baseline.
+        if result.errors and not baseline[result.launch_file]['errors']:
+            regressions.append(f'{result.launch_file}: fails to resolve, baseline succeeded')
+            continue
+        baseline_time_s = baseline[result.launch_file]['total_time_s']
+        if result.total_time_s > max(baseline_time_s * (1 + max_regression),
+                                     baseline_time_s + MIN_REGRESSION_S):
+            regressions.append(f'{result.launch_file}: {1000 * result.total_time_s:.1f}ms, '
+                               f'baseline {1000 * baseline_time_s:.1f}ms')
+    return regressions
+
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as temporary_folder:
+        if args.nova_system_info is None:
+            args.nova_system_info = pathlib.Path(temporary_folder) / 'systeminfo.yaml'
+            args.nova_system_info.write_text(yaml.safe_dump(STUB_NOVA_SYSTEM_INFO))
+        os.environ[nova_system_info.NOVA_SYSTEM_INFO_FILE_VARIABLE] = str(args.nova_system_info)
+        results, profiler = measure(args)
+
+    rows = [['Launch file', 'Build', 'Resolve', 'Total', 'Processes', 'Composable nodes',
+             'Errors']]
+    for result in sorted(results, key=lambda r: -r.total_time_s):
+        if result.skipped:
+            continue
+        rows.append([
+            pathlib.Path(result.launch_file).name,
+            f'{1000 * result.build_time_s:.1f}ms',
+            f'{1000 * result.resolve_time_s:.1f}ms',
+            f'{1000 * result.total_time_s:.1f}ms',
+            str(result.num_processes),
+            str(result.num_composable_nodes),
+            str(len(result.errors)),
+        ])
+    print_table(rows)
+    print()
+    print_timing_stats('Opaque function', profiler.functions, args.num_runs,
+                       args.num_substitutions)
+    print()
+    print_timing_stats('Substitution', profiler.substitutions, args.num_runs,
+                       args.num_substitutions)
+    skipped_results = [result for result in results if result.skipped]
+    if skipped_results:
+        print()
+        print('Launch files skipped for lack of arguments, see --file_launch_arguments:')
+        for result in skipped_results:
+            reasons = []
+            if result.missing_arguments:
+                reasons.append(f'missing {", ".join(result.missing_arguments)}')
+            if result.invalid_arguments:
+                reasons.append(f'invalid {", ".join(result.invalid_arguments)}')
+            print(f'    {result.launch_file}: {"; ".join(reasons)}')
+    for result in results:
+        if result.skipped:
+            continue
+        for error in result.errors:
+            print(f'Error in {result.launch_file}: {error}')
+
+    if args.output_file:
+        report = {
+            'launch_arguments': args.launch_arguments,
+            'file_launch_arguments': args.file_launch_arguments,
+            'files': [{**dataclasses.asdict(r), 'total_time_s': r.total_time_s} for r in results],
+        }
+        args.output_file.write_text(json.dumps(report, indent=2) + '\n')
+        print(f'Results written to {args.output_file}.')
+
+    failed = False
+    if args.baseline:
+        regressions = find_regressions(results, args.baseline, args.max_regression)
+        if regressions:
+            print('Launch files that regressed compared to the baseline:')
+            for regression in regressions:
+                print(f'    {regression}')
+            failed = True
+        else:
+            print(f'No launch file regressed compared to the baseline {args.baseline}.')
+    num_failed_files = sum(1 for result in results if result.errors and not result.skipped)
+    if num_failed_files:
+        print(f'{num_failed_files} launch files failed to resolve.')
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
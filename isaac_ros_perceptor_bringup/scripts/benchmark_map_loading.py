@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+# SPDX-FileCopyrightText: NVIDIA CORPORATION & AFFILIATES
+# Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+"""
+Measure how long the localization stack takes to load the maps created by create_map.py.
+
+Every component is started on its own, with the map of the given map folder. cuVSLAM and cuVGL are
+timed from sending the requests to load their nodes into a running container until the container
+responded, as their nodes read the map when they are constructed. The occupancy map server is timed
+from its configure transition until it published the map. A component that only loads its map
+later can be given a ready signal with --ready_signals, e.g. a topic it starts publishing once its
+map is loaded. The memory of the processes is sampled in the meantime. The results can be written
+to a JSON file to track regressions as maps grow.
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import json
+import pathlib
+import statistics
+import time
+from typing import Callable
+
+import ament_index_python.packages
+from composition_interfaces.srv import LoadNode
+from lifecycle_msgs.msg import Transition
+from lifecycle_msgs.srv import ChangeState
+import psutil
+import rclpy
+from rclpy.node import Node
+from rclpy.qos import QoSProfile
+from rosidl_runtime_py.utilities import get_message
+
+from isaac_ros_perceptor_python_utils import launch_plan_cache
+from isaac_ros_perceptor_python_utils import process_supervisor
+from isaac_ros_perceptor_python_utils import resource_telemetry
+
+COMPONENTS = ['cuvslam', 'cuvgl', 'occupancy']
+
+CONTAINER_NAME = 'map_loading_benchmark_container'
+
+# Launch files of the components that are loaded into a container, by package.
+LAUNCH_FILES = {
+    'cuvslam': ('isaac_ros_perceptor_bringup', 'launch/algorithms/vslam.launch.py'),
+    'cuvgl': ('isaac_ros_visual_global_localization',
+              'launch/include/visual_global_localization.launch.py'),
+}
+
+# Signals telling that a component loaded its map, in addition to loading its nodes. Either
+# 'service:<name>' for a service becoming available or 'topic:<name>' for a first message.
+DEFAULT_READY_SIGNALS = {
+    'occupancy': 'topic:/map',
+}
+
+MEMORY_SAMPLE_PERIOD_S = 0.1
+SPIN_PERIOD_S = 0.005
+
+
+@dataclasses.dataclass
+class LoadResult:
+    component: str
+    map_bytes: int
+    load_time_s: float
+    # Memory of all processes of the component once the map was loaded, and at most before.
+    ready_rss_bytes: int
+    peak_rss_bytes: int
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Measure the time to load the maps of a map '
+                                     'folder.')
+    parser.add_argument(
+        '--map_folder',
+        required=True,
+        type=pathlib.Path,
+        help='Map folder created by create_map.py.',
+    )
+    parser.add_argument(
+        '--components',
+        nargs='+',
+        choices=COMPONENTS,
+        default=COMPONENTS,
+        help='Components whose map loading is measured.',
+    )
+    parser.add_argument(
+        '--num_runs',
+        type=int,
+        default=3,
+        help='Number of times every map is loaded.',
+    )
+    parser.add_argument(
+        '--stereo_cameras',
+        default='front_stereo_camera',
+        help='Comma separated stereo cameras that cuVSLAM and cuVGL are configured for.',
+    )
+    parser.add_argument(
+        '--ready_signals',
+        nargs='+',
+        default=[],
+        metavar='COMPONENT=SIGNAL',
+        help="Signal telling that a component loaded its map, 'service:<name>' or "
+        "'topic:<name>'.",
+    )
+    parser.add_argument(
+        '--timeout_s',
+        type=float,
+        default=600.0,
+        help='Maximum time to wait for a component to load its map.',
+    )
+    parser.add_argument(
+        '--log_folder',
+        type=pathlib.Path,
+        default=None,
+        help='Folder for the logs of the components, defaults to the logs folder of the map.',
+    )
+    parser.add_argument(
+        '--output_file',
+        type=pathlib.Path,
+        default=None,
+        help='JSON file the results of all runs are written to.',
+    )
+    parser.add_argument(
+        '--print_mode',
+        default='tail',
+        choices=['none', 'tail', 'all'],
+        help='Determines what is printed to stdout.',
+    )
+    args = parser.parse_args()
+    args.ready_signals = {**DEFAULT_READY_SIGNALS, **parse_ready_signals(parser, args)}
+    if args.log_folder is None:
+        args.log_folder = args.map_folder / 'logs' / 'benchmark_map_loading'
+    return args
+
+
+def parse_ready_signals(parser: argparse.ArgumentParser,
+                        args: argparse.Namespace) -> dict[str, str]:
+    ready_signals = {}
+    for value in args.ready_signals:
+        component, _, signal = value.partition('=')
+        if component not in COMPONENTS:
+            parser.error(f"Unknown component '{component}' in --ready_signals.")
+        kind, _, name = signal.partition(':')
+        if kind not in ['service', 'topic'] or not name:
+            parser.error(f"Invalid signal '{signal}' in --ready_signals.")
+        ready_signals[component] = signal
+    return ready_signals
+
+
+def get_launch_file(package: str, path: str) -> pathlib.Path:
+    package_share = ament_index_python.packages.get_package_share_directory(package)
+    return pathlib.Path(package_share) / path
+
+
+def get_map_path(map_folder: pathlib.Path, component: str) -> pathlib.Path:
+    return {
+        'cuvslam': map_folder / 'cuvslam_map',
+        'cuvgl': map_folder / 'cuvgl_map',
+        'occupancy': map_folder / 'occupancy_map.yaml',
+    }[component]
+
+
+def get_map_size(map_path: pathlib.Path) -> int:
+    if map_path.suffix == '.yaml':
+        # The image of an occupancy map is stored next to its yaml file.
+        return sum(p.stat().st_size for p in map_path.parent.glob(f'{map_path.stem}.*'))
+    return sum(p.stat().st_size for p in map_path.rglob('*') if p.is_file())
+
+
+def get_launch_arguments(component: str, map_path: pathlib.Path, stereo_cameras: str) -> dict:
+    if component == 'cuvslam':
+        return {
+            'container_name': CONTAINER_NAME,
+            'vslam_enabled_stereo_cameras': stereo_cameras,
+            'vslam_load_map_folder_path': str(map_path),
+            'vslam_localize_on_startup': 'True',
+        }
+    return {
+        'container_name': CONTAINER_NAME,
+        'vgl_enabled_stereo_cameras': stereo_cameras,
+        'vgl_map_dir': str(map_path),
+    }
+
+
+def get_rss_bytes(pids: list[int]) -> int:
+    rss_bytes = 0
+    for pid in pids:
+        try:
+            process = psutil.Process(pid)
+            for p in [process, *process.children(recursive=True)]:
+                rss_bytes += p.memory_info().rss
+        except psutil.NoSuchProcess:
+            continue
+    return rss_bytes
+
+
+class ReadinessProbe(Node):
+    """Observe the ROS graph from within the event loop of the benchmark."""
+
+    def __init__(self):
+        super().__init__('map_loading_benchmark')
+
+    async def spin_until(self, is_done: Callable[[], bool], what: str, timeout_s: float,
+                         processes: list[process_supervisor.SupervisedProcess]):
+        deadline = time.monotonic() + timeout_s
+        while not is_done():
+            for p in processes:
+                if p.process.returncode is not None:
+                    raise RuntimeError(f"'{p.mnemonic}' stopped while waiting for {what}.")
+            if time.monotonic() > deadline:
+                raise TimeoutError(f'Timed out waiting for {what}.')
+            rclpy.spin_once(self, timeout_sec=0.0)
+            await asyncio.sleep(SPIN_PERIOD_S)
+
+    async def wait_for_service(self, client, timeout_s: float,
+                               processes: list[process_supervisor.SupervisedProcess]):
+        await self.spin_until(client.service_is_ready, f"service '{client.srv_name}'", timeout_s,
+                              processes)
+
+    async def call(self, client, request, timeout_s: float,
+                   processes: list[process_supervisor.SupervisedProcess]):
+        """Call a service and return its response and the time it arrived."""
+        future = client.call_async(request)
+        done_times = []
+        future.add_done_callback(lambda _: done_times.append(time.monotonic()))
+        await self.spin_until(future.done, f"a response of '{client.srv_name}'", timeout_s,
+                              processes)
+        return future.result(), done_times[0]
+
+    def watch_signal(self, signal: str) -> Callable[[], float | None]:
+        """
+        Watch for a ready signal, either 'service:<name>' or 'topic:<name>'.
+
+        Returns a function returning the time the signal was first observed, or None.
+        """
+        kind, _, name = signal.partition(':')
+        observed_times = []
+        if kind == 'service':
+
+            def get_observed_time():
+                if not observed_times and name in dict(self.get_service_names_and_types()):
+                    observed_times.append(time.monotonic())
+                return observed_times[0] if observed_times else None
+
+            return get_observed_time
+
+        subscription = None
+
+        def on_message(_):
+            if not observed_times:
+                observed_times.append(time.monotonic())
+
+        def get_observed_time():
+            nonlocal subscription
+            publishers = self.get_publishers_info_by_topic(name)
+            if subscription is None and publishers:
+                # Match the QoS of the publisher, e.g. the map is only published once and latched.
+                qos = QoSProfile(depth=1,
+                                 reliability=publishers[0].qos_profile.reliability,
+                                 durability=publishers[0].qos_profile.durability)
+                subscription = self.create_subscription(
+                    get_message(publishers[0].topic_type), name, on_message, qos, raw=True)
+            return observed_times[0] if observed_times else None
+
+        return get_observed_time
+
+
+async def load_composable_nodes(args: argparse.Namespace, probe: ReadinessProbe,
+                                supervisor: process_supervisor.ProcessSupervisor, component: str,
+                                map_path: pathlib.Path, run: int,
+                                processes: list[process_supervisor.SupervisedProcess]) -> float:
+    """Load the nodes of a component into a new container and return when loading started."""
+    launch_file = get_launch_file(*LAUNCH_FILES[component])
+    # Resolve the launch file upfront, such that only the container loading the map is timed and
+    # not the startup of ros2 launch.
+    plan = launch_plan_cache.create_launch_plan(
+        launch_file, get_launch_arguments(component, map_path, args.stereo_cameras))
+    if not plan.is_replayable:
+        raise RuntimeError(f'{launch_file} starts processes, only composable nodes can be timed: '
+                           f'{plan.processes}')
+
+    processes.append(await supervisor.start(
+        mnemonic='Component container',
+        command=[
+            'ros2', 'run', 'rclcpp_components', 'component_container_mt', '--ros-args', '-r',
+            f'__node:={CONTAINER_NAME}'
+        ],
+        log_file=args.log_folder / f'{component}_{run}_container.log',
+    ))
+    client = probe.create_client(LoadNode, f'/{CONTAINER_NAME}/_container/load_node')
+    await probe.wait_for_service(client, args.timeout_s, processes)
+
+    start_time = time.monotonic()
+    # The container constructs the nodes, and with them reads the map, before it responds.
+    for node in plan.nodes:
+        response, _ = await probe.call(client, node.request, args.timeout_s, processes)
+        if not response.success:
+            raise RuntimeError(f"Failed to load '{node.name}': {response.error_message}")
+    probe.destroy_client(client)
+    return start_time
+
+
+async def load_occupancy_map(args: argparse.Namespace, probe: ReadinessProbe,
+                             supervisor: process_supervisor.ProcessSupervisor,
+                             map_path: pathlib.Path, run: int,
+                             processes: list[process_supervisor.SupervisedProcess]) -> float:
+    """Start the map server and activate it, return when loading the map started."""
+    # Started directly instead of through occupancy_map_server.launch.py, which delays activating
+    # the map server by a fixed period.
+    processes.append(await supervisor.start(
+        mnemonic='Map server',
+        command=[
+            'ros2', 'run', 'nav2_map_server', 'map_server', '--ros-args', '-r',
+            '__node:=map_server', '-p', f'yaml_filename:={map_path}', '-p', 'frame_id:=map'
+        ],
+        log_file=args.log_folder / f'occupancy_{run}.log',
+    ))
+    client = probe.create_client(ChangeState, '/map_server/change_state')
+    await probe.wait_for_service(client, args.timeout_s, processes)
+
+    # The map server reads the map when it is configured and publishes it once it is active.
+    start_time = time.monotonic()
+    for transition in [Transition.TRANSITION_CONFIGURE, Transition.TRANSITION_ACTIVATE]:
+        response, _ = await probe.call(client, ChangeState.Request(
+            transition=Transition(id=transition)), args.timeout_s, processes)
+        if not response.success:
+            raise RuntimeError(f'Failed to transition the map server with {transition}.')
+    probe.destroy_client(client)
+    return start_time
+
+
+async def measure_load(args: argparse.Namespace, probe: ReadinessProbe, component: str,
+                       run: int) -> LoadResult:
+    map_path = get_map_path(args.map_folder, component)
+    async with process_supervisor.ProcessSupervisor(args.print_mode) as supervisor:
+        processes = []
+        peak_rss_bytes = 0
+
+        async def sample_memory():
+            nonlocal peak_rss_bytes
+            while True:
+                pids = [p.process.pid for p in processes]
+                peak_rss_bytes = max(peak_rss_bytes, get_rss_bytes(pids))
+                await asyncio.sleep(MEMORY_SAMPLE_PERIOD_S)
+
+        sampler = asyncio.create_task(sample_memory())
+        try:
+            if component == 'occupancy':
+                start_time = await load_occupancy_map(args, probe, supervisor, map_path, run,
+                                                      processes)
+            else:
+                start_time = await load_composable_nodes(args, probe, supervisor, component,
+                                                         map_path, run, processes)
+            ready_time = time.monotonic()
+            signal = args.ready_signals.get(component)
+            if signal:
+                get_signal_time = probe.watch_signal(signal)
+                await probe.spin_until(lambda: get_signal_time() is not None, f"'{signal}'",
+                                       args.timeout_s, processes)
+                ready_time = get_signal_time()
+            load_time_s = ready_time - start_time
+            ready_rss_bytes = get_rss_bytes([p.process.pid for p in processes])
+        finally:
+            sampler.cancel()
+
+    return LoadResult(
+        component=component,
+        map_bytes=get_map_size(map_path),
+        load_time_s=load_time_s,
+        ready_rss_bytes=ready_rss_bytes,
+        peak_rss_bytes=max(peak_rss_bytes, ready_rss_bytes),
+    )
+
+
+def print_summary(results: list[LoadResult]):
+    header = ['Component', 'Map size', 'Load time (median)', 'Min', 'Max', 'RSS when loaded',
+              'Peak RSS']
+    rows = [header]
+    for component in dict.fromkeys(r.component for r in results):
+        component_results = [r for r in results if r.component == component]
+        load_times_s = [r.load_time_s for r in component_results]
+        rows.append([
+            component,
+            resource_telemetry.format_bytes(component_results[0].map_bytes),
+            f'{statistics.median(load_times_s):.2f}s',
+            f'{min(load_times_s):.2f}s',
+            f'{max(load_times_s):.2f}s',
+            resource_telemetry.format_bytes(max(r.ready_rss_bytes for r in component_results)),
+            resource_telemetry.format_bytes(max(r.peak_rss_bytes for r in component_results)),
+        ])
+    widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+    for row in rows:
+        print('  '.join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip())
+
+
+async def run_benchmark(args: argparse.Namespace, probe: ReadinessProbe) -> list[LoadResult]:
+    args.log_folder.mkdir(parents=True, exist_ok=True)
+    results = []
+    for component in args.components:
+        map_path = get_map_path(args.map_folder, component)
+        if not map_path.exists():
+            print(f'Skipping {component}, no map found at {map_path}.')
+            continue
+        for run in range(args.num_runs):
+            result = await measure_load(args, probe, component, run)
+            print(f'Loaded the {component} map in {result.load_time_s:.2f}s '
+                  f'(run {run + 1}/{args.num_runs}).')
+            results.append(result)
+    return results
+
+
+def main():
+    args = parse_args()
+    rclpy.init()
+    probe = ReadinessProbe()
+    try:
+        results = asyncio.run(run_benchmark(args, probe))
+    finally:
+        probe.destroy_node()
+        rclpy.try_shutdown()
+    print_summary(results)
+    if args.output_file:
+        report = {
+            'map_folder': str(args.map_folder.resolve()),
+            'results': [dataclasses.asdict(r) for r in results],
+        }
+        args.output_file.write_text(json.dumps(report, indent=2) + '\n')
+        print(f'Results written to {args.output_file}.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# SPDX-FileCopyrightText: NVIDIA CORPORATION & AFFILIATES
+# Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+"""
+Resolve a launch file and store the composable nodes it loads as a launch plan.
+
+The plan can be replayed by replay_launch_plan.py on the next launch with the same launch
+arguments, see launch_plan_cache.
+"""
+
+import argparse
+import pathlib
+import sys
+
+from isaac_ros_perceptor_python_utils import launch_plan_cache
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Create a launch plan for a launch file.')
+    parser.add_argument(
+        '--launch_file',
+        required=True,
+        type=pathlib.Path,
+        help='Launch file to create the plan for.',
+    )
+    parser.add_argument(
+        '--launch_arguments',
+        nargs='*',
+        default=[],
+        metavar='NAME:=VALUE',
+        help='Launch configurations the launch file is resolved with, e.g. all configurations of '
+        'the including launch file. The plan is keyed by the ones the launch files declare.',
+    )
+    parser.add_argument(
+        '--plan_file',
+        type=pathlib.Path,
+        default=None,
+        help='File the plan is written to, defaults to the cache where launches find it.',
+    )
+    args = parser.parse_known_args()[0]
+    launch_arguments = {}
+    for value in args.launch_arguments:
+        name, separator, argument = value.partition(':=')
+        if not separator:
+            parser.error(f"Invalid launch argument '{value}', expected NAME:=VALUE.")
+        launch_arguments[name] = argument
+    args.launch_arguments = launch_arguments
+    return args
+
+
+def main():
+    args = parse_args()
+    try:
+        plan = launch_plan_cache.create_launch_plan(args.launch_file, args.launch_arguments)
+    except RuntimeError as error:
+        print(error)
+        sys.exit(1)
+    if args.plan_file is None:
+        plan_file = launch_plan_cache.store_launch_plan(plan, args.launch_arguments)
+    else:
+        plan_file = args.plan_file
+        plan.save(plan_file)
+    print(f'Wrote launch plan with {len(plan.nodes)} composable nodes to {plan_file}.')
+    if not plan.is_replayable:
+        print('The plan can not be replayed, because the launch file starts processes: ' +
+              ', '.join(plan.processes))
+
+
+if __name__ == '__main__':
+    main()
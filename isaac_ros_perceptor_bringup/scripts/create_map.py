@@ -1,34 +1,110 @@
 #!/usr/bin/env python3
 
 import argparse
+import asyncio
+import concurrent.futures
 import datetime
 import os
 import pathlib
-import subprocess
-import time
+import platform
 import shutil
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree
 
 
 import ament_index_python.packages
+import numpy as np
+import psutil
 
-from isaac_common_py import subprocess_utils
 from isaac_common_py import filesystem_utils
+from isaac_ros_perceptor_python_utils import bag_utils
+from isaac_ros_perceptor_python_utils import bow_vocabulary_registry
+from isaac_ros_perceptor_python_utils import map_folder_utils
+from isaac_ros_perceptor_python_utils import mapping_pipeline
+from isaac_ros_perceptor_python_utils import occupancy_map_tiles
+from isaac_ros_perceptor_python_utils import pip_requirements
+from isaac_ros_perceptor_python_utils import pose_store
+from isaac_ros_perceptor_python_utils import process_supervisor
+from isaac_ros_perceptor_python_utils import resource_telemetry
+from isaac_ros_perceptor_python_utils import run_journal
 
 ROS_WS = pathlib.Path(os.environ.get('ISAAC_ROS_WS'))
 
+STEPS = ['cuvslam', 'occupancy', 'occupancy_tiles', 'keyframes', 'cuvgl']
+# Steps run by --update_map. The new rosbag is localized in the existing cuVSLAM map, which is not
+# changed.
+UPDATE_STEPS = ['occupancy', 'occupancy_tiles', 'keyframes', 'cuvgl']
+
+# Resources used by every step, the scheduler does not start steps exceeding the budget. The
+# keyframe extraction uses its resources once per shard.
+STEP_RESOURCES = {
+    'cuvslam': {'gpu': 1, 'cpu': 2, 'memory_gb': 8},
+    'occupancy': {'gpu': 1, 'cpu': 4, 'memory_gb': 16},
+    'occupancy_tiles': {'cpu': 1, 'memory_gb': 2},
+    'keyframes': {'cpu': 1, 'memory_gb': 4},
+    'cuvgl': {'cpu': 2, 'memory_gb': 8},
+}
+
+# Frame rate limit of the offline cuVSLAM map creation for --cuvslam_max_fps=auto, by platform.
+# Jetson keeps the rate of the live tracker on the robot, which it sustains in real time. Desktop
+# GPUs track every frame of the rosbag faster than real time, so they are not limited.
+CUVSLAM_MAX_FPS_BY_PLATFORM = {
+    'jetson': 15.0,
+}
+
+# Topic of the localized poses, from which the keyframes are extracted.
+POSES_TOPIC = '/visual_slam/vis/slam_odometry'
+
+# cuvslam_api_launcher reports the poses of the camera rig, whose origin is the left camera of the
+# first stereo camera of the EDEX. With --ros_frame_conversion the rig has ROS axes (x forward, z
+# up) instead of the optical axes of the camera, i.e. it is rotated by this quaternion (x, y, z, w)
+# in the optical frame.
+CUVSLAM_RIG_FRAME = 'front_stereo_camera_left_optical'
+CUVSLAM_RIG_ORIENTATION_IN_OPTICAL_FRAME = (0.5, -0.5, 0.5, 0.5)
+
+KEYFRAME_IMAGE_SUFFIXES = ['.jpg', '.jpeg', '.png']
+
+# Folder in the cuVGL map to which create_cuvgl_map.py writes the vocabulary it trained.
+BOW_VOCABULARY_FOLDER_NAME = 'bow_vocabulary'
+
+# ROS domain IDs that are valid on all platforms.
+MAX_ROS_DOMAIN_ID = 101
+
+# Sensor data replayed before the stamp of an occupancy checkpoint when resuming from it, such that
+# no frames are skipped because of the latency between replaying a frame and its pose.
+CHECKPOINT_REPLAY_MARGIN_S = 2.0
+# Time to wait for the checkpointer to load a checkpoint into nvblox before the replay starts.
+CHECKPOINTER_STARTUP_TIMEOUT_S = 300.0
+
 
 def get_path(package: str, path: str) -> pathlib.Path:
     package_share = pathlib.Path(ament_index_python.packages.get_package_share_directory(package))
     return package_share / path
 
 
+def get_package_version(package: str) -> str:
+    try:
+        package_xml = xml.etree.ElementTree.parse(get_path(package, 'package.xml'))
+    except (ament_index_python.packages.PackageNotFoundError, FileNotFoundError):
+        return 'unknown'
+    return package_xml.getroot().findtext('version', 'unknown')
+
+
+def get_package_versions(packages: list[str]) -> dict[str, str]:
+    return {package: get_package_version(package) for package in packages}
+
+
 def parse_args():
     parser = argparse.ArgumentParser(description='Script to build multiple maps from a rosbag.')
     parser.add_argument(
         '--sensor_data_bag',
         required=True,
+        nargs='+',
         type=pathlib.Path,
-        help='Path to the sensor data rosbag file.',
+        help='Path to the sensor data rosbag file. Multiple rosbags, or folders containing '
+        'rosbags, can be given to create the maps of all of them.',
     )
     parser.add_argument(
         '--base_output_folder',
@@ -42,6 +118,49 @@ def parse_args():
         type=float,
         help='Replay rate for the rosbag playback.',
     )
+    parser.add_argument(
+        '--occupancy_replay_mode',
+        default='realtime',
+        choices=['realtime', 'paced'],
+        help='How the sensor data is replayed to create the occupancy map. "realtime" replays '
+        'the rosbag at --replay_rate, "paced" publishes every frame as soon as the graph consumed '
+        'the previous one.',
+    )
+    parser.add_argument(
+        '--adaptive_replay_rate',
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help='If set, start the realtime replay at --replay_rate and continuously adapt the rate '
+        'to the fastest one the graph sustains without dropping frames.',
+    )
+    parser.add_argument(
+        '--max_replay_rate',
+        default=1.0,
+        type=float,
+        help='Upper bound for the replay rate if --adaptive_replay_rate is set.',
+    )
+    parser.add_argument(
+        '--tile_occupancy_map',
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help='If set, additionally store the occupancy map as compressed tiles with an index, '
+        'such that only the tiles around the robot need to be loaded.',
+    )
+    parser.add_argument(
+        '--occupancy_tile_size_px',
+        type=int,
+        default=512,
+        help='Width and height of the occupancy map tiles in pixels.',
+    )
+    parser.add_argument(
+        '--poses_source',
+        default='occupancy',
+        choices=['occupancy', 'cuvslam'],
+        help='Where the poses used to extract the keyframes come from. "occupancy" records the '
+        'poses localized in the cuVSLAM map while the occupancy map is created, "cuvslam" writes '
+        'the poses of the cuVSLAM map creation, such that the keyframes are extracted while the '
+        'occupancy map is created.',
+    )
     parser.add_argument(
         '--stereo_camera_configuration',
         default='front_left_right_configuration',
@@ -53,6 +172,19 @@ def parse_args():
         default=None,
         help='Folder containing prebuilt BoW vocabulary files.',
     )
+    parser.add_argument(
+        '--site_name',
+        default=None,
+        help='Name of the mapped site. If set and --prebuilt_bow_vocabulary_folder is not given, '
+        'the BoW vocabulary is taken from the vocabulary registry for the site and stereo camera '
+        'configuration, or trained once and added to the registry.',
+    )
+    parser.add_argument(
+        '--bow_vocabulary_registry',
+        type=pathlib.Path,
+        default=bow_vocabulary_registry.get_default_folder(),
+        help='Folder of the BoW vocabulary registry.',
+    )
     parser.add_argument(
         '--print_mode',
         type=str,
@@ -63,7 +195,7 @@ def parse_args():
     parser.add_argument(
         '--steps_to_run',
         nargs='+',
-        choices=['cuvslam', 'occupancy', 'keyframes', 'cuvgl'],
+        choices=STEPS,
         help='Specify which steps to run.',
     )
     parser.add_argument(
@@ -71,98 +203,573 @@ def parse_args():
         type=pathlib.Path,
         help='Directory containing existing map data.',
     )
+    parser.add_argument(
+        '--update_map',
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help='If set, extend the maps in --map_dir with the sensor data of a new rosbag. The '
+        'rosbag is localized in the existing cuVSLAM map, its occupancy is integrated into the '
+        'existing occupancy map and its keyframes are added to the existing cuVGL map.',
+    )
     parser.add_argument(
         '--remap_tf',
         action=argparse.BooleanOptionalAction,
         default=True,
         help='If set, remap /tf to /tf_old.',
     )
-    return parser.parse_args()
+    parser.add_argument(
+        '--num_workers',
+        type=int,
+        default=4,
+        help='Maximum number of steps that are run concurrently.',
+    )
+    parser.add_argument(
+        '--keyframe_workers',
+        type=int,
+        default=1,
+        help='Number of processes that select keyframes, decode their images and extract their '
+        'features in parallel, each on its own time window of the sensor data bag.',
+    )
+    parser.add_argument(
+        '--num_shards',
+        type=int,
+        default=None,
+        help='Number of time windows the sensor data bag is split into to extract keyframes in '
+        'parallel. Defaults to --keyframe_workers, more shards than workers balance the load '
+        'between the workers.',
+    )
+    parser.add_argument(
+        '--keyframe_rot_dist',
+        type=float,
+        default=5.0,
+        help='Rotation in degrees after which a new keyframe is selected.',
+    )
+    parser.add_argument(
+        '--keyframe_trans_dist',
+        type=float,
+        default=0.2,
+        help='Translation in meters after which a new keyframe is selected.',
+    )
+    parser.add_argument(
+        '--shard_overlap_s',
+        type=float,
+        default=5.0,
+        help='Time before its own time window for which every shard reads the sensor data bag to '
+        'warm up the keyframe selection. Keyframes selected during the warm-up are dropped.',
+    )
+    parser.add_argument(
+        '--step_timeouts_h',
+        nargs='+',
+        default=[],
+        metavar='STEP=HOURS',
+        help='Maximum duration of individual steps, e.g. "occupancy=12". A step that takes longer '
+        'is stopped and fails the run.',
+    )
+    parser.add_argument(
+        '--recorder_startup_timeout_s',
+        type=float,
+        default=30.0,
+        help='Time to wait for the pose rosbag recording to start.',
+    )
+    parser.add_argument(
+        '--use_cache',
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help='If set, skip steps whose inputs and parameters did not change since their last '
+        'successful run in --map_dir.',
+    )
+    parser.add_argument(
+        '--resume',
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help='If set and --map_dir is not given, continue the latest run for the same sensor data '
+        'bag in --base_output_folder if it did not finish, instead of starting a new run. Steps '
+        'that finished are skipped and the occupancy map is continued from its last checkpoint.',
+    )
+    parser.add_argument(
+        '--perceptor_shutdown_timeout_s',
+        type=float,
+        default=1800.0,
+        help='Time the perceptor graph gets to shut down after it was interrupted at the end of '
+        'the replay, before it is terminated. nvblox saves the occupancy map while shutting down, '
+        'which takes longer for larger maps. Cancelled runs are terminated after a short timeout.',
+    )
+    parser.add_argument(
+        '--checkpoint_period_s',
+        type=float,
+        default=600.0,
+        help='Wall-clock period in which the occupancy map is saved as a checkpoint to resume '
+        'from. Set to 0 to disable checkpoints.',
+    )
+    parser.add_argument(
+        '--cuvslam_max_fps',
+        default='auto',
+        help='Maximum frame rate at which cuVSLAM processes the rosbag when creating its map. '
+        'Either a number, "unlimited" to process every frame as fast as the tracker consumes it, '
+        'or "auto" to use the default of the platform.',
+    )
+    parser.add_argument(
+        '--edex_folder',
+        type=pathlib.Path,
+        default=None,
+        help='Folder for the intermediate EDEX dataset, e.g. on a scratch volume. By default it '
+        'is written to the output folder.',
+    )
+    parser.add_argument(
+        '--keep_edex',
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help='If set, keep the intermediate EDEX dataset after the cuVSLAM map was created.',
+    )
+    parser.add_argument(
+        '--max_concurrent_pipelines',
+        type=int,
+        default=2,
+        help='Maximum number of rosbags whose maps are created at the same time.',
+    )
+    parser.add_argument(
+        '--gpu_slots',
+        type=int,
+        default=1,
+        help='Number of GPU heavy steps (cuVSLAM, occupancy) that may run at the same time.',
+    )
+    parser.add_argument(
+        '--cpu_slots',
+        type=int,
+        default=os.cpu_count(),
+        help='Number of CPU cores shared by all running steps.',
+    )
+    parser.add_argument(
+        '--memory_budget_gb',
+        type=float,
+        default=0.8 * psutil.virtual_memory().total / 1024**3,
+        help='Memory shared by all running steps.',
+    )
+    parser.add_argument(
+        '--step_memory_gb',
+        nargs='+',
+        default=[],
+        metavar='STEP=GB',
+        help='Override the memory expected to be used by individual steps, e.g. "occupancy=24".',
+    )
+    args = parser.parse_args()
+    if args.num_shards is None:
+        args.num_shards = args.keyframe_workers
+    step_timeouts_h = parse_step_values(parser, args.step_timeouts_h, '--step_timeouts_h')
+    args.step_timeouts_s = {step: hours * 3600 for step, hours in step_timeouts_h.items()}
+    args.step_memory_gb = parse_step_values(parser, args.step_memory_gb, '--step_memory_gb')
 
+    if args.cuvslam_max_fps == 'auto':
+        args.cuvslam_max_fps = CUVSLAM_MAX_FPS_BY_PLATFORM.get(get_platform())
+    elif args.cuvslam_max_fps == 'unlimited':
+        args.cuvslam_max_fps = None
+    else:
+        try:
+            args.cuvslam_max_fps = float(args.cuvslam_max_fps)
+        except ValueError:
+            parser.error(f"Invalid --cuvslam_max_fps '{args.cuvslam_max_fps}'.")
 
-def main():
-    args = parse_args()
+    args.sensor_data_bags = find_bags(args.sensor_data_bag)
+    if not args.sensor_data_bags:
+        parser.error('No rosbags found in --sensor_data_bag.')
+    bag_names = [bag.name for bag in args.sensor_data_bags]
+    duplicates = sorted({name for name in bag_names if bag_names.count(name) > 1})
+    if duplicates:
+        parser.error(f'Multiple rosbags are named {duplicates}, their output folders would clash.')
+    if args.map_dir and len(args.sensor_data_bags) > 1:
+        parser.error('--map_dir can only be used with a single rosbag.')
+    if args.update_map:
+        if not args.map_dir:
+            parser.error('--update_map requires --map_dir.')
+        if args.steps_to_run and 'cuvslam' in args.steps_to_run:
+            parser.error('The cuVSLAM map can not be updated, --update_map localizes the new '
+                         'rosbag in it.')
+        if args.poses_source == 'cuvslam':
+            parser.error('--update_map requires --poses_source=occupancy, the cuVSLAM map is not '
+                         'created again.')
+        if not (args.map_dir / 'cuvslam_map').is_dir():
+            parser.error(f'No cuVSLAM map to update found in {args.map_dir}.')
+    return args
+
+
+def get_platform() -> str:
+    if pathlib.Path('/etc/nv_tegra_release').exists():
+        return 'jetson'
+    return platform.machine()
+
+
+def parse_step_values(parser: argparse.ArgumentParser, values: list[str],
+                      option: str) -> dict[str, float]:
+    step_values = {}
+    for value in values:
+        step, _, amount = value.partition('=')
+        if step not in STEPS:
+            parser.error(f"Unknown step '{step}' in {option}.")
+        step_values[step] = float(amount)
+    return step_values
+
+
+def find_bags(paths: list[pathlib.Path]) -> list[pathlib.Path]:
+    """Replace folders that are not a rosbag themselves by the rosbags they contain."""
+    bags = []
+    for path in paths:
+        if path.is_dir() and not (path / 'metadata.yaml').exists():
+            bags += sorted(p for p in path.iterdir() if (p / 'metadata.yaml').exists())
+        else:
+            bags.append(path)
+    return bags
 
+
+def get_size(path: pathlib.Path) -> int:
+    if path.is_file():
+        return path.stat().st_size
+    return sum(p.stat().st_size for p in path.rglob('*') if p.is_file())
+
+
+def get_step_resources(args: argparse.Namespace, step: str) -> dict[str, float]:
+    resources = dict(STEP_RESOURCES[step])
+    if step in args.step_memory_gb:
+        resources['memory_gb'] = args.step_memory_gb[step]
+    if step == 'keyframes':
+        num_workers = min(args.keyframe_workers, args.num_shards)
+        resources = {resource: amount * num_workers for resource, amount in resources.items()}
+    return resources
+
+
+def get_artifact_paths(output_folder: pathlib.Path) -> dict[str, pathlib.Path]:
+    return {
+        'cuvslam_map': output_folder / 'cuvslam_map',
+        'occupancy_map': output_folder / 'occupancy_map',
+        'occupancy_tiles': output_folder / 'occupancy_map_tiles',
+        'poses': output_folder / 'poses',
+        'keyframes': output_folder / 'cuvgl_map' / 'keyframes',
+        'cuvgl_map': output_folder / 'cuvgl_map',
+    }
+
+
+def get_steps(args: argparse.Namespace, sensor_data_bag: pathlib.Path,
+              output_folder: pathlib.Path, log_folder: pathlib.Path,
+              journal: run_journal.RunJournal) -> list[mapping_pipeline.Step]:
+    poses_bag = output_folder / 'poses'
+    cuvgl_map_folder = output_folder / 'cuvgl_map'
+
+    # Vocabularies are shared between maps of the same site, unless a vocabulary is given.
+    vocabulary_registry = None
+    vocabulary_key = None
+    if args.site_name and not args.prebuilt_bow_vocabulary_folder:
+        vocabulary_registry = bow_vocabulary_registry.BowVocabularyRegistry(
+            args.bow_vocabulary_registry)
+        vocabulary_key = {
+            'site_name': args.site_name,
+            'stereo_camera_configuration': args.stereo_camera_configuration,
+            'isaac_mapping_ros': get_package_version('isaac_mapping_ros'),
+        }
+
+    return [
+        mapping_pipeline.Step(
+            name='cuvslam',
+            function=create_cuvslam_map,
+            kwargs=dict(
+                sensor_data_bag=sensor_data_bag,
+                output_folder=output_folder,
+                log_folder=log_folder,
+                print_mode=args.print_mode,
+                edex_path=(args.edex_folder / output_folder.name
+                           if args.edex_folder else output_folder / 'edex'),
+                keep_edex=args.keep_edex,
+                max_fps=args.cuvslam_max_fps,
+                write_poses=args.poses_source == 'cuvslam',
+            ),
+            inputs=['sensor_data_bag'],
+            outputs=['cuvslam_map'] + (['poses'] if args.poses_source == 'cuvslam' else []),
+            parameters=dict(
+                max_fps=args.cuvslam_max_fps,
+                poses_source=args.poses_source,
+                tool_versions=get_package_versions(
+                    ['isaac_ros_rosbag_utils', 'isaac_ros_visual_slam']),
+            ),
+        ),
+        mapping_pipeline.Step(
+            name='occupancy',
+            function=create_global_occupancy_map,
+            kwargs=dict(
+                sensor_data_bag=sensor_data_bag,
+                output_folder=output_folder,
+                log_folder=log_folder,
+                replay_rate=args.replay_rate,
+                stereo_camera_configuration=args.stereo_camera_configuration,
+                print_mode=args.print_mode,
+                remap_tf=args.remap_tf,
+                replay_mode=args.occupancy_replay_mode,
+                adaptive_replay_rate=args.adaptive_replay_rate,
+                max_replay_rate=args.max_replay_rate,
+                recorder_startup_timeout_s=args.recorder_startup_timeout_s,
+                journal=journal,
+                checkpoint_period_s=args.checkpoint_period_s,
+                perceptor_shutdown_timeout_s=args.perceptor_shutdown_timeout_s,
+                resume=args.resume,
+                base_map=output_folder / 'occupancy_map' if args.update_map else None,
+                record_poses=args.poses_source == 'occupancy',
+            ),
+            inputs=['sensor_data_bag', 'cuvslam_map'],
+            outputs=['occupancy_map'] + (['poses'] if args.poses_source == 'occupancy' else []),
+            parameters=dict(
+                poses_source=args.poses_source,
+                replay_mode=args.occupancy_replay_mode,
+                replay_rate=args.replay_rate,
+                adaptive_replay_rate=args.adaptive_replay_rate,
+                stereo_camera_configuration=args.stereo_camera_configuration,
+                remap_tf=args.remap_tf,
+                update_map=args.update_map,
+                tool_versions=get_package_versions(
+                    ['nova_carter_bringup', 'isaac_ros_perceptor_bringup', 'nvblox_ros',
+                     'isaac_ros_visual_slam']),
+            ),
+        ),
+        # Tiling is a separate step, such that changing the tiles does not replay the rosbag again.
+        mapping_pipeline.Step(
+            name='occupancy_tiles',
+            function=tile_occupancy_map,
+            kwargs=dict(
+                output_folder=output_folder,
+                tile_size_px=args.occupancy_tile_size_px,
+            ),
+            inputs=['occupancy_map'],
+            outputs=['occupancy_tiles'],
+            parameters=dict(tile_size_px=args.occupancy_tile_size_px),
+        ),
+        mapping_pipeline.Step(
+            name='keyframes',
+            function=extract_keyframes,
+            kwargs=dict(
+                sensor_data_bag=sensor_data_bag,
+                poses_bag=poses_bag,
+                cuvgl_map_folder=cuvgl_map_folder,
+                log_folder=log_folder,
+                print_mode=args.print_mode,
+                num_shards=args.num_shards,
+                shard_overlap_s=args.shard_overlap_s,
+                num_workers=args.keyframe_workers,
+                rot_dist=args.keyframe_rot_dist,
+                trans_dist=args.keyframe_trans_dist,
+                append=args.update_map,
+            ),
+            inputs=['sensor_data_bag', 'poses'],
+            outputs=['keyframes'],
+            parameters=dict(
+                num_shards=args.num_shards,
+                shard_overlap_s=args.shard_overlap_s,
+                rot_dist=args.keyframe_rot_dist,
+                trans_dist=args.keyframe_trans_dist,
+                update_map=args.update_map,
+                tool_versions=get_package_versions(['isaac_mapping_ros']),
+            ),
+        ),
+        mapping_pipeline.Step(
+            name='cuvgl',
+            function=create_cuvgl_map,
+            kwargs=dict(
+                cuvgl_map_folder=cuvgl_map_folder,
+                log_folder=log_folder,
+                print_mode=args.print_mode,
+                prebuilt_bow_vocabulary_folder=args.prebuilt_bow_vocabulary_folder,
+                vocabulary_registry=vocabulary_registry,
+                vocabulary_key=vocabulary_key,
+                reuse_vocabulary=args.update_map,
+            ),
+            inputs=['keyframes'],
+            outputs=['cuvgl_map'],
+            parameters=dict(
+                prebuilt_bow_vocabulary=(
+                    mapping_pipeline.fingerprint_path(args.prebuilt_bow_vocabulary_folder)
+                    if args.prebuilt_bow_vocabulary_folder else None),
+                bow_vocabulary_key=vocabulary_key if vocabulary_registry else None,
+                update_map=args.update_map,
+                tool_versions=get_package_versions(['isaac_mapping_ros']),
+            ),
+        ),
+    ]
+
+
+def create_pipeline(args: argparse.Namespace, sensor_data_bag: pathlib.Path, timestamp: str,
+                    environment: dict[str, str]) -> tuple[mapping_pipeline.Pipeline, pathlib.Path]:
     # Setup the output folder.
-    timestamp = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
-    bag_name = args.sensor_data_bag.name
+    bag_name = sensor_data_bag.name
+    resumed_output_folder = None
     if not args.map_dir:
+        incomplete_run = run_journal.find_incomplete_run(args.base_output_folder, bag_name,
+                                                         sensor_data_bag)
+        if args.resume:
+            resumed_output_folder = incomplete_run
+        elif incomplete_run:
+            print(f'Starting a new run, pass --resume to continue the incomplete run in '
+                  f'{incomplete_run} instead.')
+    if args.map_dir:
+        output_folder = args.map_dir
+    elif resumed_output_folder:
+        output_folder = resumed_output_folder
+        print(f'Resuming the incomplete run in {output_folder}.')
+    else:
         output_folder = filesystem_utils.create_workdir(
             args.base_output_folder,
             f'{timestamp}_{bag_name}',
             allow_sudo=True,
         )
-    else:
-        output_folder = args.map_dir
-    print(f'Storing all maps and logs in {output_folder}.')
+    print(f'Storing all maps and logs of {bag_name} in {output_folder}.')
 
-    poses_bag = output_folder / 'poses'
     log_folder = output_folder / 'logs'
     log_folder.mkdir(parents=True, exist_ok=True)
+    cuvgl_map_folder = output_folder / 'cuvgl_map'
+    cuvgl_map_folder.mkdir(parents=True, exist_ok=True)
+
+    # Create the metadata file, or extend the one of a previous run in the same folder.
+    cache = mapping_pipeline.StepCache(output_folder / 'metadata.yaml',
+                                       get_artifact_paths(output_folder),
+                                       enabled=args.use_cache)
+    cache.metadata = {'output_folder': str(output_folder), **cache.metadata}
+    cache.set_artifact_fingerprint('sensor_data_bag',
+                                   mapping_pipeline.fingerprint_path(sensor_data_bag))
+
+    steps_to_run = args.steps_to_run if args.steps_to_run else (
+        UPDATE_STEPS if args.update_map else STEPS)
+    if not args.tile_occupancy_map:
+        steps_to_run = [s for s in steps_to_run if s != 'occupancy_tiles']
 
-    # Create a metadata file.
-    metadata_file = output_folder / 'metadata.yaml'
-    metadata_file.write_text(f'output_folder: {output_folder}\n')
+    # The journal tells a later run whether this run finished and where to resume it.
+    journal = run_journal.RunJournal(output_folder / run_journal.JOURNAL_FILE_NAME)
+    journal.append('run_started', sensor_data_bag=sensor_data_bag.resolve(), steps=steps_to_run)
 
-    steps_to_run = args.steps_to_run if args.steps_to_run else [
-        'cuvslam', 'occupancy', 'keyframes', 'cuvgl'
+    steps = [
+        s for s in get_steps(args, sensor_data_bag, output_folder, log_folder, journal)
+        if s.name in steps_to_run
     ]
+    for step in steps:
+        step.timeout_s = args.step_timeouts_s.get(step.name)
+        step.resources = get_step_resources(args, step.name)
+    pipeline = mapping_pipeline.Pipeline(bag_name, steps, cache, journal, environment)
+    return pipeline, output_folder
 
-    if 'cuvslam' in steps_to_run:
-        create_cuvslam_map(args.sensor_data_bag, output_folder, log_folder, args.print_mode)
 
-    if 'occupancy' in steps_to_run:
-        create_global_occupancy_map(args.sensor_data_bag, output_folder, log_folder,
-                                    args.replay_rate, args.stereo_camera_configuration,
-                                    args.print_mode, args.remap_tf)
+def main():
+    args = parse_args()
 
-    cuvgl_map_folder = output_folder / 'cuvgl_map'
-    cuvgl_map_folder.mkdir(parents=True, exist_ok=True)
-    if 'keyframes' in steps_to_run:
-        extract_keyframes(args.sensor_data_bag, poses_bag, cuvgl_map_folder, args.print_mode)
+    timestamp = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+    base_ros_domain_id = int(os.environ.get('ROS_DOMAIN_ID', 0))
+    pipelines = []
+    output_folders = {}
+    for index, sensor_data_bag in enumerate(args.sensor_data_bags):
+        environment = {}
+        if len(args.sensor_data_bags) > 1:
+            # Isolate the ROS graphs of rosbags that are replayed at the same time.
+            environment['ROS_DOMAIN_ID'] = str((base_ros_domain_id + index) % MAX_ROS_DOMAIN_ID)
+        pipeline, output_folder = create_pipeline(args, sensor_data_bag, timestamp, environment)
+        pipelines.append(pipeline)
+        output_folders[pipeline.name] = output_folder
 
-    if 'cuvgl' in steps_to_run:
-        create_cuvgl_map(cuvgl_map_folder, args.print_mode, args.prebuilt_bow_vocabulary_folder)
+    # Steps without a dependency between them are run concurrently, within and across rosbags.
+    budget = mapping_pipeline.ResourceBudget({
+        'gpu': args.gpu_slots,
+        'cpu': args.cpu_slots,
+        'memory_gb': args.memory_budget_gb,
+    })
+    errors = {}
+    try:
+        errors = mapping_pipeline.run_pipelines(pipelines, args.num_workers,
+                                                args.max_concurrent_pipelines, budget)
+    finally:
+        for pipeline in pipelines:
+            output_folder = output_folders[pipeline.name]
+            statuses = [
+                pipeline.telemetry[step.name].status if step.name in pipeline.telemetry else
+                'not started' for step in pipeline.steps
+            ]
+            if all(status in ['finished', 'skipped'] for status in statuses):
+                pipeline.journal.append('run_finished')
+                if args.update_map:
+                    pipeline.cache.metadata.setdefault('updates', []).append({
+                        'sensor_data_bag': str(args.sensor_data_bags[0].resolve()),
+                        'time': timestamp,
+                    })
+                    pipeline.cache.save()
+            else:
+                pipeline.journal.append('run_failed',
+                                        error=repr(errors.get(pipeline.name, 'interrupted')))
+            resource_telemetry.write_report(pipeline.telemetry, output_folder / 'timings.json')
+            if len(pipelines) > 1:
+                print(f'Steps of {pipeline.name}:')
+            resource_telemetry.print_summary(pipeline.telemetry)
 
-    print(f'All maps can be found in {output_folder}.')
+    if len(pipelines) == 1:
+        if errors:
+            raise errors[pipelines[0].name]
+        print(f'All maps can be found in {output_folders[pipelines[0].name]}.')
+        return
 
+    for pipeline in pipelines:
+        status = f'failed ({errors[pipeline.name]})' if pipeline.name in errors else 'finished'
+        print(f'{pipeline.name}: {status}, maps in {output_folders[pipeline.name]}.')
+    if errors:
+        sys.exit(f'Failed to create the maps of {len(errors)} of {len(pipelines)} rosbags.')
 
-def create_cuvslam_map(sensor_data_bag: pathlib.Path, output_folder: pathlib.Path,
-                       log_folder: pathlib.Path, print_mode: str):
-    # Extract the EDEX.
-    subprocess_utils.run_command(
-        mnemonic='Install pip requirements',
-        command=[
-            'python3', '-m', 'pip', 'install', '-r',
-            get_path('isaac_ros_rosbag_utils', 'requirements.txt')
-        ],
-        log_file=log_folder / 'install_requirements.log',
-        print_mode=print_mode,
-    )
-    edex_path = output_folder / 'edex'
-    subprocess_utils.run_command(
-        mnemonic='Extract EDEX',
-        command=[
-            'ros2',
-            'run',
-            'isaac_ros_rosbag_utils',
-            'extract_edex',
-            '--config_path',
-            get_path('isaac_ros_rosbag_utils', 'config/edex_extraction_nova.yaml'),
-            f'--rosbag_path={sensor_data_bag}',
-            f'--edex_path={edex_path}',
-        ],
-        log_file=log_folder / 'extract_edex.log',
-        print_mode=print_mode,
-    )
 
-    # Create the cuVSLAM map.
-    additional_path = get_path('isaac_ros_visual_slam', '../cuvslam/lib/').resolve()
-    ld_library_path = os.environ['LD_LIBRARY_PATH']
-    os.environ['LD_LIBRARY_PATH'] = f'{ld_library_path}:{additional_path}'
-    subprocess_utils.run_command(
-        mnemonic='Create cuVSLAM map',
-        command=[
+def count_tum_poses(tum_file: pathlib.Path) -> int:
+    if not tum_file.exists():
+        return 0
+    with open(tum_file) as file:
+        return sum(1 for line in file if line.strip() and not line.startswith('#'))
+
+
+def check_free_space(folder: pathlib.Path, required_bytes: int):
+    folder.mkdir(parents=True, exist_ok=True)
+    free_bytes = shutil.disk_usage(folder).free
+    if free_bytes < required_bytes:
+        print(f'Warning: only {resource_telemetry.format_bytes(free_bytes)} are free in {folder}, '
+              f'about {resource_telemetry.format_bytes(required_bytes)} might be needed.')
+
+
+async def create_cuvslam_map(sensor_data_bag: pathlib.Path, output_folder: pathlib.Path,
+                             log_folder: pathlib.Path, print_mode: str,
+                             edex_path: pathlib.Path | None = None, keep_edex: bool = False,
+                             max_fps: float | None = 15.0, write_poses: bool = False):
+    if edex_path is None:
+        edex_path = output_folder / 'edex'
+    async with process_supervisor.ProcessSupervisor(print_mode) as supervisor:
+        # Extract the EDEX.
+        requirements_file = get_path('isaac_ros_rosbag_utils', 'requirements.txt')
+        if pip_requirements.is_installed(requirements_file):
+            print('Pip requirements are already installed.')
+        else:
+            await supervisor.run(
+                mnemonic='Install pip requirements',
+                command=[sys.executable, '-m', 'pip', 'install', '-r', requirements_file],
+                log_file=log_folder / 'install_requirements.log',
+            )
+            pip_requirements.mark_installed(requirements_file)
+        # The EDEX holds the camera images and IMU data of the rosbag, it takes about as much
+        # space as the rosbag itself.
+        if edex_path.exists():
+            shutil.rmtree(edex_path)
+        check_free_space(edex_path.parent, get_size(sensor_data_bag))
+        await supervisor.run(
+            mnemonic='Extract EDEX',
+            command=[
+                'ros2',
+                'run',
+                'isaac_ros_rosbag_utils',
+                'extract_edex',
+                '--config_path',
+                get_path('isaac_ros_rosbag_utils', 'config/edex_extraction_nova.yaml'),
+                f'--rosbag_path={sensor_data_bag}',
+                f'--edex_path={edex_path}',
+            ],
+            log_file=log_folder / 'extract_edex.log',
+        )
+
+        # Create the cuVSLAM map.
+        additional_path = get_path('isaac_ros_visual_slam', '../cuvslam/lib/').resolve()
+        env = dict(os.environ)
+        env['LD_LIBRARY_PATH'] = f'{env["LD_LIBRARY_PATH"]}:{additional_path}'
+        command = [
             'ros2',
             'run',
             'isaac_ros_visual_slam',
@@ -172,127 +779,529 @@ def create_cuvslam_map(sensor_data_bag: pathlib.Path, output_folder: pathlib.Pat
             '--ros_frame_conversion=true',
             '--cfg_enable_slam=true',
             '--cfg_sync_slam',
-            '--max_fps=15',
             '--print_format=tum',
             f'--print_odom_poses={output_folder/"odom_poses.tum"}',
             f'--print_slam_poses={output_folder/"slam_poses.tum"}',
-        ],
-        log_file=log_folder / 'create_cuvslam_map.log',
-        print_mode=print_mode,
-    )
+        ]
+        if max_fps is not None:
+            command.append(f'--max_fps={max_fps:g}')
+        start_time = time.monotonic()
+        await supervisor.run(
+            mnemonic='Create cuVSLAM map',
+            command=command,
+            log_file=log_folder / 'create_cuvslam_map.log',
+            env=env,
+        )
+        duration_s = time.monotonic() - start_time
+
+    num_frames = count_tum_poses(output_folder / 'odom_poses.tum')
+    max_fps_description = f'{max_fps:g}' if max_fps is not None else 'unlimited'
+    print(f'cuVSLAM tracked {num_frames} frames in {duration_s:.1f}s '
+          f'({num_frames / duration_s:.1f} fps, max fps {max_fps_description}).')
+
+    # Store the poses as memory mappable tables, such that tools can look them up by time without
+    # parsing the text files.
+    for poses_name in ['odom_poses', 'slam_poses']:
+        tum_file = output_folder / f'{poses_name}.tum'
+        if tum_file.exists():
+            pose_store.PoseTable.from_tum(tum_file).save(output_folder / f'{poses_name}_table')
+
+    if write_poses:
+        # The keyframes are extracted from the poses of the cuVSLAM map instead of the ones
+        # recorded while creating the occupancy map.
+        poses_bag = output_folder / 'poses'
+        if poses_bag.exists():
+            shutil.rmtree(poses_bag)
+        # The poses are written for base_link like the visual_slam node publishes them.
+        rig_position, rig_orientation = pose_store.compose(
+            *bag_utils.get_static_transform(sensor_data_bag, 'base_link', CUVSLAM_RIG_FRAME),
+            np.zeros(3), np.array(CUVSLAM_RIG_ORIENTATION_IN_OPTICAL_FRAME))
+        poses = pose_store.PoseTable.load(output_folder / 'slam_poses_table').change_frame(
+            rig_position, rig_orientation)
+        num_poses = bag_utils.write_odometry_bag(poses, poses_bag, POSES_TOPIC,
+                                                 child_frame_id='base_link')
+        print(f'Wrote {num_poses} cuVSLAM poses of base_link to {poses_bag}.')
+
+    # The EDEX is only needed to create the cuVSLAM map. It is kept if creating the map failed to
+    # allow debugging.
+    if not keep_edex:
+        shutil.rmtree(edex_path)
 
 
-def create_global_occupancy_map(sensor_data_bag: pathlib.Path, output_folder: pathlib.Path,
-                                log_folder: pathlib.Path, replay_rate: float,
-                                stereo_camera_configuration: str, print_mode: str,
-                                remap_tf: bool = True):
-    print("Starting recording pose rosbag...")
+def copy_map_files(source: pathlib.Path, destination: pathlib.Path):
+    # nvblox appends its own file extensions to the path a map is saved to.
+    for path in [source, *source.parent.glob(f'{source.name}.*')]:
+        target = destination.with_name(destination.name + path.name[len(source.name):])
+        if path.is_dir():
+            shutil.copytree(path, target)
+        elif path.is_file():
+            shutil.copy2(path, target)
 
+
+def get_map_mtime(path: pathlib.Path) -> float | None:
+    """Return when a map saved with a path prefix was last modified, None if it does not exist."""
+    paths = [p for p in [path, *path.parent.glob(f'{path.name}.*')] if p.exists()]
+    return max((p.stat().st_mtime for p in paths), default=None)
+
+
+def get_occupancy_resume_point(journal: run_journal.RunJournal,
+                               poses_parts: list[pathlib.Path] | None
+                               ) -> tuple[pathlib.Path, int] | None:
+    """
+    Return the checkpoint and the stamp to resume the occupancy map from, or None to start over.
+
+    The replay is resumed at the stamp of the last checkpoint, or earlier if the recovered poses
+    end before it. Integrating some frames twice into the map is harmless, missing poses are not.
+    poses_parts is None if the poses are not recorded.
+    """
+    checkpoints = [
+        c for c in journal.get_resumable_events('occupancy', 'checkpoint')
+        if mapping_pipeline.artifact_exists(pathlib.Path(c['path']))
+    ]
+    if not checkpoints:
+        return None
+    if poses_parts is None:
+        return pathlib.Path(checkpoints[-1]['path']), checkpoints[-1]['stamp_ns']
+    last_pose_stamps_ns = [bag_utils.get_last_header_stamp_ns(part) for part in poses_parts]
+    last_pose_stamps_ns = [stamp for stamp in last_pose_stamps_ns if stamp is not None]
+    if not last_pose_stamps_ns:
+        return None
+    checkpoint = checkpoints[-1]
+    return pathlib.Path(checkpoint['path']), min(checkpoint['stamp_ns'], max(last_pose_stamps_ns))
+
+
+async def create_global_occupancy_map(sensor_data_bag: pathlib.Path, output_folder: pathlib.Path,
+                                      log_folder: pathlib.Path, replay_rate: float,
+                                      stereo_camera_configuration: str, print_mode: str,
+                                      journal: run_journal.RunJournal,
+                                      remap_tf: bool = True, replay_mode: str = 'realtime',
+                                      adaptive_replay_rate: bool = False,
+                                      max_replay_rate: float = 1.0,
+                                      recorder_startup_timeout_s: float = 30.0,
+                                      checkpoint_period_s: float = 600.0,
+                                      perceptor_shutdown_timeout_s: float = 1800.0,
+                                      resume: bool = False,
+                                      base_map: pathlib.Path | None = None,
+                                      record_poses: bool = True):
     # Create the occupancy map and store the poses:
     poses_bag = output_folder / 'poses'
+    poses_parts_folder = output_folder / 'poses_parts'
+    checkpoint_folder = output_folder / 'occupancy_checkpoints'
+    base_map_copy = output_folder / 'occupancy_base_map'
+
+    if base_map is not None and not mapping_pipeline.artifact_exists(base_map_copy):
+        if not mapping_pipeline.artifact_exists(base_map):
+            raise FileNotFoundError(f'No occupancy map to update found at {base_map}.')
+        # nvblox saves the updated map to the path of the base map, even if the update fails. Load
+        # the base map from a copy that is kept until the update finished.
+        copy_map_files(base_map, base_map_copy)
 
     # Remove the folder pose bag first if it exists
-    if poses_bag.exists():
+    if record_poses and poses_bag.exists():
         shutil.rmtree(poses_bag)
 
-    record_command = [
-        'ros2',
-        'bag',
-        'record',
-        '--storage',
-        'mcap',
-        '--output',
-        str(poses_bag),
-        '/visual_slam/vis/slam_odometry',
-    ]
+    # Every attempt of the step records the poses into a new part, the parts are merged at the end.
+    part_events = journal.get_resumable_events('occupancy', 'poses_part_started')
+    poses_parts = [(pathlib.Path(e['path']), e['start_stamp_ns']) for e in part_events]
+    poses_parts = [(path, stamp_ns) for path, stamp_ns in poses_parts if path.exists()]
+    resume_point = None
+    if resume:
+        resume_point = get_occupancy_resume_point(
+            journal, [path for path, _ in poses_parts] if record_poses else None)
+
+    start_offset_s = 0.0
+    if resume_point is None:
+        # Start over, the outputs of previous attempts can not be continued.
+        for folder in [poses_parts_folder, checkpoint_folder]:
+            if folder.exists():
+                shutil.rmtree(folder)
+        poses_parts = []
+        start_stamp_ns = None
+    else:
+        checkpoint, resume_stamp_ns = resume_point
+        bag_start_ns, _ = bag_utils.get_time_range(sensor_data_bag)
+        start_offset_s = max(0.0, (resume_stamp_ns - bag_start_ns) /
+                             bag_utils.NANOSECONDS_PER_SECOND - CHECKPOINT_REPLAY_MARGIN_S)
+        start_stamp_ns = bag_start_ns + int(start_offset_s * bag_utils.NANOSECONDS_PER_SECOND)
+        print(f'Resuming the occupancy map from checkpoint {checkpoint}, replaying the sensor '
+              f'data from {start_offset_s:.1f}s.')
+
+    # The map nvblox starts from. A checkpoint of an update already contains the base map.
+    load_map = None
+    if resume_point is not None:
+        load_map = checkpoint
+    elif base_map is not None:
+        load_map = base_map_copy
+
+    if record_poses:
+        poses_part = poses_parts_folder / f'part_{len(part_events)}'
+        poses_parts_folder.mkdir(parents=True, exist_ok=True)
+        journal.append('poses_part_started', step='occupancy', path=poses_part,
+                       start_stamp_ns=start_stamp_ns)
+        poses_parts.append((poses_part, start_stamp_ns))
 
-    record_rosbag = subprocess.Popen(
-        record_command,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        universal_newlines=True,
-        bufsize=1
-    )
-
-    rosbag_record_initialized = False
-    timeout = 30  # Timeout in seconds
-    start_time = time.time()
-
-    while not rosbag_record_initialized and time.time() - start_time < timeout:
-        output = record_rosbag.stdout.readline()
-        if output:
-            print(f"Subprocess output: {output.strip()}")
-            if "Recording..." in output:
-                rosbag_record_initialized = True
-                break
+    # Reasons why the map of this attempt can not be trusted. The checkpoints and pose parts are
+    # only removed once the map was created, such that a failed attempt can be resumed.
+    failures = []
+    map_start_time = time.time()
+    async with process_supervisor.ProcessSupervisor(print_mode) as supervisor:
+        record_rosbag = None
+        if record_poses:
+            record_command = [
+                'ros2',
+                'bag',
+                'record',
+                '--storage',
+                'mcap',
+                '--output',
+                poses_part,
+                POSES_TOPIC,
+            ]
+            if checkpoint_period_s > 0:
+                # Split the recording such that the poses up to the last checkpoint are in
+                # finalized storage files if the run is interrupted.
+                record_command += ['--max-bag-duration', str(max(1, int(checkpoint_period_s)))]
+            record_rosbag = await supervisor.start(
+                mnemonic='Record pose rosbag',
+                command=record_command,
+                log_file=log_folder / f'record_poses_{poses_part.name}.log',
+            )
+            # Without the poses the keyframes can not be extracted, don't start the replay before
+            # the recording is running.
+            await record_rosbag.wait_for_output('Recording...', recorder_startup_timeout_s)
+            print('Rosbag recording is running.')
+
+        checkpointer = None
+        if checkpoint_period_s > 0 or load_map is not None:
+            checkpointer_command = [
+                'ros2',
+                'run',
+                'isaac_ros_perceptor_bringup',
+                'occupancy_checkpointer.py',
+                f'--checkpoint_folder={checkpoint_folder}',
+                f'--period_s={checkpoint_period_s}',
+            ]
+            if load_map is not None:
+                checkpointer_command.append(f'--load_map={load_map}')
+                if replay_mode == 'realtime':
+                    # The player is started paused and only resumed once the map is loaded.
+                    checkpointer_command.append('--resume_player')
+            checkpointer = await supervisor.start(
+                mnemonic='Occupancy checkpointer',
+                command=checkpointer_command,
+                log_file=log_folder / 'occupancy_checkpointer.log',
+            )
+            checkpointer.add_output_callback(
+                r'Saved checkpoint (\S+) at stamp (\d+)',
+                lambda match: journal.append('checkpoint', step='occupancy', path=match[1],
+                                             stamp_ns=int(match[2])))
+
+        # Localize in the cuVSLAM map and create the occupancy map
+        command = [
+                'ros2',
+                'launch',
+                'nova_carter_bringup',
+                'perceptor.launch.py',
+                'nvblox_param_filename:=params/nvblox_global_mapping.yaml',
+                f'vslam_load_map_folder_path:={output_folder / "cuvslam_map"}',
+                'vslam_localize_on_startup:=True',
+                f'stereo_camera_configuration:={stereo_camera_configuration}',
+                f'nvblox_after_shutdown_map_save_path:={output_folder / "occupancy_map"}',
+                'nvblox_global_frame:=map',
+                'vslam_enable_slam:=True',
+            ]
+
+        if replay_mode == 'realtime':
+            command += [
+                'mode:=rosbag',
+                f'rosbag:={sensor_data_bag}',
+                f'replay_rate:={replay_rate}',
+                'replay_shutdown_on_exit:=True',
+            ]
+            replay_additional_args = []
+            if remap_tf:
+                replay_additional_args.append('--remap /tf:=/tf_old')
+            if resume_point is not None:
+                replay_additional_args.append(f'--start-offset {start_offset_s}')
+            if load_map is not None:
+                replay_additional_args.append('--start-paused')
+            if replay_additional_args:
+                command.append(f'replay_additional_args:={" ".join(replay_additional_args)}')
+
+            rate_controller = None
+            if adaptive_replay_rate:
+                rate_controller = await supervisor.start(
+                    mnemonic='Replay rate controller',
+                    command=[
+                        'ros2',
+                        'run',
+                        'isaac_ros_perceptor_bringup',
+                        'replay_rate_controller.py',
+                        f'--initial_rate={replay_rate}',
+                        f'--max_rate={max_replay_rate}',
+                        f'--stereo_camera_configuration={stereo_camera_configuration}',
+                    ],
+                    log_file=log_folder / 'replay_rate_controller.log',
+                )
+
+            returncode = await supervisor.run(
+                mnemonic='Create global occupancy map',
+                command=command,
+                log_file=log_folder / 'create_global_occupancy_map.log',
+                allow_failure=True,
+                shutdown_timeout_s=perceptor_shutdown_timeout_s,
+            )
+            if returncode != 0:
+                failures.append(f'The perceptor graph failed with code {returncode}.')
+            if rate_controller is not None:
+                await supervisor.stop(rate_controller)
+            if checkpointer is not None:
+                await supervisor.stop(checkpointer)
         else:
-            time.sleep(0.1)  # Short sleep to prevent CPU overuse
+            # The sensor abstraction layer does not start any data source in simulation mode, the
+            # sensor data is published by the paced player instead.
+            command.append('mode:=simulation')
+            perceptor = await supervisor.start(
+                mnemonic='Create global occupancy map',
+                command=command,
+                log_file=log_folder / 'create_global_occupancy_map.log',
+                shutdown_timeout_s=perceptor_shutdown_timeout_s,
+            )
+            if load_map is not None:
+                await checkpointer.wait_for_output('Checkpointer is ready',
+                                                   CHECKPOINTER_STARTUP_TIMEOUT_S)
+            returncode = await supervisor.run(
+                mnemonic='Paced rosbag replay',
+                command=[
+                    'ros2',
+                    'run',
+                    'isaac_ros_perceptor_bringup',
+                    'paced_rosbag_player.py',
+                    f'--rosbag={sensor_data_bag}',
+                    f'--stereo_camera_configuration={stereo_camera_configuration}',
+                    f'--start_offset_s={start_offset_s}',
+                    '--remap_tf' if remap_tf else '--no-remap_tf',
+                ],
+                log_file=log_folder / 'paced_rosbag_player.log',
+                allow_failure=True,
+            )
+            if returncode != 0:
+                failures.append(f'The paced rosbag replay failed with code {returncode}.')
+            if checkpointer is not None:
+                await supervisor.stop(checkpointer)
+            # Shutting down the graph makes nvblox save the map.
+            if not await supervisor.stop(perceptor):
+                failures.append('The perceptor graph did not shut down cleanly, nvblox might not '
+                                'have saved the map.')
 
-    if not rosbag_record_initialized:
-        print("Failed to record rosbag or timed out")
-        record_rosbag.terminate()
-    else:
-        print("Rosbag recording is running")
+        if record_rosbag is not None:
+            await supervisor.stop(record_rosbag)
 
-    print("Creating global occupancy map...")
+    # nvblox saves the map to the path of the base map when updating, a map that exists is not
+    # necessarily from this attempt.
+    map_mtime = get_map_mtime(output_folder / 'occupancy_map')
+    if map_mtime is None or map_mtime < map_start_time:
+        failures.append(f'nvblox did not save the occupancy map to {output_folder}.')
+    if failures:
+        raise RuntimeError('Creating the occupancy map failed, keeping its checkpoints to resume '
+                           'from: ' + ' '.join(failures))
 
-    # Localize in the cuVSLAM map and create the occupancy map
-    command = [
-            'ros2',
-            'launch',
-            'nova_carter_bringup',
-            'perceptor.launch.py',
-            'nvblox_param_filename:=params/nvblox_global_mapping.yaml',
-            'mode:=rosbag',
-            f'rosbag:={sensor_data_bag}',
-            f'vslam_load_map_folder_path:={output_folder / "cuvslam_map"}',
-            'vslam_localize_on_startup:=True',
-            f'replay_rate:={replay_rate}',
-            f'stereo_camera_configuration:={stereo_camera_configuration}',
-            f'nvblox_after_shutdown_map_save_path:={output_folder / "occupancy_map"}',
-            'replay_shutdown_on_exit:=True',
-            'nvblox_global_frame:=map',
-            'vslam_enable_slam:=True',
-        ]
+    if record_poses and len(poses_parts) == 1:
+        shutil.move(poses_part, poses_bag)
+    elif record_poses:
+        # Every part ends where the replay of the next part started.
+        end_stamps_ns = [start_stamp_ns for _, start_stamp_ns in poses_parts[1:]] + [None]
+        num_poses = bag_utils.merge_bags(
+            [(path, end_stamp_ns) for (path, _), end_stamp_ns in zip(poses_parts, end_stamps_ns)],
+            poses_bag)
+        print(f'Merged {num_poses} poses from {len(poses_parts)} recordings into {poses_bag}.')
+    if poses_parts_folder.exists():
+        shutil.rmtree(poses_parts_folder)
+    if checkpoint_folder.exists():
+        shutil.rmtree(checkpoint_folder)
+    for path in [base_map_copy, *output_folder.glob(f'{base_map_copy.name}.*')]:
+        if path.is_dir():
+            shutil.rmtree(path)
+        elif path.is_file():
+            path.unlink()
 
-    if remap_tf:
-        command.append('replay_additional_args:=--remap /tf:=/tf_old')
 
-    subprocess_utils.run_command(
-        mnemonic='Create global occupancy map',
-        command=command,
-        log_file=log_folder / 'create_global_occupancy_map.log',
-        print_mode=print_mode,
-        allow_failure=True,
-    )
+def tile_occupancy_map(output_folder: pathlib.Path, tile_size_px: int):
+    map_yaml_file = output_folder / 'occupancy_map.yaml'
+    if not map_yaml_file.exists():
+        raise FileNotFoundError(f'No occupancy map found at {map_yaml_file}.')
+    tiles_folder = output_folder / 'occupancy_map_tiles'
+    report = occupancy_map_tiles.tile_occupancy_map(map_yaml_file, tiles_folder, tile_size_px)
+    print(f'Stored the occupancy map as {report.num_tiles} tiles in {tiles_folder}, skipping '
+          f'{report.num_skipped_tiles} unknown tiles: '
+          f'{resource_telemetry.format_bytes(report.original_bytes)} -> '
+          f'{resource_telemetry.format_bytes(report.tiled_bytes)} '
+          f'(compression ratio {report.compression_ratio:.1f}), loading the full map takes '
+          f'{report.original_load_time_s:.2f}s -> {report.tiled_load_time_s:.2f}s.')
 
-    record_rosbag.terminate()
-    record_rosbag.wait()
 
+def count_keyframes(keyframes_folder: pathlib.Path) -> int:
+    # Every keyframe stores one image per camera, named by its timestamp.
+    return len({
+        p.stem for p in keyframes_folder.rglob('*')
+        if p.suffix.lower() in KEYFRAME_IMAGE_SUFFIXES
+    })
 
-def extract_keyframes(sensor_data_bag: pathlib.Path, poses_bag: pathlib.Path,
-                      cuvgl_map_folder: pathlib.Path, print_mode: str):
-    # Extract keyframes.
+
+async def extract_keyframes(sensor_data_bag: pathlib.Path, poses_bag: pathlib.Path,
+                            cuvgl_map_folder: pathlib.Path, log_folder: pathlib.Path,
+                            print_mode: str, num_shards: int = 1, shard_overlap_s: float = 5.0,
+                            num_workers: int = 1, rot_dist: float = 5.0, trans_dist: float = 0.2,
+                            append: bool = False):
+    # Extract keyframes. When appending to an existing map, the keyframes are extracted into a
+    # separate folder first and only added to the map once all of them were extracted.
     keyframes_folder = cuvgl_map_folder / 'keyframes'
-    command = [
-        'ros2',
-        'run',
-        'isaac_mapping_ros',
-        'run_rosbag_to_mapping_data.py',
-        f'--sensor_data_bag={sensor_data_bag}',
-        f'--pose_bag={poses_bag}',
-        f'--output_folder={keyframes_folder}',
-        '--extract_feature',
-        '--rot_dist=5',
-        '--trans_dist=0.2',
-        f'--print_mode={print_mode}',
-    ]
-    subprocess.run(command, check=True)
+    extraction_folder = cuvgl_map_folder / 'keyframes_update' if append else keyframes_folder
+    if append and extraction_folder.exists():
+        shutil.rmtree(extraction_folder)
+    start_time = time.monotonic()
+    async with process_supervisor.ProcessSupervisor(print_mode) as supervisor:
+        if num_shards <= 1:
+            await run_keyframe_extraction(supervisor, sensor_data_bag, poses_bag,
+                                          extraction_folder, log_folder / 'extract_keyframes.log',
+                                          rot_dist, trans_dist)
+        else:
+            await extract_keyframes_from_shards(supervisor, sensor_data_bag, poses_bag,
+                                                extraction_folder, log_folder, num_shards,
+                                                shard_overlap_s, num_workers, rot_dist, trans_dist)
+
+    duration_s = time.monotonic() - start_time
+    num_keyframes = count_keyframes(extraction_folder)
+    print(f'Extracted {num_keyframes} keyframes in {duration_s:.1f}s '
+          f'({num_keyframes / duration_s:.2f} keyframes/s).')
+
+    if append:
+        num_existing_keyframes = count_keyframes(keyframes_folder)
+        # Keyframes of the new rosbag must not replace (or be replaced by) keyframes of the map.
+        map_folder_utils.merge_keyframe_folders([extraction_folder], keyframes_folder)
+        shutil.rmtree(extraction_folder)
+        num_merged_keyframes = count_keyframes(keyframes_folder)
+        if num_merged_keyframes != num_existing_keyframes + num_keyframes:
+            raise RuntimeError(f'Adding {num_keyframes} keyframes to the {num_existing_keyframes} '
+                               f'keyframes of the existing map resulted in {num_merged_keyframes} '
+                               'keyframes.')
+        print(f'Added {num_keyframes} keyframes to the {num_existing_keyframes} keyframes of the '
+              f'existing map.')
+
+
+async def extract_keyframes_from_shards(supervisor: process_supervisor.ProcessSupervisor,
+                                        sensor_data_bag: pathlib.Path, poses_bag: pathlib.Path,
+                                        keyframes_folder: pathlib.Path, log_folder: pathlib.Path,
+                                        num_shards: int, shard_overlap_s: float, num_workers: int,
+                                        rot_dist: float, trans_dist: float):
+    # Split the sensor data bag into time windows, extract the keyframes of every window in
+    # parallel and merge them back into a single keyframes folder. Every shard also reads the
+    # shard_overlap_s before its window to warm up the keyframe selection, but only keeps the
+    # keyframes of its own window.
+    shards_folder = keyframes_folder.with_name(f'{keyframes_folder.name}_shards')
+    if shards_folder.exists():
+        shutil.rmtree(shards_folder)
+    time_ranges = bag_utils.get_shard_time_ranges(sensor_data_bag, num_shards, shard_overlap_s)
+    shard_folders = [shards_folder / f'shard_{i}' for i in range(num_shards)]
+    # At most num_workers shards are written and processed at the same time.
+    workers = asyncio.Semaphore(num_workers)
+
+    async def extract(i: int, shard_folder: pathlib.Path, start_ns: int, end_ns: int):
+        async with workers:
+            await extract_keyframes_from_shard(supervisor, executor, sensor_data_bag, poses_bag,
+                                               shard_folder, start_ns, end_ns,
+                                               log_folder / f'extract_keyframes_shard_{i}.log',
+                                               rot_dist, trans_dist)
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=num_workers) as executor:
+        await asyncio.gather(*[
+            extract(i, shard_folder, start_ns, end_ns)
+            for i, (shard_folder, ((start_ns, end_ns), _)) in enumerate(
+                zip(shard_folders, time_ranges))
+        ])
+
+    if keyframes_folder.exists():
+        shutil.rmtree(keyframes_folder)
+    num_keyframes = map_folder_utils.merge_keyframe_folders(
+        [shard_folder / 'keyframes' for shard_folder in shard_folders], keyframes_folder,
+        [owned_range for _, owned_range in time_ranges])
+    shutil.rmtree(shards_folder)
+    print(f'Merged {num_keyframes} keyframes from {num_shards} shards into {keyframes_folder}.')
+
+
+async def extract_keyframes_from_shard(supervisor: process_supervisor.ProcessSupervisor,
+                                       executor: concurrent.futures.Executor,
+                                       sensor_data_bag: pathlib.Path, poses_bag: pathlib.Path,
+                                       shard_folder: pathlib.Path, start_ns: int, end_ns: int,
+                                       log_file: pathlib.Path, rot_dist: float, trans_dist: float):
+    shard_folder.mkdir(parents=True, exist_ok=True)
+    shard_bag = shard_folder / 'sensor_data'
+    await asyncio.get_running_loop().run_in_executor(executor, bag_utils.write_shard,
+                                                     sensor_data_bag, shard_bag, start_ns, end_ns)
+    await run_keyframe_extraction(supervisor, shard_bag, poses_bag, shard_folder / 'keyframes',
+                                  log_file, rot_dist, trans_dist)
+    shutil.rmtree(shard_bag)
 
 
-def create_cuvgl_map(cuvgl_map_folder: pathlib.Path,
-                     print_mode: str,
-                     prebuilt_bow_vocabulary_folder: pathlib.Path = None):
+async def run_keyframe_extraction(supervisor: process_supervisor.ProcessSupervisor,
+                                  sensor_data_bag: pathlib.Path, poses_bag: pathlib.Path,
+                                  keyframes_folder: pathlib.Path, log_file: pathlib.Path,
+                                  rot_dist: float, trans_dist: float):
+    await supervisor.run(
+        mnemonic=f'Extract keyframes from {sensor_data_bag.name}',
+        command=[
+            'ros2',
+            'run',
+            'isaac_mapping_ros',
+            'run_rosbag_to_mapping_data.py',
+            f'--sensor_data_bag={sensor_data_bag}',
+            f'--pose_bag={poses_bag}',
+            f'--output_folder={keyframes_folder}',
+            '--extract_feature',
+            f'--rot_dist={rot_dist:g}',
+            f'--trans_dist={trans_dist:g}',
+            # The output is filtered by the supervisor.
+            '--print_mode=all',
+        ],
+        log_file=log_file,
+    )
+
+
+async def create_cuvgl_map(cuvgl_map_folder: pathlib.Path,
+                           log_folder: pathlib.Path,
+                           print_mode: str,
+                           prebuilt_bow_vocabulary_folder: pathlib.Path = None,
+                           vocabulary_registry: (
+                               bow_vocabulary_registry.BowVocabularyRegistry | None) = None,
+                           vocabulary_key: dict[str, str] | None = None,
+                           reuse_vocabulary: bool = False):
+    with tempfile.TemporaryDirectory() as temporary_folder:
+        existing_vocabulary_folder = cuvgl_map_folder / BOW_VOCABULARY_FOLDER_NAME
+        if not prebuilt_bow_vocabulary_folder and reuse_vocabulary and \
+                existing_vocabulary_folder.is_dir():
+            # The vocabulary is written to the map folder again, don't read and write the same
+            # files.
+            prebuilt_bow_vocabulary_folder = pathlib.Path(temporary_folder) / \
+                BOW_VOCABULARY_FOLDER_NAME
+            shutil.copytree(existing_vocabulary_folder, prebuilt_bow_vocabulary_folder)
+            print(f'Using the BoW vocabulary of the existing map {existing_vocabulary_folder}.')
+        await run_cuvgl_map_creation(cuvgl_map_folder, log_folder, print_mode,
+                                     prebuilt_bow_vocabulary_folder, vocabulary_registry,
+                                     vocabulary_key)
+
+
+async def run_cuvgl_map_creation(cuvgl_map_folder: pathlib.Path, log_folder: pathlib.Path,
+                                 print_mode: str,
+                                 prebuilt_bow_vocabulary_folder: pathlib.Path | None,
+                                 vocabulary_registry: (
+                                     bow_vocabulary_registry.BowVocabularyRegistry | None),
+                                 vocabulary_key: dict[str, str] | None):
+    if not prebuilt_bow_vocabulary_folder and vocabulary_registry:
+        prebuilt_bow_vocabulary_folder = vocabulary_registry.lookup(vocabulary_key)
+        if prebuilt_bow_vocabulary_folder:
+            print(f'Using the registered BoW vocabulary {prebuilt_bow_vocabulary_folder}.')
+    train_vocabulary = not prebuilt_bow_vocabulary_folder
+
     # Create global localization map.
     command = [
         'ros2',
@@ -301,11 +1310,26 @@ def create_cuvgl_map(cuvgl_map_folder: pathlib.Path,
         'create_cuvgl_map.py',
         f'--map_folder={cuvgl_map_folder}',
         '--no-extract_feature',
-        f'--print_mode={print_mode}',
+        # The output is filtered by the supervisor.
+        '--print_mode=all',
     ]
     if prebuilt_bow_vocabulary_folder:
         command.append(f'--prebuilt_bow_vocabulary_folder={prebuilt_bow_vocabulary_folder}')
-    subprocess.run(command, check=True)
+    async with process_supervisor.ProcessSupervisor(print_mode) as supervisor:
+        await supervisor.run(
+            mnemonic='Create cuVGL map',
+            command=command,
+            log_file=log_folder / 'create_cuvgl_map.log',
+        )
+
+    if train_vocabulary and vocabulary_registry:
+        vocabulary_folder = cuvgl_map_folder / BOW_VOCABULARY_FOLDER_NAME
+        if vocabulary_folder.is_dir():
+            registered_folder = vocabulary_registry.store(vocabulary_key, vocabulary_folder)
+            print(f'Registered the trained BoW vocabulary as {registered_folder}.')
+        else:
+            print(f'Warning: no trained BoW vocabulary found in {vocabulary_folder}, it is not '
+                  'registered.')
 
 
 if __name__ == '__main__':
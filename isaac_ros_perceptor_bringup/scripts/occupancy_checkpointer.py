@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# SPDX-FileCopyrightText: NVIDIA CORPORATION & AFFILIATES
+# Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+"""
+Periodically save the map of a running nvblox node while a rosbag is replayed.
+
+Every checkpoint is tagged with the sensor data time up to which the map was integrated, i.e. the
+oldest of the stamps of the depth images nvblox integrated last per camera. When resuming, the
+checkpointer first loads a previously saved map into nvblox and then resumes the (paused) rosbag
+player.
+"""
+
+import argparse
+import pathlib
+
+from nvblox_msgs.srv import FilePath
+import rclpy
+from rclpy.node import Node
+from rclpy.qos import qos_profile_sensor_data
+from rosbag2_interfaces.srv import Resume
+from sensor_msgs.msg import PointCloud2
+
+from isaac_ros_perceptor_python_utils import bag_utils
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Periodically save the nvblox map.')
+    parser.add_argument(
+        '--checkpoint_folder',
+        required=True,
+        type=pathlib.Path,
+        help='Folder the checkpoints are saved to.',
+    )
+    parser.add_argument(
+        '--period_s',
+        type=float,
+        default=600.0,
+        help='Wall-clock period in which checkpoints are saved, 0 to only load a checkpoint.',
+    )
+    parser.add_argument(
+        '--load_map',
+        type=pathlib.Path,
+        default=None,
+        help='Checkpoint to load into nvblox before the replay is resumed.',
+    )
+    parser.add_argument(
+        '--resume_player',
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help='If set, resume the paused rosbag player once the checkpointer is ready.',
+    )
+    parser.add_argument(
+        '--integrated_depth_topic',
+        default='/nvblox_node/back_projected_depth',
+        help='Topic on which nvblox publishes every depth image it integrated, back projected. '
+        'nvblox only back projects the depth images while this is subscribed.',
+    )
+    parser.add_argument(
+        '--nvblox_node',
+        default='/nvblox_node',
+        help='Name of the nvblox node.',
+    )
+    parser.add_argument(
+        '--player_node',
+        default='/rosbag2_player',
+        help='Name of the rosbag player node.',
+    )
+    parser.add_argument(
+        '--service_timeout_s',
+        type=float,
+        default=120.0,
+        help='Time to wait for the nvblox and rosbag player services.',
+    )
+    return parser.parse_known_args()[0]
+
+
+class OccupancyCheckpointer(Node):
+
+    def __init__(self, args: argparse.Namespace):
+        super().__init__('occupancy_checkpointer')
+        self.args = args
+        # Stamp of the depth image integrated last, by the frame of its camera.
+        self.integrated_stamps_ns = {}
+        self.last_checkpoint_stamp_ns = None
+        self.pending_request = None
+
+        self.create_subscription(PointCloud2, args.integrated_depth_topic,
+                                 self.on_integrated_depth, qos_profile_sensor_data, raw=True)
+        self.save_map_client = self.create_client(FilePath, f'{args.nvblox_node}/save_map')
+        self.load_map_client = self.create_client(FilePath, f'{args.nvblox_node}/load_map')
+        self.resume_client = self.create_client(Resume, f'{args.player_node}/resume')
+
+    def on_integrated_depth(self, data: bytes):
+        stamp_ns, frame_id = bag_utils.parse_serialized_header(data)
+        self.integrated_stamps_ns[frame_id] = max(stamp_ns,
+                                                  self.integrated_stamps_ns.get(frame_id, 0))
+
+    def get_integrated_stamp_ns(self) -> int | None:
+        # Every camera integrated its depth up to this stamp.
+        return min(self.integrated_stamps_ns.values(), default=None)
+
+    def call(self, client, request, description: str):
+        if not client.wait_for_service(timeout_sec=self.args.service_timeout_s):
+            raise TimeoutError(f"Service '{client.srv_name}' is not available.")
+        future = client.call_async(request)
+        rclpy.spin_until_future_complete(self, future, timeout_sec=self.args.service_timeout_s)
+        if future.result() is None:
+            raise TimeoutError(f'Failed to {description}.')
+        return future.result()
+
+    def start(self):
+        if self.args.load_map:
+            request = FilePath.Request()
+            request.file_path = str(self.args.load_map)
+            if not self.call(self.load_map_client, request, 'load the map').success:
+                raise RuntimeError(f'nvblox failed to load {self.args.load_map}.')
+            self.get_logger().info(f'Loaded checkpoint {self.args.load_map}.')
+        if self.args.resume_player:
+            self.call(self.resume_client, Resume.Request(), 'resume the rosbag player')
+            self.get_logger().info('Resumed the rosbag player.')
+        if self.args.period_s > 0:
+            self.args.checkpoint_folder.mkdir(parents=True, exist_ok=True)
+            self.create_timer(self.args.period_s, self.on_timer)
+        self.get_logger().info('Checkpointer is ready.')
+
+    def on_timer(self):
+        if self.pending_request is not None and not self.pending_request.done():
+            self.get_logger().warn('Previous checkpoint is still being saved.')
+            return
+        stamp_ns = self.get_integrated_stamp_ns()
+        if stamp_ns is None or stamp_ns == self.last_checkpoint_stamp_ns:
+            return
+        if not self.save_map_client.service_is_ready():
+            self.get_logger().warn('nvblox does not offer the save_map service (yet).')
+            return
+        checkpoint = self.args.checkpoint_folder / f'occupancy_{stamp_ns}'
+        request = FilePath.Request()
+        request.file_path = str(checkpoint)
+        self.pending_request = self.save_map_client.call_async(request)
+        self.pending_request.add_done_callback(
+            lambda future: self.on_saved(future, checkpoint, stamp_ns))
+
+    def on_saved(self, future, checkpoint: pathlib.Path, stamp_ns: int):
+        if future.result() is None or not future.result().success:
+            self.get_logger().error(f'Failed to save checkpoint {checkpoint}.')
+            return
+        self.last_checkpoint_stamp_ns = stamp_ns
+        # The output is parsed by create_map.py.
+        self.get_logger().info(f'Saved checkpoint {checkpoint} at stamp {stamp_ns}.')
+
+
+def main():
+    args = parse_args()
+    rclpy.init()
+    checkpointer = OccupancyCheckpointer(args)
+    try:
+        checkpointer.start()
+        rclpy.spin(checkpointer)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        checkpointer.destroy_node()
+        rclpy.try_shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# SPDX-FileCopyrightText: NVIDIA CORPORATION & AFFILIATES
+# Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+"""
+Replay a rosbag as fast as the perceptor graph consumes it.
+
+Instead of replaying at a fixed rate relative to wall-clock time, the left images of every stereo
+camera that nvblox integrates are paced: a frame is only published once fewer than
+max_frames_in_flight earlier frames of the camera wait for their depth image. Frames are tracked by
+their header stamp, a depth image acknowledges the frame with its stamp and all earlier ones (e.g.
+frames skipped by ESS on purpose). No frame is ever dropped, if the graph stalls the replay fails.
+All other topics are published in bag order in between, and /clock is driven by the bag timestamps.
+"""
+
+import argparse
+import pathlib
+import threading
+import time
+
+import rclpy
+from rclpy.duration import Duration
+from rclpy.executors import SingleThreadedExecutor
+from rclpy.node import Node
+from rclpy.qos import DurabilityPolicy, QoSProfile, ReliabilityPolicy, qos_profile_sensor_data
+from rosgraph_msgs.msg import Clock
+from rosidl_runtime_py.utilities import get_message
+import rosbag2_py
+import yaml
+
+from isaac_ros_perceptor_python_utils import bag_utils, perceptor_configuration
+
+# Topics that are only published once (with transient local durability) and must be replayed even
+# if the replay starts after they were recorded.
+LATCHED_TOPICS = ['/tf_static']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Replay a rosbag paced by back-pressure.')
+    parser.add_argument(
+        '--rosbag',
+        required=True,
+        type=pathlib.Path,
+        help='Path to the rosbag to replay.',
+    )
+    parser.add_argument(
+        '--stereo_camera_configuration',
+        default='front_left_right_configuration',
+        help='Stereo camera configuration the graph runs, the cameras with nvblox are paced.',
+    )
+    parser.add_argument(
+        '--max_frames_in_flight',
+        type=int,
+        default=2,
+        help='Number of frames per camera that may be published before their depth arrived. Must '
+        'be larger than the number of frames ESS skips in a row.',
+    )
+    parser.add_argument(
+        '--feedback_warning_s',
+        type=float,
+        default=5.0,
+        help='Period at which frames still waiting for their depth are reported.',
+    )
+    parser.add_argument(
+        '--feedback_timeout_s',
+        type=float,
+        default=300.0,
+        help='Time without depth for a waiting frame after which the replay fails.',
+    )
+    parser.add_argument(
+        '--queue_size',
+        type=int,
+        default=100,
+        help='Depth of the reliable publisher queues.',
+    )
+    parser.add_argument(
+        '--startup_timeout_s',
+        type=float,
+        default=120.0,
+        help='Time to wait for the graph to subscribe to the paced topic.',
+    )
+    parser.add_argument(
+        '--start_delay_s',
+        type=float,
+        default=5.0,
+        help='Additional delay after the graph subscribed, e.g. for NITROS type negotiation.',
+    )
+    parser.add_argument(
+        '--start_offset_s',
+        type=float,
+        default=0.0,
+        help='Start the replay this many seconds into the rosbag.',
+    )
+    parser.add_argument(
+        '--remap_tf',
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help='If set, remap /tf to /tf_old.',
+    )
+    return parser.parse_known_args()[0]
+
+
+class PacedRosbagPlayer(Node):
+
+    def __init__(self, args: argparse.Namespace):
+        super().__init__('paced_rosbag_player')
+        self.args = args
+
+        self.reader = rosbag2_py.SequentialReader()
+        self.reader.open(
+            rosbag2_py.StorageOptions(uri=str(args.rosbag)),
+            rosbag2_py.ConverterOptions('', ''),
+        )
+
+        self.clock_publisher = self.create_publisher(Clock, '/clock', 10)
+        self.publishers_by_topic = {}
+        for topic in self.reader.get_all_topics_and_types():
+            if topic.name == '/clock':
+                continue
+            output_topic = topic.name
+            if args.remap_tf and topic.name == '/tf':
+                output_topic = '/tf_old'
+            qos = QoSProfile(depth=args.queue_size, reliability=ReliabilityPolicy.RELIABLE)
+            if topic.name == '/tf_static':
+                qos.durability = DurabilityPolicy.TRANSIENT_LOCAL
+            self.publishers_by_topic[topic.name] = self.create_publisher(
+                get_message(topic.type), output_topic, qos)
+
+        # The depth images of a camera are the feedback for its left images, see nvblox.launch.py.
+        configuration = perceptor_configuration.resolve_perceptor_configuration(
+            args.stereo_camera_configuration, disable_cuvslam=False, disable_nvblox=False,
+            disable_vgl=False)
+        cameras = configuration.get_cameras_with('nvblox')
+        if not cameras:
+            raise ValueError(f"No camera of '{args.stereo_camera_configuration}' runs nvblox, "
+                             'there is no depth to pace the replay with.')
+        self.cameras_by_paced_topic = {f'/{camera}/left/image_raw': camera for camera in cameras}
+        # ESS may skip the last frame of these cameras, which is then never acknowledged.
+        self.skipping_cameras = configuration.get_cameras_with('ess_skip_frames')
+        for topic in self.cameras_by_paced_topic:
+            if topic not in self.publishers_by_topic:
+                raise ValueError(f"Paced topic '{topic}' is not in the rosbag.")
+
+        self.feedback_condition = threading.Condition()
+        # Stamps of the frames that wait for their depth, by camera.
+        self.outstanding_stamps_ns = {camera: set() for camera in cameras}
+        for camera in cameras:
+            self.create_subscription(
+                get_message('sensor_msgs/msg/Image'),
+                f'/{camera}/depth',
+                lambda data, camera=camera: self.on_feedback(camera, data),
+                qos_profile_sensor_data,
+                raw=True,
+            )
+
+    def on_feedback(self, camera: str, data: bytes):
+        stamp_ns, _ = bag_utils.parse_serialized_header(data)
+        with self.feedback_condition:
+            self.outstanding_stamps_ns[camera] = {
+                s for s in self.outstanding_stamps_ns[camera] if s > stamp_ns}
+            self.feedback_condition.notify_all()
+
+    def wait_for_graph(self):
+        start_time = time.monotonic()
+        for topic in self.cameras_by_paced_topic:
+            while self.publishers_by_topic[topic].get_subscription_count() == 0:
+                if time.monotonic() - start_time > self.args.startup_timeout_s:
+                    raise TimeoutError(f"Nothing subscribed to '{topic}' after "
+                                       f'{self.args.startup_timeout_s}s.')
+                time.sleep(0.1)
+            self.get_logger().info(f"Graph subscribed to '{topic}'.")
+        time.sleep(self.args.start_delay_s)
+
+    def wait_for_feedback(self, camera: str, max_outstanding: int):
+        """Block until at most max_outstanding frames of the camera wait for their depth."""
+        start_time = time.monotonic()
+        with self.feedback_condition:
+            while not self.feedback_condition.wait_for(
+                    lambda: len(self.outstanding_stamps_ns[camera]) <= max_outstanding,
+                    timeout=self.args.feedback_warning_s):
+                stamps_ns = sorted(self.outstanding_stamps_ns[camera])
+                waiting_s = time.monotonic() - start_time
+                if waiting_s > self.args.feedback_timeout_s:
+                    raise TimeoutError(f'No depth for the frames {stamps_ns} of {camera} after '
+                                       f'{waiting_s:.0f}s, the graph stalled.')
+                self.get_logger().warning(f'Waiting {waiting_s:.0f}s for the depth of the frames '
+                                          f'{stamps_ns} of {camera}.')
+
+    def seek(self, start_offset_s: float):
+        metadata = yaml.safe_load((self.args.rosbag / 'metadata.yaml').read_text())
+        start_ns = metadata['rosbag2_bagfile_information']['starting_time'][
+            'nanoseconds_since_epoch']
+        latched_topics = [t for t in LATCHED_TOPICS if t in self.publishers_by_topic]
+        if latched_topics:
+            self.reader.set_filter(rosbag2_py.StorageFilter(topics=latched_topics))
+            while self.reader.has_next():
+                topic, data, _ = self.reader.read_next()
+                self.publishers_by_topic[topic].publish(data)
+            self.reader.reset_filter()
+        self.reader.seek(start_ns + int(start_offset_s * 1_000_000_000))
+        self.get_logger().info(f'Starting the replay {start_offset_s:.1f}s into the rosbag.')
+
+    def play(self):
+        self.wait_for_graph()
+        if self.args.start_offset_s > 0:
+            self.seek(self.args.start_offset_s)
+        self.get_logger().info('Starting paced replay.')
+
+        num_paced_messages = 0
+        last_clock_ns = None
+        start_time = time.monotonic()
+        while self.reader.has_next():
+            topic, data, timestamp_ns = self.reader.read_next()
+            if topic not in self.publishers_by_topic:
+                continue
+            if self.args.start_offset_s > 0 and topic in LATCHED_TOPICS:
+                # Already published when seeking.
+                continue
+
+            camera = self.cameras_by_paced_topic.get(topic)
+            if camera is not None:
+                # Block until the graph caught up to within max_frames_in_flight frames.
+                self.wait_for_feedback(camera, self.args.max_frames_in_flight - 1)
+                with self.feedback_condition:
+                    self.outstanding_stamps_ns[camera].add(
+                        bag_utils.parse_serialized_header(data)[0])
+
+            if last_clock_ns is None or timestamp_ns > last_clock_ns:
+                clock = Clock()
+                clock.clock.sec, clock.clock.nanosec = divmod(timestamp_ns, 1_000_000_000)
+                self.clock_publisher.publish(clock)
+                last_clock_ns = timestamp_ns
+
+            self.publishers_by_topic[topic].publish(data)
+
+            if camera is not None:
+                num_paced_messages += 1
+                self.publishers_by_topic[topic].wait_for_all_acked(
+                    Duration(seconds=self.args.feedback_timeout_s))
+                if num_paced_messages % 100 == 0:
+                    rate = num_paced_messages / (time.monotonic() - start_time)
+                    self.get_logger().info(f'Replayed {num_paced_messages} frames '
+                                           f'({rate:.1f} frames/s).')
+
+        for camera in self.outstanding_stamps_ns:
+            self.wait_for_feedback(camera, 1 if camera in self.skipping_cameras else 0)
+        duration = time.monotonic() - start_time
+        self.get_logger().info(f'Replayed {num_paced_messages} frames in {duration:.1f}s.')
+
+
+def main():
+    args = parse_args()
+    rclpy.init()
+    player = PacedRosbagPlayer(args)
+    executor = SingleThreadedExecutor()
+    executor.add_node(player)
+    spin_thread = threading.Thread(target=executor.spin, daemon=True)
+    spin_thread.start()
+    try:
+        player.play()
+    finally:
+        executor.shutdown()
+        player.destroy_node()
+        rclpy.try_shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# SPDX-FileCopyrightText: NVIDIA CORPORATION & AFFILIATES
+# Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+"""
+Load the composable nodes of a launch plan into their containers, without evaluating launch files.
+
+Nodes are loaded in waves, see launch_plan_cache.get_load_waves. The requests of a wave are sent
+concurrently, so containers do not wait for a round trip per node and several containers load their
+nodes in parallel. A single container still handles its load requests one after another, the time
+reported per node is the time the container took for it.
+"""
+
+import argparse
+import pathlib
+import sys
+import time
+
+from composition_interfaces.srv import LoadNode
+import rclpy
+from rclpy.node import Node
+
+from isaac_ros_perceptor_python_utils import launch_plan_cache
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Load the composable nodes of a launch plan.')
+    parser.add_argument(
+        '--plan_file',
+        required=True,
+        type=pathlib.Path,
+        help='Launch plan written by create_launch_plan.py.',
+    )
+    parser.add_argument(
+        '--service_timeout_s',
+        type=float,
+        default=120.0,
+        help='Time to wait for a container to offer its load_node service and to load a node.',
+    )
+    parser.add_argument(
+        '--max_concurrent_loads',
+        type=int,
+        default=8,
+        help='Maximum number of load requests in flight, 1 to load the nodes one by one in the '
+        'order of the launch files.',
+    )
+    return parser.parse_known_args()[0]
+
+
+class LaunchPlanPlayer(Node):
+
+    def __init__(self, args: argparse.Namespace):
+        super().__init__('launch_plan_player')
+        self.args = args
+        self.clients_by_container = {}
+
+    def get_client(self, container_name: str):
+        if container_name not in self.clients_by_container:
+            self.clients_by_container[container_name] = self.create_client(
+                LoadNode, f'{container_name}/_container/load_node')
+        return self.clients_by_container[container_name]
+
+    def load_nodes(self, nodes: list[launch_plan_cache.PlannedNode]):
+        for node in nodes:
+            if not self.get_client(node.container_name).wait_for_service(
+                    timeout_sec=self.args.service_timeout_s):
+                raise TimeoutError(f"Container '{node.container_name}' is not available.")
+
+        send_time = time.perf_counter()
+        futures = [self.get_client(node.container_name).call_async(node.request) for node in nodes]
+        done_times = {}
+        for index, future in enumerate(futures):
+            future.add_done_callback(
+                lambda _, index=index: done_times.setdefault(index, time.perf_counter()))
+        deadline = send_time + self.args.service_timeout_s
+        while len(done_times) < len(futures) and time.perf_counter() < deadline:
+            rclpy.spin_once(self, timeout_sec=0.1)
+
+        # A container handles its requests one after another, in the order they were sent.
+        last_done_time_by_container = {}
+        for index, (node, future) in enumerate(zip(nodes, futures)):
+            response = future.result() if future.done() else None
+            if response is None:
+                raise TimeoutError(
+                    f"Timed out loading '{node.name}' into '{node.container_name}'.")
+            if not response.success:
+                raise RuntimeError(f"Failed to load '{node.name}' into '{node.container_name}': "
+                                   f'{response.error_message}')
+            start_time = last_done_time_by_container.get(node.container_name, send_time)
+            last_done_time_by_container[node.container_name] = done_times[index]
+            self.get_logger().info(
+                f"Loaded '{response.full_node_name}' into '{node.container_name}' in "
+                f'{done_times[index] - start_time:.2f}s.')
+
+    def replay(self, plan: launch_plan_cache.LaunchPlan):
+        start_time = time.perf_counter()
+        if self.args.max_concurrent_loads > 1:
+            waves = launch_plan_cache.get_load_waves(plan.nodes)
+        else:
+            waves = [[node] for node in plan.nodes]
+        for wave in waves:
+            for i in range(0, len(wave), self.args.max_concurrent_loads):
+                self.load_nodes(wave[i:i + self.args.max_concurrent_loads])
+        self.get_logger().info(f'Loaded {len(plan.nodes)} composable nodes in {len(waves)} waves '
+                               f'in {time.perf_counter() - start_time:.2f}s.')
+
+
+def main():
+    args = parse_args()
+    plan = launch_plan_cache.LaunchPlan.load(args.plan_file)
+    rclpy.init()
+    player = LaunchPlanPlayer(args)
+    try:
+        player.replay(plan)
+    except (RuntimeError, TimeoutError) as error:
+        player.get_logger().error(str(error))
+        sys.exit(1)
+    finally:
+        player.destroy_node()
+        rclpy.try_shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# SPDX-FileCopyrightText: NVIDIA CORPORATION & AFFILIATES
+# Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+"""
+Adapt the playback rate of a running rosbag player to what the perceptor graph sustains.
+
+The controller follows the camera infos that accompany the replayed images and the depth images of
+every camera running nvblox, instead of the images themselves, such that no image is copied into
+it. From their header stamps it measures how far the depth lags behind the replayed frames, which
+grows as soon as the graph falls behind and before its queues overflow and frames are dropped. The
+rate is increased step by step while the lag stays small and (almost) no frames are lost, and
+halved otherwise.
+"""
+
+import argparse
+
+import rclpy
+from rclpy.node import Node
+from rclpy.qos import qos_profile_sensor_data
+from rosbag2_interfaces.srv import SetRate
+from sensor_msgs.msg import CameraInfo
+
+from isaac_ros_perceptor_python_utils import bag_utils
+from isaac_ros_perceptor_python_utils import perceptor_configuration
+
+NANOSECONDS_PER_SECOND = 1_000_000_000
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Adapt the replay rate of a rosbag player.')
+    parser.add_argument(
+        '--initial_rate',
+        type=float,
+        default=0.1,
+        help='Replay rate the player was started with.',
+    )
+    parser.add_argument(
+        '--min_rate',
+        type=float,
+        default=0.05,
+        help='Lower bound for the replay rate.',
+    )
+    parser.add_argument(
+        '--max_rate',
+        type=float,
+        default=1.0,
+        help='Upper bound for the replay rate.',
+    )
+    parser.add_argument(
+        '--increase_factor',
+        type=float,
+        default=1.2,
+        help='Factor by which the rate is increased if the graph keeps up.',
+    )
+    parser.add_argument(
+        '--decrease_factor',
+        type=float,
+        default=0.5,
+        help='Factor by which the rate is decreased if the graph falls behind.',
+    )
+    parser.add_argument(
+        '--max_drop_ratio',
+        type=float,
+        default=0.02,
+        help='Ratio of input frames without output that is still considered keeping up.',
+    )
+    parser.add_argument(
+        '--control_period_s',
+        type=float,
+        default=10.0,
+        help='Wall-clock period in which frames are counted before adapting the rate.',
+    )
+    parser.add_argument(
+        '--min_frames_per_period',
+        type=int,
+        default=10,
+        help='Periods with fewer input frames (e.g. before the replay started) are ignored.',
+    )
+    parser.add_argument(
+        '--max_lag_s',
+        type=float,
+        default=0.5,
+        help='Sensor time by which the output may lag behind the input before the rate is '
+        'decreased.',
+    )
+    parser.add_argument(
+        '--stereo_camera_configuration',
+        default='front_left_right_configuration',
+        help='Stereo camera configuration the graph runs, the cameras with nvblox are followed.',
+    )
+    parser.add_argument(
+        '--player_node',
+        default='/rosbag2_player',
+        help='Name of the rosbag player node.',
+    )
+    return parser.parse_known_args()[0]
+
+
+class ReplayRateController(Node):
+
+    def __init__(self, args: argparse.Namespace):
+        super().__init__('replay_rate_controller')
+        self.args = args
+        self.rate = args.initial_rate
+        self.num_input_frames = 0
+        self.num_output_frames = 0
+        self.max_lag_ns = 0
+        self.skip_next_period = False
+        self.pending_rate = None
+
+        # The depth of a camera is published along with the camera info of its left camera, see
+        # nvblox.launch.py.
+        configuration = perceptor_configuration.resolve_perceptor_configuration(
+            args.stereo_camera_configuration, disable_cuvslam=False, disable_nvblox=False,
+            disable_vgl=False)
+        cameras = configuration.get_cameras_with('nvblox')
+        if not cameras:
+            raise ValueError(f"No camera of '{args.stereo_camera_configuration}' runs nvblox, "
+                             'there is no depth to follow.')
+        self.last_input_stamps_ns = {camera: None for camera in cameras}
+        # Only the headers are read, subscribe to the serialized data to avoid deserialization.
+        for camera in cameras:
+            self.create_subscription(CameraInfo, f'/{camera}/left/camera_info',
+                                     lambda data, camera=camera: self.on_input(camera, data),
+                                     qos_profile_sensor_data, raw=True)
+            self.create_subscription(CameraInfo, f'/{camera}/camera_info',
+                                     lambda data, camera=camera: self.on_output(camera, data),
+                                     qos_profile_sensor_data, raw=True)
+        self.set_rate_client = self.create_client(SetRate, f'{args.player_node}/set_rate')
+        self.create_timer(args.control_period_s, self.on_timer)
+
+    def on_input(self, camera: str, data: bytes):
+        self.num_input_frames += 1
+        self.last_input_stamps_ns[camera], _ = bag_utils.parse_serialized_header(data)
+
+    def on_output(self, camera: str, data: bytes):
+        self.num_output_frames += 1
+        stamp_ns, _ = bag_utils.parse_serialized_header(data)
+        last_input_stamp_ns = self.last_input_stamps_ns[camera]
+        if last_input_stamp_ns is not None:
+            self.max_lag_ns = max(self.max_lag_ns, last_input_stamp_ns - stamp_ns)
+
+    def on_timer(self):
+        num_input_frames, num_output_frames = self.num_input_frames, self.num_output_frames
+        max_lag_s = self.max_lag_ns / NANOSECONDS_PER_SECOND
+        self.num_input_frames, self.num_output_frames, self.max_lag_ns = 0, 0, 0
+        if num_input_frames < self.args.min_frames_per_period:
+            return
+        if self.skip_next_period:
+            # Give the graph one period to drain its queues after slowing down.
+            self.skip_next_period = False
+            return
+
+        drop_ratio = max(0.0, 1.0 - num_output_frames / num_input_frames)
+        if drop_ratio <= self.args.max_drop_ratio and max_lag_s <= self.args.max_lag_s:
+            rate = min(self.rate * self.args.increase_factor, self.args.max_rate)
+        else:
+            rate = max(self.rate * self.args.decrease_factor, self.args.min_rate)
+            self.skip_next_period = True
+        self.get_logger().info(
+            f'{num_output_frames}/{num_input_frames} frames processed (drop ratio '
+            f'{drop_ratio:.3f}, max lag {max_lag_s:.2f}s) at replay rate {self.rate:.3f}.')
+        if rate != self.rate:
+            self.set_rate(rate)
+
+    def set_rate(self, rate: float):
+        if self.pending_rate is not None:
+            self.get_logger().warn(f'Still changing the replay rate to {self.pending_rate:.3f}.')
+            return
+        if not self.set_rate_client.service_is_ready():
+            self.get_logger().warn('Rosbag player does not offer the set_rate service (yet).')
+            return
+        request = SetRate.Request()
+        request.rate = rate
+        self.get_logger().info(f'Changing replay rate from {self.rate:.3f} to {rate:.3f}.')
+        self.pending_rate = rate
+        self.set_rate_client.call_async(request).add_done_callback(self.on_rate_set)
+
+    def on_rate_set(self, future):
+        # The rate only changes once the player confirmed it, otherwise the next period retries.
+        rate, self.pending_rate = self.pending_rate, None
+        if future.exception() is not None or not future.result().success:
+            self.get_logger().error(f'Rosbag player did not change the replay rate to {rate:.3f}.')
+            return
+        self.rate = rate
+
+
+def main():
+    args = parse_args()
+    rclpy.init()
+    controller = ReplayRateController(args)
+    try:
+        rclpy.spin(controller)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        controller.destroy_node()
+        rclpy.try_shutdown()
+
+
+if __name__ == '__main__':
+    main()
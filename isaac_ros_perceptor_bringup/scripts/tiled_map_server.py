@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# SPDX-FileCopyrightText: NVIDIA CORPORATION & AFFILIATES
+# Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+"""
+Serve the region of a tiled occupancy map around the robot.
+
+The map is read from the tiles written by create_map.py. Only the tiles overlapping the region
+around the robot are loaded, a limited number of them is cached. The region is published as
+occupancy grid with the same QoS as the nav2 map server, and published again once the robot moved
+far enough from the center of the last published region.
+
+Until the robot is localized in the map, the region around the initial pose is served if one is
+given (as argument or on the initial pose topic), and the whole map otherwise, such that the robot
+can be localized anywhere in it.
+"""
+
+import argparse
+import pathlib
+
+from geometry_msgs.msg import Pose, PoseWithCovarianceStamped
+from nav_msgs.msg import OccupancyGrid
+import rclpy
+from rclpy.node import Node
+from rclpy.qos import DurabilityPolicy, QoSProfile, ReliabilityPolicy
+import rclpy.time
+import tf2_ros
+
+from isaac_ros_perceptor_python_utils import occupancy_map_tiles
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Serve the region of a tiled occupancy map '
+                                     'around the robot.')
+    parser.add_argument(
+        '--tiles_folder',
+        default='',
+        help='Folder of the tiled occupancy map, i.e. occupancy_map_tiles of a map folder.',
+    )
+    parser.add_argument(
+        '--map_yaml_file',
+        default='',
+        help='Occupancy map yaml file of a map folder. If --tiles_folder is not given, the tiles '
+        'created next to it by create_map.py are served.',
+    )
+    parser.add_argument(
+        '--map_frame',
+        default='map',
+        help='Frame of the occupancy map.',
+    )
+    parser.add_argument(
+        '--robot_frame',
+        default='base_link',
+        help='Frame of the robot, the region around it is served.',
+    )
+    parser.add_argument(
+        '--region_size_m',
+        type=float,
+        default=100.0,
+        help='Width and height of the served region.',
+    )
+    parser.add_argument(
+        '--update_distance_m',
+        type=float,
+        default=20.0,
+        help='Distance the robot has to move from the center of the served region before the '
+        'region is updated.',
+    )
+    parser.add_argument(
+        '--initial_x',
+        type=float,
+        default=None,
+        help='Center of the region served until the pose of the robot is known, defaults to '
+        'serving the whole map.',
+    )
+    parser.add_argument(
+        '--initial_y',
+        type=float,
+        default=None,
+        help='Center of the region served until the pose of the robot is known, defaults to '
+        'serving the whole map.',
+    )
+    parser.add_argument(
+        '--initial_pose_topic',
+        default='/initialpose',
+        help='Topic of the initial pose estimate, the region around it is served until the pose '
+        'of the robot is known.',
+    )
+    parser.add_argument(
+        '--cache_size',
+        type=int,
+        default=64,
+        help='Maximum number of decoded tiles kept in memory.',
+    )
+    parser.add_argument(
+        '--update_period_s',
+        type=float,
+        default=1.0,
+        help='Period in which the pose of the robot is checked.',
+    )
+    parser.add_argument(
+        '--topic',
+        default='/map',
+        help='Topic the occupancy grid is published on.',
+    )
+    args = parser.parse_known_args()[0]
+    if args.tiles_folder:
+        args.tiles_folder = pathlib.Path(args.tiles_folder)
+    elif args.map_yaml_file:
+        args.tiles_folder = pathlib.Path(args.map_yaml_file).parent / 'occupancy_map_tiles'
+    else:
+        parser.error('Either --tiles_folder or --map_yaml_file is required.')
+    return args
+
+
+class TiledMapServer(Node):
+
+    def __init__(self, args: argparse.Namespace):
+        super().__init__('tiled_map_server')
+        self.args = args
+        self.map = occupancy_map_tiles.TiledOccupancyMap(args.tiles_folder, args.cache_size)
+        self.center = None
+        self.localized = False
+        self.tf_buffer = tf2_ros.Buffer()
+        self.tf_listener = tf2_ros.TransformListener(self.tf_buffer, self)
+        # Same QoS as the nav2 map server, such that late subscribers receive the map.
+        qos = QoSProfile(depth=1, durability=DurabilityPolicy.TRANSIENT_LOCAL,
+                         reliability=ReliabilityPolicy.RELIABLE)
+        self.publisher = self.create_publisher(OccupancyGrid, args.topic, qos)
+        self.create_subscription(PoseWithCovarianceStamped, args.initial_pose_topic,
+                                 self.on_initial_pose, 1)
+        self.create_timer(args.update_period_s, self.on_timer)
+        self.get_logger().info(f'Serving {len(self.map.tiles)} tiles from {args.tiles_folder}.')
+        if args.initial_x is not None and args.initial_y is not None:
+            self.publish_region_around(args.initial_x, args.initial_y)
+        else:
+            self.publish_region(*self.map.bounds)
+
+    def on_initial_pose(self, message: PoseWithCovarianceStamped):
+        if self.localized:
+            return
+        self.publish_region_around(message.pose.pose.position.x, message.pose.pose.position.y)
+
+    def on_timer(self):
+        try:
+            transform = self.tf_buffer.lookup_transform(self.args.map_frame,
+                                                        self.args.robot_frame, rclpy.time.Time())
+        except tf2_ros.TransformException:
+            return
+        x = transform.transform.translation.x
+        y = transform.transform.translation.y
+        distance_m = ((x - self.center[0])**2 + (y - self.center[1])**2)**0.5
+        if not self.localized or distance_m >= self.args.update_distance_m:
+            self.localized = True
+            self.publish_region_around(x, y)
+
+    def publish_region_around(self, x: float, y: float):
+        half_size_m = self.args.region_size_m / 2
+        self.publish_region(x - half_size_m, y - half_size_m, x + half_size_m, y + half_size_m)
+
+    def publish_region(self, min_x: float, min_y: float, max_x: float, max_y: float):
+        image, (origin_x, origin_y) = self.map.read_region(min_x, min_y, max_x, max_y)
+        x, y = (min_x + max_x) / 2, (min_y + max_y) / 2
+        self.center = (x, y)
+        if image.size == 0:
+            self.get_logger().warn(f'No tiles around ({x:.1f}, {y:.1f}).')
+            return
+
+        message = OccupancyGrid()
+        message.header.frame_id = self.args.map_frame
+        message.header.stamp = self.get_clock().now().to_msg()
+        message.info.map_load_time = message.header.stamp
+        message.info.resolution = float(self.map.resolution)
+        message.info.height, message.info.width = image.shape
+        message.info.origin = Pose()
+        message.info.origin.position.x = float(origin_x)
+        message.info.origin.position.y = float(origin_y)
+        message.info.origin.orientation.w = 1.0
+        # Image rows go from top to bottom, occupancy grid rows start at the origin.
+        values = occupancy_map_tiles.to_occupancy_values(image, self.map.map_parameters)
+        message.data = values[::-1].flatten().tolist()
+        self.publisher.publish(message)
+        self.get_logger().info(f'Published the {image.shape[1]}x{image.shape[0]} region around '
+                               f'({x:.1f}, {y:.1f}).')
+
+
+def main():
+    args = parse_args()
+    rclpy.init()
+    server = TiledMapServer(args)
+    try:
+        rclpy.spin(server)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.destroy_node()
+        rclpy.try_shutdown()
+
+
+if __name__ == '__main__':
+    main()
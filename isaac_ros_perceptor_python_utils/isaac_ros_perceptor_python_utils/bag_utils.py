@@ -0,0 +1,255 @@
+# SPDX-FileCopyrightText: NVIDIA CORPORATION & AFFILIATES
+# Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import pathlib
+import struct
+from typing import Iterator
+
+from nav_msgs.msg import Odometry
+import numpy as np
+from rclpy.serialization import deserialize_message, serialize_message
+from rosidl_runtime_py.utilities import get_message
+import rosbag2_py
+from tf2_msgs.msg import TFMessage
+import yaml
+
+from isaac_ros_perceptor_python_utils import pose_store
+
+NANOSECONDS_PER_SECOND = 1_000_000_000
+
+# Topics that are only published once (with transient local durability) and are needed by every
+# part of a rosbag.
+LATCHED_TOPICS = ['/tf_static']
+
+STORAGE_IDS = {'.mcap': 'mcap', '.db3': 'sqlite3'}
+
+
+def get_time_range(bag: pathlib.Path) -> tuple[int, int]:
+    """Return the start and end time of a rosbag in nanoseconds, read from its metadata."""
+    metadata = yaml.safe_load((bag / 'metadata.yaml').read_text())
+    info = metadata['rosbag2_bagfile_information']
+    start_ns = info['starting_time']['nanoseconds_since_epoch']
+    return start_ns, start_ns + info['duration']['nanoseconds']
+
+
+def get_shard_time_ranges(bag: pathlib.Path, num_shards: int,
+                          overlap_s: float) -> list[tuple[tuple[int, int], tuple[int, int]]]:
+    """
+    Split the time range of a rosbag into equally long windows.
+
+    Returns the time range to read and the [start_ns, end_ns) time range owned by every shard. The
+    owned time ranges do not overlap. A shard additionally reads overlap_s before its owned time
+    range, such that processing that depends on previous messages (e.g. distance based keyframe
+    selection) is warmed up at its start. Results in the warm-up must be dropped.
+    """
+    start_ns, end_ns = get_time_range(bag)
+    overlap_ns = int(overlap_s * NANOSECONDS_PER_SECOND)
+    shard_duration_ns = (end_ns - start_ns) / num_shards
+    time_ranges = []
+    for i in range(num_shards):
+        shard_start_ns = int(start_ns + i * shard_duration_ns)
+        shard_end_ns = int(start_ns + (i + 1) * shard_duration_ns)
+        if i == num_shards - 1:
+            # The last shard also owns the messages received at the end of the rosbag.
+            shard_end_ns = end_ns + 1
+        read_range = (max(start_ns, shard_start_ns - overlap_ns), min(end_ns, shard_end_ns))
+        time_ranges.append((read_range, (shard_start_ns, shard_end_ns)))
+    return time_ranges
+
+
+def open_reader(bag: pathlib.Path, storage_id: str = '') -> rosbag2_py.SequentialReader:
+    reader = rosbag2_py.SequentialReader()
+    reader.open(rosbag2_py.StorageOptions(uri=str(bag), storage_id=storage_id),
+                rosbag2_py.ConverterOptions('', ''))
+    return reader
+
+
+def open_writer(bag: pathlib.Path, storage_id: str = 'mcap') -> rosbag2_py.SequentialWriter:
+    writer = rosbag2_py.SequentialWriter()
+    writer.open(rosbag2_py.StorageOptions(uri=str(bag), storage_id=storage_id),
+                rosbag2_py.ConverterOptions('', ''))
+    return writer
+
+
+def write_shard(bag: pathlib.Path, shard_bag: pathlib.Path, start_ns: int, end_ns: int):
+    """
+    Copy all messages of a rosbag received in [start_ns, end_ns] to a new rosbag.
+
+    Messages on latched topics are copied regardless of when they were received.
+    """
+    reader = open_reader(bag)
+    writer = open_writer(shard_bag)
+    topics = [topic.name for topic in reader.get_all_topics_and_types()]
+    for topic in reader.get_all_topics_and_types():
+        writer.create_topic(topic)
+
+    latched_topics = [topic for topic in LATCHED_TOPICS if topic in topics]
+    if latched_topics:
+        reader.set_filter(rosbag2_py.StorageFilter(topics=latched_topics))
+        while reader.has_next():
+            writer.write(*reader.read_next())
+        reader.reset_filter()
+
+    reader.seek(start_ns)
+    while reader.has_next():
+        topic, data, timestamp_ns = reader.read_next()
+        if timestamp_ns > end_ns:
+            break
+        if topic in latched_topics:
+            continue
+        writer.write(topic, data, timestamp_ns)
+    # The rosbag is only finalized once the writer is destroyed.
+    del writer
+
+
+def get_storage_files(bag: pathlib.Path) -> list[pathlib.Path]:
+    """Return the storage files of a (split) rosbag in the order they were recorded."""
+    files = [p for p in bag.iterdir() if p.suffix in STORAGE_IDS]
+    # Split storage files are named <bag name>_<index>.<extension>.
+    return sorted(files, key=lambda p: int(p.stem.rpartition('_')[2] or 0))
+
+
+def read_recoverable_messages(bag: pathlib.Path) -> Iterator[tuple[str, str, bytes, int]]:
+    """
+    Read all messages of a rosbag whose recording might have been interrupted.
+
+    A recorder that did not shut down cleanly neither wrote the metadata file nor finalized its
+    last storage file. The storage files are therefore read one by one, and reading a file stops
+    at the first message that can not be read. Yields (topic, type, data, timestamp_ns).
+    """
+    for storage_file in get_storage_files(bag):
+        try:
+            reader = open_reader(storage_file, STORAGE_IDS[storage_file.suffix])
+            types = {t.name: t.type for t in reader.get_all_topics_and_types()}
+            while reader.has_next():
+                topic, data, timestamp_ns = reader.read_next()
+                yield topic, types[topic], data, timestamp_ns
+        except RuntimeError as error:
+            print(f'Could not read all messages from {storage_file}: {error}')
+
+
+def get_header_stamp_ns(message_type: str, data: bytes) -> int:
+    header = deserialize_message(data, get_message(message_type)).header
+    return header.stamp.sec * NANOSECONDS_PER_SECOND + header.stamp.nanosec
+
+
+def parse_serialized_header(data: bytes) -> tuple[int, str]:
+    """Return the stamp and frame id of a serialized message that starts with a std_msgs/Header."""
+    # Read from the CDR buffer directly, such that e.g. images do not need to be deserialized. The
+    # encapsulation header tells the byte order, the stamp and the length of the frame id follow.
+    byte_order = '<' if data[1] == 1 else '>'
+    sec, nanosec, frame_id_length = struct.unpack_from(f'{byte_order}iII', data, 4)
+    # The length of the frame id includes its null terminator.
+    frame_id = data[16:16 + frame_id_length - 1].decode()
+    return sec * NANOSECONDS_PER_SECOND + nanosec, frame_id
+
+
+def get_last_header_stamp_ns(bag: pathlib.Path) -> int | None:
+    stamps = [get_header_stamp_ns(message_type, data)
+              for _, message_type, data, _ in read_recoverable_messages(bag)]
+    return max(stamps, default=None)
+
+
+def merge_bags(parts: list[tuple[pathlib.Path, int | None]], output_bag: pathlib.Path) -> int:
+    """
+    Merge rosbags that were recorded one after the other into a single rosbag.
+
+    Every part is given with an optional end stamp: messages of the part whose header stamp is not
+    before the end stamp are dropped, e.g. because the next part recorded them again. Returns the
+    number of messages written.
+    """
+    writer = open_writer(output_bag)
+    known_topics = set()
+    num_messages = 0
+    for part, end_stamp_ns in parts:
+        for topic, message_type, data, timestamp_ns in read_recoverable_messages(part):
+            if end_stamp_ns is not None and \
+                    get_header_stamp_ns(message_type, data) >= end_stamp_ns:
+                continue
+            if topic not in known_topics:
+                writer.create_topic(
+                    rosbag2_py.TopicMetadata(name=topic, type=message_type,
+                                             serialization_format='cdr'))
+                known_topics.add(topic)
+            writer.write(topic, data, timestamp_ns)
+            num_messages += 1
+    del writer
+    return num_messages
+
+
+def get_static_transform(bag: pathlib.Path, parent_frame: str,
+                         child_frame: str) -> tuple[np.ndarray, np.ndarray]:
+    """Return the position and orientation of child_frame in parent_frame from /tf_static."""
+    # The parent and transform of every frame, the static transforms form a tree.
+    parents = {}
+    reader = open_reader(bag)
+    reader.set_filter(rosbag2_py.StorageFilter(topics=['/tf_static']))
+    while reader.has_next():
+        _, data, _ = reader.read_next()
+        for transform in deserialize_message(data, TFMessage).transforms:
+            translation = transform.transform.translation
+            rotation = transform.transform.rotation
+            parents[transform.child_frame_id] = (
+                transform.header.frame_id,
+                np.array([translation.x, translation.y, translation.z]),
+                np.array([rotation.x, rotation.y, rotation.z, rotation.w]),
+            )
+
+    def get_path_to_root(frame: str) -> list[str]:
+        path = [frame]
+        while path[-1] in parents:
+            path.append(parents[path[-1]][0])
+        return path
+
+    def get_pose_in(ancestor: str, frame: str) -> tuple[np.ndarray, np.ndarray]:
+        position, orientation = np.zeros(3), np.array([0.0, 0.0, 0.0, 1.0])
+        while frame != ancestor:
+            frame, parent_position, parent_orientation = parents[frame]
+            position, orientation = pose_store.compose(parent_position, parent_orientation,
+                                                       position, orientation)
+        return position, orientation
+
+    parent_path = get_path_to_root(parent_frame)
+    common_frame = next((f for f in get_path_to_root(child_frame) if f in parent_path), None)
+    if common_frame is None:
+        raise ValueError(f"No static transform from '{parent_frame}' to '{child_frame}' in {bag}.")
+    return pose_store.compose(*pose_store.invert(*get_pose_in(common_frame, parent_frame)),
+                              *get_pose_in(common_frame, child_frame))
+
+
+def write_odometry_bag(pose_table: pose_store.PoseTable, output_bag: pathlib.Path, topic: str,
+                       frame_id: str = 'map', child_frame_id: str = 'base_link') -> int:
+    """Write the poses of a table as odometry messages, received at their stamps."""
+    writer = open_writer(output_bag)
+    writer.create_topic(
+        rosbag2_py.TopicMetadata(name=topic, type='nav_msgs/msg/Odometry',
+                                 serialization_format='cdr'))
+    message = Odometry()
+    message.header.frame_id = frame_id
+    message.child_frame_id = child_frame_id
+    for stamp_ns, position, orientation in zip(pose_table.stamps_ns, pose_table.positions,
+                                               pose_table.orientations):
+        stamp_ns = int(stamp_ns)
+        message.header.stamp.sec, message.header.stamp.nanosec = divmod(stamp_ns,
+                                                                        NANOSECONDS_PER_SECOND)
+        pose = message.pose.pose
+        pose.position.x, pose.position.y, pose.position.z = (float(v) for v in position)
+        pose.orientation.x, pose.orientation.y, pose.orientation.z, pose.orientation.w = (
+            float(v) for v in orientation)
+        writer.write(topic, serialize_message(message), stamp_ns)
+    del writer
+    return len(pose_table)
@@ -0,0 +1,79 @@
+# SPDX-FileCopyrightText: NVIDIA CORPORATION & AFFILIATES
+# Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import hashlib
+import json
+import pathlib
+import shutil
+import tempfile
+
+import yaml
+
+from isaac_ros_perceptor_python_utils import cache_utils
+
+METADATA_FILE_NAME = 'registry_entry.yaml'
+
+
+def get_default_folder() -> pathlib.Path:
+    return cache_utils.get_cache_folder() / 'bow_vocabularies'
+
+
+class BowVocabularyRegistry:
+    """
+    Local store of trained cuVGL bag-of-words vocabularies.
+
+    Vocabularies are registered under a key describing what they were trained on, e.g. the site
+    and the camera configuration. Maps of the same site can reuse the vocabulary instead of
+    training it again.
+    """
+
+    def __init__(self, folder: pathlib.Path):
+        self.folder = pathlib.Path(folder)
+
+    def get_entry_folder(self, key: dict[str, str]) -> pathlib.Path:
+        digest = hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+        readable = '_'.join(str(v) for v in key.values() if v).replace('/', '_')
+        return self.folder / f'{readable}_{digest[:12]}'
+
+    def lookup(self, key: dict[str, str]) -> pathlib.Path | None:
+        entry_folder = self.get_entry_folder(key)
+        # The metadata file is written last, entries without it are incomplete.
+        if (entry_folder / METADATA_FILE_NAME).exists():
+            return entry_folder / 'vocabulary'
+        return None
+
+    def store(self, key: dict[str, str], vocabulary_folder: pathlib.Path) -> pathlib.Path:
+        """Copy a trained vocabulary into the registry, keeping an existing entry for the key."""
+        entry_folder = self.get_entry_folder(key)
+        if self.lookup(key) is not None:
+            return entry_folder / 'vocabulary'
+        self.folder.mkdir(parents=True, exist_ok=True)
+        # Copy into a temporary folder first, such that concurrent runs never see a partial entry.
+        temporary_folder = pathlib.Path(tempfile.mkdtemp(dir=self.folder, prefix='.tmp_'))
+        try:
+            shutil.copytree(vocabulary_folder, temporary_folder / 'vocabulary')
+            (temporary_folder / METADATA_FILE_NAME).write_text(
+                yaml.safe_dump({'key': key, 'source': str(vocabulary_folder)}, sort_keys=False))
+            temporary_folder.rename(entry_folder)
+        except OSError:
+            # Another run registered a vocabulary for the same key in the meantime.
+            if self.lookup(key) is None:
+                raise
+        finally:
+            if temporary_folder.exists():
+                shutil.rmtree(temporary_folder)
+        return entry_folder / 'vocabulary'
@@ -0,0 +1,310 @@
+# SPDX-FileCopyrightText: NVIDIA CORPORATION & AFFILIATES
+# Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+"""
+Resolve launch descriptions without starting any process, e.g. to profile or inspect them.
+
+The launch entities are visited like ros2 launch does, but processes and nodes are only resolved
+instead of started, and the requests to load composable nodes are collected instead of sent. No
+ROS graph is needed for this.
+
+launch_ros does not expose the composable nodes of its actions, they are read from the private
+attributes of the known launch_ros versions. Actions that do not have them fail to resolve with an
+UnsupportedLaunchError, such that callers fall back to launching normally.
+"""
+
+import collections
+import contextlib
+import dataclasses
+import os
+import pathlib
+import time
+from typing import Any, Callable, Iterator
+
+import launch
+from launch.actions import (DeclareLaunchArgument, ExecuteProcess, IncludeLaunchDescription,
+                            OpaqueFunction, TimerAction)
+from launch.launch_description_sources import get_launch_description_from_python_launch_file
+from launch.utilities import normalize_to_list_of_substitutions, perform_substitutions
+from launch_ros.actions import ComposableNodeContainer, LoadComposableNodes, Node
+from launch_ros.actions.load_composable_nodes import get_composable_node_load_request
+from launch_ros.utilities import evaluate_parameters
+
+
+class UnsupportedLaunchError(RuntimeError):
+    pass
+
+
+@dataclasses.dataclass
+class TimingStats:
+    count: int = 0
+    # Time including the time of nested measurements, and excluding it.
+    total_s: float = 0.0
+    self_s: float = 0.0
+
+
+class _Measurement:
+
+    def __init__(self, key: str):
+        self.key = key
+        self.child_time_s = 0.0
+
+
+class LaunchProfiler:
+    """
+    Measure the time spent in launch files, opaque functions and substitutions.
+
+    Substitutions are measured by wrapping the perform method of every substitution class. Classes
+    are wrapped as soon as they are imported, i.e. before every launch file is resolved.
+    """
+
+    def __init__(self):
+        self.files = collections.defaultdict(TimingStats)
+        self.functions = collections.defaultdict(TimingStats)
+        self.substitutions = collections.defaultdict(TimingStats)
+        self._stack: list[_Measurement] = []
+        self._patched_classes: dict[type, Callable] = {}
+
+    @contextlib.contextmanager
+    def measure(self, stats: dict[str, TimingStats], key: str) -> Iterator[_Measurement]:
+        """Measure a block of code, the key can still be changed within the block."""
+        measurement = _Measurement(key)
+        self._stack.append(measurement)
+        start_time = time.perf_counter()
+        try:
+            yield measurement
+        finally:
+            duration_s = time.perf_counter() - start_time
+            self._stack.pop()
+            entry = stats[measurement.key]
+            entry.count += 1
+            entry.total_s += duration_s
+            entry.self_s += duration_s - measurement.child_time_s
+            if self._stack:
+                self._stack[-1].child_time_s += duration_s
+
+    def patch_substitutions(self):
+        for cls in _get_subclasses(launch.Substitution):
+            if cls in self._patched_classes or 'perform' not in cls.__dict__:
+                continue
+            self._patched_classes[cls] = cls.__dict__['perform']
+            cls.perform = self._wrap_perform(cls.__dict__['perform'], cls.__qualname__)
+
+    def unpatch_substitutions(self):
+        for cls, perform in self._patched_classes.items():
+            cls.perform = perform
+        self._patched_classes = {}
+
+    def _wrap_perform(self, perform: Callable, name: str) -> Callable:
+
+        def wrapped_perform(substitution, context):
+            with self.measure(self.substitutions, name):
+                return perform(substitution, context)
+
+        return wrapped_perform
+
+    def __enter__(self) -> 'LaunchProfiler':
+        self.patch_substitutions()
+        return self
+
+    def __exit__(self, *_):
+        self.unpatch_substitutions()
+
+
+def _get_subclasses(cls: type) -> list[type]:
+    subclasses = []
+    for subclass in cls.__subclasses__():
+        subclasses += [subclass, *_get_subclasses(subclass)]
+    return subclasses
+
+
+@dataclasses.dataclass
+class ResolvedLaunch:
+    launch_file: pathlib.Path
+    build_time_s: float = 0.0
+    resolve_time_s: float = 0.0
+    # Executables of the nodes and processes that would be started.
+    processes: list[str] = dataclasses.field(default_factory=list)
+    # Requests to load composable nodes, by the name of the container they would be loaded into.
+    load_requests: list[tuple[str, Any]] = dataclasses.field(default_factory=list)
+    errors: list[str] = dataclasses.field(default_factory=list)
+    # Launch files and parameter files the result was resolved from.
+    input_files: list[pathlib.Path] = dataclasses.field(default_factory=list)
+    # Names of the launch arguments declared by the visited launch files.
+    declared_arguments: list[str] = dataclasses.field(default_factory=list)
+    # Declared launch arguments without a default value that were not given, and given launch
+    # arguments whose value is not one of the declared choices.
+    missing_arguments: list[str] = dataclasses.field(default_factory=list)
+    invalid_arguments: list[str] = dataclasses.field(default_factory=list)
+    # Environment variables read while resolving (e.g. by EnvironmentVariable substitutions), with
+    # their values, None if they were not set.
+    environment: dict[str, str | None] = dataclasses.field(default_factory=dict)
+
+    def add_input_file(self, path: pathlib.Path):
+        path = pathlib.Path(path)
+        if path not in self.input_files:
+            self.input_files.append(path)
+
+
+@contextlib.contextmanager
+def record_environment(environment: dict[str, str | None]) -> Iterator[None]:
+    """
+    Record the environment variables read with os.getenv, os.environ.get or 'in' within the block.
+
+    Indexing os.environ is not recorded, as it is also used to copy the whole environment.
+    """
+    environ_class = type(os.environ)
+    get, contains = environ_class.get, environ_class.__contains__
+
+    def recording_get(environ, key, default=None):
+        value = get(environ, key)
+        if environ is os.environ:
+            environment.setdefault(key, value)
+        return default if value is None else value
+
+    def recording_contains(environ, key):
+        if environ is os.environ:
+            environment.setdefault(key, get(environ, key))
+        return contains(environ, key)
+
+    environ_class.get = recording_get
+    environ_class.__contains__ = recording_contains
+    try:
+        yield
+    finally:
+        # Both are inherited from Mapping.
+        del environ_class.get
+        del environ_class.__contains__
+
+
+def _get_attribute(entity: Any, name: str) -> Any:
+    """Return a public attribute of a launch action, or the private one of its class."""
+    for attribute in [name, *[f'_{cls.__name__}__{name}' for cls in type(entity).__mro__]]:
+        if hasattr(entity, attribute):
+            return getattr(entity, attribute)
+    raise UnsupportedLaunchError(f'{type(entity).__name__} has no attribute {name}, the installed '
+                                 'launch_ros is not supported.')
+
+
+class LaunchResolver:
+    """Visit the entities of a launch description without starting or loading anything."""
+
+    def __init__(self, launch_arguments: dict[str, str] | None = None,
+                 profiler: LaunchProfiler | None = None):
+        self.launch_arguments = launch_arguments or {}
+        self.profiler = profiler
+
+    def _measure(self, category: str, key: str):
+        if self.profiler is None:
+            return contextlib.nullcontext(_Measurement(key))
+        return self.profiler.measure(getattr(self.profiler, category), key)
+
+    def resolve_file(self, launch_file: pathlib.Path,
+                     launch_arguments: dict[str, str] | None = None) -> ResolvedLaunch:
+        """Resolve a launch file, the launch arguments are added to the ones of the resolver."""
+        result = ResolvedLaunch(pathlib.Path(launch_file))
+        result.add_input_file(launch_file)
+        context = launch.LaunchContext()
+        context.launch_configurations.update(self.launch_arguments)
+        context.launch_configurations.update(launch_arguments or {})
+        start_time = time.perf_counter()
+        with self._measure('files', str(launch_file)), record_environment(result.environment):
+            try:
+                description = get_launch_description_from_python_launch_file(str(launch_file))
+            except Exception as error:
+                result.errors.append(f'Failed to build {launch_file}: {error!r}')
+                return result
+            result.build_time_s = time.perf_counter() - start_time
+            if self.profiler is not None:
+                self.profiler.patch_substitutions()
+            self._resolve_entities(description.visit(context) or [], context, result)
+        result.resolve_time_s = time.perf_counter() - start_time - result.build_time_s
+        return result
+
+    def _resolve_entities(self, entities: list, context: launch.LaunchContext,
+                          result: ResolvedLaunch):
+        for entity in entities:
+            try:
+                self._resolve_entity(entity, context, result)
+            except Exception as error:
+                result.errors.append(f'{type(entity).__name__}: {error!r}')
+
+    def _resolve_entity(self, entity, context: launch.LaunchContext, result: ResolvedLaunch):
+        if isinstance(entity, launch.Action) and entity.condition is not None and \
+                not entity.condition.evaluate(context):
+            return
+        if isinstance(entity, Node):
+            # Performs the substitutions of the node like starting it would.
+            entity._perform_substitutions(context)
+            result.processes.append(f'{entity.node_package}/{entity.node_executable}')
+            if isinstance(entity, ComposableNodeContainer):
+                descriptions = _get_attribute(entity, 'composable_node_descriptions')
+                self._add_load_requests(entity.node_name, descriptions or [], context, result)
+        elif isinstance(entity, LoadComposableNodes):
+            target_container = _get_attribute(entity, 'target_container')
+            if isinstance(target_container, ComposableNodeContainer):
+                container_name = target_container.node_name
+            else:
+                container_name = perform_substitutions(
+                    context, normalize_to_list_of_substitutions(target_container))
+            self._add_load_requests(container_name,
+                                    _get_attribute(entity, 'composable_node_descriptions'),
+                                    context, result)
+        elif isinstance(entity, ExecuteProcess):
+            result.processes.append(' '.join(
+                perform_substitutions(context, normalize_to_list_of_substitutions(part))
+                for part in entity.cmd))
+        elif isinstance(entity, TimerAction):
+            # Timers only delay their actions.
+            self._resolve_entities(entity.actions, context, result)
+        elif isinstance(entity, IncludeLaunchDescription):
+            with self._measure('files', 'include') as measurement:
+                entities = entity.visit(context) or []
+                measurement.key = entity.launch_description_source.location
+                result.add_input_file(measurement.key)
+                if self.profiler is not None:
+                    self.profiler.patch_substitutions()
+                self._resolve_entities(entities, context, result)
+        elif isinstance(entity, DeclareLaunchArgument):
+            if entity.name not in result.declared_arguments:
+                result.declared_arguments.append(entity.name)
+            value = context.launch_configurations.get(entity.name)
+            if value is None and entity.default_value is None:
+                result.missing_arguments.append(entity.name)
+            elif value is not None and entity.choices is not None and \
+                    value not in entity.choices:
+                result.invalid_arguments.append(entity.name)
+            self._resolve_entities(entity.visit(context) or [], context, result)
+        elif isinstance(entity, OpaqueFunction):
+            name = getattr(entity.function, '__qualname__', repr(entity.function))
+            with self._measure('functions', name):
+                self._resolve_entities(entity.visit(context) or [], context, result)
+        else:
+            self._resolve_entities(entity.visit(context) or [], context, result)
+
+    def _add_load_requests(self, container_name: str, descriptions: list,
+                           context: launch.LaunchContext, result: ResolvedLaunch):
+        if not container_name.startswith('/'):
+            container_name = f'/{container_name}'
+        for description in descriptions:
+            if description.condition() is not None and \
+                    not description.condition().evaluate(context):
+                continue
+            for parameters in evaluate_parameters(context, description.parameters() or []):
+                if isinstance(parameters, pathlib.Path):
+                    result.add_input_file(parameters)
+            result.load_requests.append(
+                (container_name, get_composable_node_load_request(description, context)))
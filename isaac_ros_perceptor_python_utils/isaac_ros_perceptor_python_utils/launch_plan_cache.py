@@ -0,0 +1,330 @@
+# SPDX-FileCopyrightText: NVIDIA CORPORATION & AFFILIATES
+# Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+"""
+Cache the composable nodes a launch file loads, such that they can be loaded without evaluating it.
+
+For the same launch arguments, the requests to load the composable nodes of a launch file are the
+same on every boot. A launch plan stores them after resolving the launch file once (see
+launch_inspection), together with the hashes of all launch and parameter files, of the Python
+modules the launch files import from ROS packages, and the versions of the packages of the nodes.
+As long as these did not change, the plan can be replayed by sending the requests to the containers
+directly.
+
+Plans are keyed by the values of the launch arguments the launch files declare and of the
+environment variables they read, configurations inherited from a parent launch file that are not
+declared do not change the plan. Both are only known after resolving, their names are stored per
+launch file in an arguments file.
+
+Nodes that do not depend on each other can be loaded concurrently, see get_load_waves.
+"""
+
+import base64
+import dataclasses
+import hashlib
+import json
+import os
+import pathlib
+import sys
+import tempfile
+import xml.etree.ElementTree as ElementTree
+from typing import Any
+
+import ament_index_python.packages
+from composition_interfaces.srv import LoadNode
+from rclpy.serialization import deserialize_message, serialize_message
+
+from isaac_ros_perceptor_python_utils import cache_utils, launch_inspection
+
+LAUNCH_PLAN_FOLDER_NAME = 'launch_plans'
+ARGUMENTS_FILE_SUFFIX = '.arguments.json'
+
+# Environment variables that change how launch files are resolved, e.g. the paths of model files.
+KEY_ENVIRONMENT_VARIABLES = ['AMENT_PREFIX_PATH', 'ISAAC_ROS_WS']
+
+# Plugins that are only loaded once the listed plugins in the same namespace (or below it) are
+# loaded, e.g. ESS of a camera once the rectify nodes of its left and right imagers are loaded.
+LOAD_DEPENDENCIES = {
+    'nvidia::isaac_ros::dnn_stereo_depth::ESSDisparityNode': [
+        'nvidia::isaac_ros::image_proc::RectifyNode',
+    ],
+    'nvidia::isaac_ros::stereo_image_proc::DisparityToDepthNode': [
+        'nvidia::isaac_ros::dnn_stereo_depth::ESSDisparityNode',
+    ],
+    'nvblox::NvbloxNode': [
+        'nvidia::isaac_ros::stereo_image_proc::DisparityToDepthNode',
+    ],
+}
+
+
+@dataclasses.dataclass
+class PlannedNode:
+    container_name: str
+    request: LoadNode.Request
+
+    @property
+    def name(self) -> str:
+        return f'{self.request.node_namespace.rstrip("/")}/{self.request.node_name}'
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'container_name': self.container_name,
+            # Only for readability, the request is replayed from its serialized form.
+            'plugin': self.request.plugin_name,
+            'name': self.name,
+            'request': base64.b64encode(serialize_message(self.request)).decode(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> 'PlannedNode':
+        request = deserialize_message(base64.b64decode(data['request']), LoadNode.Request)
+        return cls(data['container_name'], request)
+
+
+@dataclasses.dataclass
+class LaunchPlan:
+    launch_file: str
+    # Values of the declared launch arguments that were set, the plan is only valid for these.
+    launch_arguments: dict[str, str]
+    declared_arguments: list[str]
+    # Values of the environment variables read while resolving, None if they were not set.
+    environment: dict[str, str | None]
+    nodes: list[PlannedNode]
+    # Nodes and processes the launch file starts itself, these can not be replayed.
+    processes: list[str]
+    # Hashes of the launch and parameter files and of the launch-side modules, by their path.
+    input_files: dict[str, str]
+    package_versions: dict[str, str]
+
+    @property
+    def is_replayable(self) -> bool:
+        return not self.processes
+
+    def get_changes(self, launch_configurations: dict[str, str]) -> list[str]:
+        """Return what changed since the plan was created, it is only valid if nothing did."""
+        changes = []
+        if select_launch_arguments(self.declared_arguments,
+                                   launch_configurations) != self.launch_arguments:
+            changes.append('Launch arguments changed.')
+        for name, value in self.environment.items():
+            if os.environ.get(name) != value:
+                changes.append(f'Environment variable {name} changed.')
+        for path, digest in self.input_files.items():
+            if get_file_hash(pathlib.Path(path)) != digest:
+                changes.append(f'File {path} changed.')
+        for package, version in self.package_versions.items():
+            if get_package_version(package) != version:
+                changes.append(f'Package {package} changed.')
+        return changes
+
+    def save(self, plan_file: pathlib.Path):
+        data = dataclasses.asdict(self)
+        data['nodes'] = [node.to_dict() for node in self.nodes]
+        write_atomically(plan_file, json.dumps(data, indent=2))
+
+    @classmethod
+    def load(cls, plan_file: pathlib.Path) -> 'LaunchPlan':
+        data = json.loads(plan_file.read_text())
+        data['nodes'] = [PlannedNode.from_dict(node) for node in data['nodes']]
+        return cls(**data)
+
+
+def write_atomically(path: pathlib.Path, text: str):
+    # Such that a launch never reads a partial file.
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile('w', dir=path.parent, suffix='.tmp', delete=False) as file:
+        file.write(text)
+    os.replace(file.name, path)
+
+
+def is_in_namespace(namespace: str, parent_namespace: str) -> bool:
+    parts = [p for p in namespace.split('/') if p]
+    parent_parts = [p for p in parent_namespace.split('/') if p]
+    return parts[:len(parent_parts)] == parent_parts
+
+
+def get_load_waves(nodes: list[PlannedNode]) -> list[list[PlannedNode]]:
+    """
+    Group the nodes into waves that can be loaded concurrently, see LOAD_DEPENDENCIES.
+
+    The nodes of a wave only depend on nodes of earlier waves. Within a wave, nodes keep the order
+    of the plan.
+    """
+    wave_indices: dict[int, int] = {}
+
+    def get_wave_index(index: int) -> int:
+        if index not in wave_indices:
+            request = nodes[index].request
+            dependencies = LOAD_DEPENDENCIES.get(request.plugin_name, [])
+            wave_indices[index] = max((get_wave_index(i) + 1 for i, other in enumerate(nodes)
+                                       if other.request.plugin_name in dependencies and
+                                       is_in_namespace(other.request.node_namespace,
+                                                       request.node_namespace)),
+                                      default=0)
+        return wave_indices[index]
+
+    waves = [[] for _ in range(max((get_wave_index(i) + 1 for i in range(len(nodes))),
+                                   default=0))]
+    for index, node in enumerate(nodes):
+        waves[wave_indices[index]].append(node)
+    return waves
+
+
+def get_file_hash(path: pathlib.Path) -> str | None:
+    if not path.is_file():
+        return None
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def get_package_version(package: str) -> str | None:
+    try:
+        share_folder = ament_index_python.packages.get_package_share_directory(package)
+    except ament_index_python.packages.PackageNotFoundError:
+        return None
+    package_xml = pathlib.Path(share_folder) / 'package.xml'
+    if not package_xml.is_file():
+        return None
+    version = ElementTree.parse(package_xml).getroot().findtext('version')
+    # The modification time tells rebuilds of the same version apart.
+    return f'{version} ({package_xml.stat().st_mtime_ns})'
+
+
+def get_module_files() -> list[pathlib.Path]:
+    """Return the source files of the loaded Python modules that are installed by ROS packages."""
+    prefixes = [pathlib.Path(p).resolve()
+                for p in os.environ.get('AMENT_PREFIX_PATH', '').split(os.pathsep) if p]
+    files = set()
+    for module in list(sys.modules.values()):
+        module_file = getattr(module, '__file__', None)
+        if module_file is None or not module_file.endswith('.py'):
+            continue
+        path = pathlib.Path(module_file).resolve()
+        if any(path.is_relative_to(prefix) for prefix in prefixes):
+            files.add(path)
+    return sorted(files)
+
+
+def select_launch_arguments(declared_arguments: list[str],
+                            launch_configurations: dict[str, str]) -> dict[str, str]:
+    return {name: launch_configurations[name] for name in sorted(declared_arguments)
+            if name in launch_configurations}
+
+
+def get_launch_file_key(launch_file: pathlib.Path) -> dict[str, Any]:
+    return {
+        'launch_file': str(pathlib.Path(launch_file).resolve()),
+        'environment': {name: os.environ.get(name) for name in KEY_ENVIRONMENT_VARIABLES},
+    }
+
+
+def get_digest(key: dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+def get_arguments_file(launch_file: pathlib.Path) -> pathlib.Path:
+    file_name = get_digest(get_launch_file_key(launch_file)) + ARGUMENTS_FILE_SUFFIX
+    return cache_utils.get_cache_folder() / LAUNCH_PLAN_FOLDER_NAME / file_name
+
+
+def select_environment(environment_variables: list[str]) -> dict[str, str | None]:
+    return {name: os.environ.get(name) for name in sorted(environment_variables)}
+
+
+def get_plan_file(launch_file: pathlib.Path, launch_arguments: dict[str, str],
+                  environment: dict[str, str | None]) -> pathlib.Path:
+    """Return the plan file for the values of the declared arguments and read variables."""
+    key = {
+        **get_launch_file_key(launch_file),
+        'launch_arguments': launch_arguments,
+        'read_environment': environment,
+    }
+    return cache_utils.get_cache_folder() / LAUNCH_PLAN_FOLDER_NAME / f'{get_digest(key)}.json'
+
+
+def find_plan_file(launch_file: pathlib.Path,
+                   launch_configurations: dict[str, str]) -> pathlib.Path | None:
+    """Return the plan file for the launch configurations, None if no plan was created yet."""
+    arguments_file = get_arguments_file(launch_file)
+    if not arguments_file.is_file():
+        return None
+    arguments = json.loads(arguments_file.read_text())
+    return get_plan_file(
+        launch_file,
+        select_launch_arguments(arguments['declared_arguments'], launch_configurations),
+        select_environment(arguments['environment_variables']))
+
+
+def create_launch_plan(launch_file: pathlib.Path,
+                       launch_configurations: dict[str, str]) -> LaunchPlan:
+    resolver = launch_inspection.LaunchResolver(launch_configurations)
+    resolved = resolver.resolve_file(launch_file)
+    if resolved.errors:
+        raise RuntimeError(f'Failed to resolve {launch_file}:\n' + '\n'.join(resolved.errors))
+    nodes = [PlannedNode(container_name, request)
+             for container_name, request in resolved.load_requests]
+    packages = sorted({node.request.package_name for node in nodes})
+    # The launch files imported these modules while they were resolved.
+    input_files = [*resolved.input_files, *get_module_files()]
+    return LaunchPlan(
+        launch_file=str(pathlib.Path(launch_file).resolve()),
+        launch_arguments=select_launch_arguments(resolved.declared_arguments,
+                                                 launch_configurations),
+        declared_arguments=sorted(resolved.declared_arguments),
+        environment=dict(sorted(resolved.environment.items())),
+        nodes=nodes,
+        processes=resolved.processes,
+        input_files={str(path): get_file_hash(path) for path in input_files},
+        package_versions={package: get_package_version(package) for package in packages},
+    )
+
+
+def store_launch_plan(plan: LaunchPlan, launch_configurations: dict[str, str]) -> pathlib.Path:
+    """Store the plan where find_plan_file finds it for the configurations, return its path."""
+    arguments_file = get_arguments_file(plan.launch_file)
+    declared_arguments = set(plan.declared_arguments)
+    environment_variables = set(plan.environment)
+    if arguments_file.is_file():
+        # Launch files can declare different arguments (and read different variables) depending
+        # on the values of others. Keying on the union only adds arguments that do not change the
+        # plan, which get_changes checks.
+        arguments = json.loads(arguments_file.read_text())
+        declared_arguments.update(arguments['declared_arguments'])
+        environment_variables.update(arguments['environment_variables'])
+    plan_file = get_plan_file(
+        plan.launch_file,
+        select_launch_arguments(list(declared_arguments), launch_configurations),
+        select_environment(list(environment_variables)))
+    plan.save(plan_file)
+    write_atomically(arguments_file, json.dumps({
+        'declared_arguments': sorted(declared_arguments),
+        'environment_variables': sorted(environment_variables),
+    }, indent=2))
+    return plan_file
+
+
+def load_launch_plan(plan_file: pathlib.Path | None,
+                     launch_configurations: dict[str, str]) -> tuple[LaunchPlan | None, str]:
+    """Load a launch plan if it is valid, otherwise return None and the reason why it is not."""
+    if plan_file is None or not plan_file.is_file():
+        return None, 'No launch plan was created for these launch arguments yet.'
+    try:
+        plan = LaunchPlan.load(plan_file)
+    except Exception as error:
+        return None, f'Failed to load launch plan {plan_file}: {error!r}'
+    changes = plan.get_changes(launch_configurations)
+    if changes:
+        return None, ' '.join(changes)
+    return plan, ''
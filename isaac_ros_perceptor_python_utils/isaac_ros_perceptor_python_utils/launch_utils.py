@@ -18,121 +18,62 @@
 # flake8: noqa: F403,F405
 from isaac_ros_launch_utils.all_types import *
 import isaac_ros_launch_utils as lu
+from launch import LaunchContext
+from launch.utilities import normalize_to_list_of_substitutions, perform_substitutions
 
-# Camera config string is a subset of:
-# - driver,rectify,ess_full,ess_light,ess_skip_frames,cuvslam,nvblox
-perceptor_configurations = {
-    'no_cameras': {
-        'front_stereo_camera': '',
-        'back_stereo_camera': '',
-        'left_stereo_camera': '',
-        'right_stereo_camera': '',
-    },
-    'front_configuration': {
-        'front_stereo_camera': 'driver,rectify,ess_full,vgl,cuvslam,nvblox',
-        'back_stereo_camera': '',
-        'left_stereo_camera': '',
-        'right_stereo_camera': '',
-    },
-    'front_people_configuration': {
-        'front_stereo_camera': 'driver,rectify,ess_full,vgl,cuvslam,nvblox_people',
-        'back_stereo_camera': '',
-        'left_stereo_camera': '',
-        'right_stereo_camera': '',
-    },
-    'front_left_right_configuration': {
-        'front_stereo_camera': 'driver,rectify,ess_full,vgl,cuvslam,nvblox',
-        'back_stereo_camera': '',
-        'left_stereo_camera': 'driver,rectify,ess_light,ess_skip_frames,vgl,cuvslam,nvblox',
-        'right_stereo_camera': 'driver,rectify,ess_light,ess_skip_frames,vgl,cuvslam,nvblox',
-    },
-    'front_left_right_vslam_configuration': {
-        'front_stereo_camera': 'driver,rectify,ess_full,vgl,cuvslam,nvblox',
-        'back_stereo_camera': '',
-        'left_stereo_camera': 'driver,rectify,vgl,cuvslam',
-        'right_stereo_camera': 'driver,rectify,vgl,cuvslam',
-    },
-    'front_back_left_right_vgl_configuration': {
-        'front_stereo_camera': 'driver,rectify,ess_full,vgl,cuvslam,nvblox',
-        'back_stereo_camera': 'driver,rectify,vgl',
-        'left_stereo_camera': 'driver,rectify,ess_full,vgl,cuvslam,nvblox',
-        'right_stereo_camera': 'driver,rectify,ess_full,vgl,cuvslam,nvblox',
-    },
-    'front_driver_rectify': {
-        'front_stereo_camera': 'driver,rectify',
-        'back_stereo_camera': '',
-        'left_stereo_camera': '',
-        'right_stereo_camera': '',
-    },
-    'front_left_right_configuration_nodriver': {
-        'front_stereo_camera': 'ess_full,vgl,cuvslam,nvblox',
-        'back_stereo_camera': '',
-        'left_stereo_camera': 'ess_light,ess_skip_frames,vgl,cuvslam,nvblox',
-        'right_stereo_camera': 'ess_light,ess_skip_frames,vgl,cuvslam,nvblox',
-    },
-    'front_back_left_right_vo_configuration': {
-        'front_stereo_camera': 'driver,cuvslam',
-        'back_stereo_camera': 'driver,cuvslam',
-        'left_stereo_camera': 'driver,cuvslam',
-        'right_stereo_camera': 'driver,cuvslam',
-    },
-    'front_left_right_ess_full_configuration': {
-        'front_stereo_camera': 'driver,rectify,ess_full,cuvslam,nvblox',
-        'back_stereo_camera': '',
-        'left_stereo_camera': 'driver,rectify,ess_full,cuvslam,nvblox',
-        'right_stereo_camera': 'driver,rectify,ess_full,cuvslam,nvblox',
-    },
-}
+# Re-exported, the configurations used to be defined here.
+from isaac_ros_perceptor_python_utils.perceptor_configuration import (  # noqa: F401
+    PERCEPTOR_MODULES,
+    STEREO_CAMERAS,
+    PerceptorConfiguration,
+    parse_modules,
+    perceptor_configurations,
+    resolve_perceptor_configuration,
+)
 
-def remove_cuvslam_from_configuration(perceptor_configuration: Substitution):
-    # Removing cuvslam steps from the perceptor configuration.
-    return lu.remove_substring_from_dict_values(perceptor_configuration, 'cuvslam')
 
+class PerceptorConfigurationSubstitution(Substitution):
+    """Resolve a perceptor configuration once its arguments can be performed."""
 
-def remove_nvblox_from_configuration(perceptor_configuration: Substitution):
-    # Removing ess and nvblox steps from the perceptor configuration.
-    return lu.remove_substrings_from_dict_values(
-        perceptor_configuration, ['ess_full', 'ess_light', 'ess_skip_frames', 'nvblox'])
+    def __init__(self, stereo_camera_configuration, disable_cuvslam, disable_nvblox, disable_vgl):
+        super().__init__()
+        self.stereo_camera_configuration = stereo_camera_configuration
+        self.disable_cuvslam = disable_cuvslam
+        self.disable_nvblox = disable_nvblox
+        self.disable_vgl = disable_vgl
 
+    def perform(self, context: LaunchContext) -> str:
+
+        def perform_value(value) -> str:
+            if isinstance(value, bool):
+                return str(value)
+            return perform_substitutions(context, normalize_to_list_of_substitutions(value))
+
+        def perform_flag(value) -> bool:
+            return perform_value(value).strip().lower() in ['true', '1']
+
+        return resolve_perceptor_configuration(
+            perform_value(self.stereo_camera_configuration),
+            perform_flag(self.disable_cuvslam),
+            perform_flag(self.disable_nvblox),
+            perform_flag(self.disable_vgl),
+        ).to_launch_value()
 
-def remove_vgl_from_configuration(perceptor_configuration: Substitution):
-    # Removing camera localization steps from the perceptor configuration.
-    return lu.remove_substring_from_dict_values(perceptor_configuration, 'vgl')
 
 def load_perceptor_configuration(stereo_camera_configuration, disable_cuvslam, disable_nvblox, disable_vgl):
-    perceptor_configuration = lu.get_dict_value(str(perceptor_configurations),
-                                                stereo_camera_configuration)
-    actions=[]
-    # Remove cuvslam if cuvslam is disabled (e.g. when enabling wheel odometry).
-    perceptor_configuration = lu.if_else_substitution(
-        disable_cuvslam, remove_cuvslam_from_configuration(perceptor_configuration),
-        perceptor_configuration)
+    perceptor_configuration = PerceptorConfigurationSubstitution(
+        stereo_camera_configuration, disable_cuvslam, disable_nvblox, disable_vgl)
+    actions = []
     actions.append(lu.log_info("Disabling cuvslam.", IfCondition(disable_cuvslam)))
-
-    # Remove nvblox (and ESS) if nvblox is disabled.
-    perceptor_configuration = lu.if_else_substitution(
-        disable_nvblox, remove_nvblox_from_configuration(perceptor_configuration),
-        perceptor_configuration)
     actions.append(lu.log_info("Disabling nvblox.", IfCondition(disable_nvblox)))
-
-    # Remove camera localization if camera localization is disabled.
-    perceptor_configuration = lu.if_else_substitution(
-        disable_vgl,
-        remove_vgl_from_configuration(perceptor_configuration),
-        perceptor_configuration)
     actions.append(lu.log_info("Disabling vgl.", IfCondition(disable_vgl)))
 
-    # Remove rectify if both nvblox and camera localization are disabled
+    # Rectify is removed if both nvblox and camera localization are disabled
     # and stereo_camera_configuration is not front_driver_rectify
     front_driver_rectify = lu.is_equal(stereo_camera_configuration, 'front_driver_rectify')
-
     disable_rectify = AndSubstitution(
         AndSubstitution(disable_nvblox, disable_vgl),
         NotSubstitution(front_driver_rectify))
-    perceptor_configuration = lu.if_else_substitution(
-        disable_rectify, lu.remove_substrings_from_dict_values(perceptor_configuration,
-                                                               ['rectify']),
-        perceptor_configuration)
     actions.append(lu.log_info("Disabling camera rectification.", IfCondition(disable_rectify)))
 
     return perceptor_configuration, actions
@@ -0,0 +1,230 @@
+# SPDX-FileCopyrightText: NVIDIA CORPORATION & AFFILIATES
+# Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import dataclasses
+import filecmp
+import pathlib
+import re
+import shutil
+
+# Written by rosbag_to_mapping_data next to the keyframe images, describes all keyframes in the
+# protobuf text format.
+KEYFRAMES_METADATA_FILE_NAME = 'frames_meta.pbtxt'
+KEYFRAME_FIELD_NAME = 'keyframes_metadata'
+
+FIELD_NAME_PATTERN = re.compile(r'\s*(\w+)')
+SCALAR_FIELD_PATTERN = re.compile(r'(\s*)(\w+)\s*:\s*([^{\s].*?)\s*$')
+
+
+class MergeConflictError(RuntimeError):
+    pass
+
+
+@dataclasses.dataclass
+class Keyframe:
+    folder: pathlib.Path
+    lines: list[str]
+    timestamp_us: int
+    image_name: pathlib.PurePosixPath
+    files: list[pathlib.Path]
+
+
+def count_braces(line: str) -> int:
+    """Return by how much a line of a protobuf text format message changes the nesting depth."""
+    depth = 0
+    in_string = False
+    escaped = False
+    for char in line:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+    return depth
+
+
+def split_text_proto(text: str) -> list[tuple[str, list[str]]]:
+    """Split a protobuf text format message (one field per line) into its top level fields."""
+    fields = []
+    depth = 0
+    for line in text.splitlines():
+        if depth == 0:
+            if not line.strip() or line.lstrip().startswith('#'):
+                continue
+            fields.append((FIELD_NAME_PATTERN.match(line).group(1), []))
+        fields[-1][1].append(line)
+        depth += count_braces(line)
+    return fields
+
+
+def find_scalar(lines: list[str], name: str) -> int | None:
+    """Return the index of the line setting a scalar field of a top level message field."""
+    depth = 0
+    for i, line in enumerate(lines):
+        if depth == 1:
+            match = SCALAR_FIELD_PATTERN.match(line)
+            if match and match.group(2) == name:
+                return i
+        depth += count_braces(line)
+    return None
+
+
+def get_scalar(lines: list[str], name: str) -> str | None:
+    i = find_scalar(lines, name)
+    if i is None:
+        return None
+    value = SCALAR_FIELD_PATTERN.match(lines[i]).group(3)
+    return value[1:-1] if value.startswith('"') else value
+
+
+def set_scalar(lines: list[str], name: str, value: str | int) -> list[str]:
+    i = find_scalar(lines, name)
+    indent = SCALAR_FIELD_PATTERN.match(lines[i]).group(1)
+    value = f'"{value}"' if isinstance(value, str) else value
+    return lines[:i] + [f'{indent}{name}: {value}'] + lines[i + 1:]
+
+
+def get_field_key(name: str, lines: list[str]) -> tuple[str, ...]:
+    # Entries of map fields are identified by their key, other message fields by their content.
+    if len(lines) == 1:
+        return (name,)
+    key = get_scalar(lines, 'key')
+    return (name, key) if key is not None else (name, '\n'.join(lines))
+
+
+def read_keyframes(folder: pathlib.Path) -> tuple[list[Keyframe], list[tuple[str, list[str]]]]:
+    """Read the keyframes of a keyframes folder and the remaining fields of its metadata."""
+    keyframes = []
+    other_fields = []
+    metadata_file = folder / KEYFRAMES_METADATA_FILE_NAME
+    for name, lines in split_text_proto(metadata_file.read_text()):
+        if name != KEYFRAME_FIELD_NAME:
+            other_fields.append((name, lines))
+            continue
+        timestamp_us = get_scalar(lines, 'timestamp_microseconds')
+        image_name = get_scalar(lines, 'image_name')
+        if timestamp_us is None or image_name is None:
+            raise MergeConflictError(f'A keyframe of {metadata_file} has no timestamp or image.')
+        image_name = pathlib.PurePosixPath(image_name)
+        # The features of a keyframe are stored next to its image, with the same stem.
+        files = sorted((folder / image_name).parent.glob(f'{image_name.stem}.*'))
+        keyframes.append(Keyframe(folder, lines, int(timestamp_us), image_name, files))
+    return keyframes, other_fields
+
+
+def get_renamed_image(image_name: pathlib.PurePosixPath, old_id: str | None,
+                      new_id: int) -> pathlib.PurePosixPath:
+    # Keyframes named by their ID (rather than e.g. their timestamp) follow the new ID.
+    stem = image_name.stem
+    if old_id is None or not stem.isdigit() or int(stem) != int(old_id):
+        return image_name
+    return image_name.with_stem(str(new_id).zfill(len(stem)))
+
+
+def merge_keyframe_folders(source_folders: list[pathlib.Path], output_folder: pathlib.Path,
+                           time_ranges: list[tuple[int, int]] | None = None) -> int:
+    """
+    Merge keyframes folders written by rosbag_to_mapping_data into a single keyframes folder.
+
+    Keyframes already in output_folder are kept. If time_ranges is given, only the keyframes of
+    a source folder taken in its [start_ns, end_ns) range are added, the others (e.g. selected
+    while warming up in the overlap of two rosbag shards) are dropped. The metadata is
+    regenerated: the keyframes are re-indexed in the order of their timestamps and the remaining
+    fields are taken from the first folder that sets them. Files of a keyframe, or any other
+    file, that would be overwritten raise a MergeConflictError before any file is moved.
+
+    Returns the number of keyframes in the merged folder.
+    """
+    folders = list(zip(source_folders, time_ranges or [None] * len(source_folders)))
+    if (output_folder / KEYFRAMES_METADATA_FILE_NAME).exists():
+        folders.insert(0, (output_folder, None))
+
+    keyframes: list[Keyframe] = []
+    other_fields: dict[tuple[str, ...], list[str]] = {}
+    moves: dict[pathlib.Path, pathlib.Path] = {}
+    for folder, time_range in folders:
+        folder_keyframes, folder_fields = read_keyframes(folder)
+        for name, lines in folder_fields:
+            other_fields.setdefault(get_field_key(name, lines), lines)
+        keyframe_files = {f for keyframe in folder_keyframes for f in keyframe.files}
+        keyframes += [
+            keyframe for keyframe in folder_keyframes
+            if time_range is None or time_range[0] <= keyframe.timestamp_us * 1000 < time_range[1]
+        ]
+        if folder == output_folder:
+            continue
+        for source_file in sorted(p for p in folder.rglob('*') if p.is_file()):
+            if source_file.name == KEYFRAMES_METADATA_FILE_NAME or source_file in keyframe_files:
+                continue
+            output_file = output_folder / source_file.relative_to(folder)
+            existing_file = moves.get(output_file, output_file)
+            if not existing_file.exists():
+                moves[output_file] = source_file
+            elif not filecmp.cmp(existing_file, source_file, shallow=False):
+                raise MergeConflictError(
+                    f'{source_file} and {existing_file} have the same name but differ.')
+
+    keyframes.sort(key=lambda keyframe: keyframe.timestamp_us)
+    keyframe_lines = []
+    keyframe_moves: dict[pathlib.Path, pathlib.Path] = {}
+    for new_id, keyframe in enumerate(keyframes):
+        lines = keyframe.lines
+        image_name = get_renamed_image(keyframe.image_name, get_scalar(lines, 'id'), new_id)
+        if find_scalar(lines, 'id') is not None:
+            lines = set_scalar(lines, 'id', new_id)
+        keyframe_lines += set_scalar(lines, 'image_name', str(image_name))
+        for source_file in keyframe.files:
+            output_file = (output_folder / image_name).with_suffix(source_file.suffix)
+            if output_file in keyframe_moves or output_file in moves:
+                raise MergeConflictError(f'{source_file} would overwrite another keyframe.')
+            keyframe_moves[output_file] = source_file
+
+    # Keyframes of the output folder might be renamed, move all keyframes aside first.
+    staging_folder = output_folder.with_name(f'{output_folder.name}_merging')
+    if staging_folder.exists():
+        shutil.rmtree(staging_folder)
+    for output_file, source_file in keyframe_moves.items():
+        staged_file = staging_folder / output_file.relative_to(output_folder)
+        staged_file.parent.mkdir(parents=True, exist_ok=True)
+        shutil.move(source_file, staged_file)
+    if output_folder.exists():
+        # Keyframes of the output folder that were not kept.
+        for keyframe_file in {f for keyframe in read_keyframes(output_folder)[0]
+                              for f in keyframe.files if f.exists()}:
+            keyframe_file.unlink()
+    for output_file, source_file in moves.items():
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        shutil.move(source_file, output_file)
+    for staged_file in sorted(p for p in staging_folder.rglob('*') if p.is_file()):
+        output_file = output_folder / staged_file.relative_to(staging_folder)
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        shutil.move(staged_file, output_file)
+    if staging_folder.exists():
+        shutil.rmtree(staging_folder)
+
+    metadata_lines = keyframe_lines + [line for lines in other_fields.values() for line in lines]
+    output_folder.mkdir(parents=True, exist_ok=True)
+    (output_folder / KEYFRAMES_METADATA_FILE_NAME).write_text('\n'.join(metadata_lines) + '\n')
+    return len(keyframes)
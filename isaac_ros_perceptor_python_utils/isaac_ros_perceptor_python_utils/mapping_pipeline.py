@@ -0,0 +1,446 @@
+# SPDX-FileCopyrightText: NVIDIA CORPORATION & AFFILIATES
+# Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import asyncio
+import concurrent.futures
+import dataclasses
+import datetime
+import hashlib
+import inspect
+import json
+import contextlib
+import multiprocessing
+import os
+import pathlib
+from typing import Any, Callable
+
+import yaml
+
+from isaac_ros_perceptor_python_utils import resource_telemetry
+from isaac_ros_perceptor_python_utils import run_journal
+
+# Files up to this size are hashed by content, larger files (e.g. rosbag storage files) only by
+# their size and modification time.
+MAX_CONTENT_HASH_SIZE = 1024 * 1024
+
+# Interval in which running steps check whether they have to be cancelled.
+CANCEL_POLL_INTERVAL_S = 1.0
+
+
+@dataclasses.dataclass
+class Step:
+    """
+    A unit of work in a mapping pipeline.
+
+    Steps are connected through named artifacts: a step can only start once every step producing
+    one of its inputs has finished. Inputs not produced by any step in the pipeline are assumed to
+    already exist (e.g. the sensor data bag or a map from a previous run).
+
+    The timeout is only enforced for steps whose function is a coroutine function.
+    """
+    name: str
+    function: Callable[..., Any]
+    kwargs: dict[str, Any] = dataclasses.field(default_factory=dict)
+    inputs: list[str] = dataclasses.field(default_factory=list)
+    outputs: list[str] = dataclasses.field(default_factory=list)
+    # Everything besides the inputs that influences the outputs (e.g. arguments, tool versions).
+    parameters: dict[str, Any] = dataclasses.field(default_factory=dict)
+    timeout_s: float | None = None
+    # Amount of every resource (e.g. 'gpu', 'cpu', 'memory_gb') the step occupies while running.
+    resources: dict[str, float] = dataclasses.field(default_factory=dict)
+
+
+def fingerprint_path(path: pathlib.Path) -> str:
+    """Fingerprint a file or folder from its file names, sizes and (small) file contents."""
+    path = pathlib.Path(path)
+    files = sorted(p for p in path.rglob('*') if p.is_file()) if path.is_dir() else [path]
+    digest = hashlib.sha256()
+    for file in files:
+        if not file.exists():
+            digest.update(f'{file.relative_to(path.parent)}:missing'.encode())
+            continue
+        stat = file.stat()
+        digest.update(f'{file.relative_to(path.parent)}:{stat.st_size}'.encode())
+        if stat.st_size <= MAX_CONTENT_HASH_SIZE:
+            digest.update(file.read_bytes())
+        else:
+            digest.update(str(stat.st_mtime_ns).encode())
+    return digest.hexdigest()
+
+
+def fingerprint_step(step: Step, input_fingerprints: dict[str, str]) -> str:
+    description = {
+        'step': step.name,
+        'inputs': {i: input_fingerprints.get(i) for i in sorted(step.inputs)},
+        'parameters': step.parameters,
+    }
+    return hashlib.sha256(json.dumps(description, sort_keys=True,
+                                     default=str).encode()).hexdigest()
+
+
+def artifact_exists(path: pathlib.Path) -> bool:
+    # Some tools only take a path prefix and append their own file extensions.
+    return path.exists() or any(path.parent.glob(f'{path.name}.*'))
+
+
+class StepCache:
+    """
+    Records the fingerprint of every finished step in the metadata file of a map folder.
+
+    A step whose fingerprint matches the recorded one and whose outputs still exist does not need
+    to be run again. The fingerprint of an artifact is the fingerprint of the step producing it, so
+    re-running a step invalidates everything downstream of it.
+    """
+
+    def __init__(self, metadata_file: pathlib.Path, artifact_paths: dict[str, pathlib.Path],
+                 enabled: bool = True):
+        self.metadata_file = metadata_file
+        self.artifact_paths = artifact_paths
+        self.enabled = enabled
+        self.metadata = {}
+        if metadata_file.exists():
+            self.metadata = yaml.safe_load(metadata_file.read_text()) or {}
+        self.metadata.setdefault('steps', {})
+        self.metadata.setdefault('artifacts', {})
+
+    def get_artifact_fingerprint(self, artifact: str) -> str | None:
+        return self.metadata['artifacts'].get(artifact)
+
+    def set_artifact_fingerprint(self, artifact: str, fingerprint: str):
+        self.metadata['artifacts'][artifact] = fingerprint
+        self.save()
+
+    def is_up_to_date(self, step: Step, fingerprint: str) -> bool:
+        if not self.enabled:
+            return False
+        recorded = self.metadata['steps'].get(step.name, {})
+        if recorded.get('fingerprint') != fingerprint:
+            return False
+        return all(
+            artifact_exists(self.artifact_paths[output]) for output in step.outputs
+            if output in self.artifact_paths)
+
+    def invalidate(self, step: Step):
+        # Forget a step before running it, its outputs are incomplete until it finishes.
+        self.metadata['steps'].pop(step.name, None)
+        for output in step.outputs:
+            self.metadata['artifacts'].pop(output, None)
+        self.save()
+
+    def record(self, step: Step, fingerprint: str, input_fingerprints: dict[str, str]):
+        self.metadata['steps'][step.name] = {
+            'fingerprint': fingerprint,
+            'inputs': {i: input_fingerprints.get(i) for i in step.inputs},
+            'parameters': json.loads(json.dumps(step.parameters, default=str)),
+            'finished': datetime.datetime.now().isoformat(timespec='seconds'),
+        }
+        for output in step.outputs:
+            self.metadata['artifacts'][output] = fingerprint
+        self.save()
+
+    def save(self):
+        # Replace the file atomically, a crash while saving must not leave a truncated file.
+        temporary_file = self.metadata_file.with_name(self.metadata_file.name + '.tmp')
+        with open(temporary_file, 'w') as file:
+            file.write(yaml.safe_dump(self.metadata, sort_keys=False))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_file, self.metadata_file)
+
+
+def get_dependencies(steps: list[Step]) -> dict[str, set[str]]:
+    producers = {}
+    for step in steps:
+        for output in step.outputs:
+            assert output not in producers, \
+                f"Artifact '{output}' is produced by '{producers[output]}' and '{step.name}'."
+            producers[output] = step.name
+
+    dependencies = {}
+    for step in steps:
+        assert step.name not in dependencies, f"Step '{step.name}' is defined multiple times."
+        dependencies[step.name] = {producers[i] for i in step.inputs if i in producers}
+    return dependencies
+
+
+async def _run_coroutine(coroutine, timeout_s: float | None, cancel_event) -> Any:
+    task = asyncio.create_task(asyncio.wait_for(coroutine, timeout_s))
+    cancelled = False
+    while not task.done():
+        if cancel_event.is_set() and not cancelled:
+            # Cancel only once, such that the step can clean up (e.g. stop its processes).
+            task.cancel()
+            cancelled = True
+        await asyncio.wait({task}, timeout=CANCEL_POLL_INTERVAL_S)
+    try:
+        return task.result()
+    except asyncio.TimeoutError:
+        raise TimeoutError(f'Step did not finish within {timeout_s}s.') from None
+    except asyncio.CancelledError:
+        raise RuntimeError('Step was cancelled because another step failed.') from None
+
+
+@contextlib.contextmanager
+def _environment(variables: dict[str, str]):
+    previous = {name: os.environ.get(name) for name in variables}
+    os.environ.update(variables)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def call_step_function(function: Callable[..., Any], kwargs: dict[str, Any],
+                       timeout_s: float | None, cancel_event,
+                       environment: dict[str, str] | None = None) -> resource_telemetry.Telemetry:
+    """Run a step function and return the resources it used."""
+    monitor = resource_telemetry.ResourceMonitor()
+    try:
+        # Child processes started by the step inherit the environment of the worker.
+        with _environment(environment or {}), monitor:
+            if inspect.iscoroutinefunction(function):
+                asyncio.run(_run_coroutine(function(**kwargs), timeout_s, cancel_event))
+            else:
+                function(**kwargs)
+    except Exception as error:
+        # Attributes of exceptions survive the transfer from the worker process.
+        error.telemetry = monitor.telemetry
+        raise
+    return monitor.telemetry
+
+
+class ResourceBudget:
+    """
+    Limits the total amount of resources used by all running steps.
+
+    Resources without a capacity are unlimited. A step demanding more than the capacity of a
+    resource is granted the whole capacity, such that it can still run on its own.
+    """
+
+    def __init__(self, capacities: dict[str, float]):
+        self.capacities = capacities
+        self.used = {resource: 0.0 for resource in capacities}
+
+    def _clip(self, demand: dict[str, float]) -> dict[str, float]:
+        return {
+            resource: min(amount, self.capacities[resource])
+            for resource, amount in demand.items() if resource in self.capacities
+        }
+
+    def try_acquire(self, demand: dict[str, float]) -> bool:
+        demand = self._clip(demand)
+        if any(self.used[r] + amount > self.capacities[r] for r, amount in demand.items()):
+            return False
+        for resource, amount in demand.items():
+            self.used[resource] += amount
+        return True
+
+    def release(self, demand: dict[str, float]):
+        for resource, amount in self._clip(demand).items():
+            self.used[resource] -= amount
+
+
+@dataclasses.dataclass
+class Pipeline:
+    """
+    Steps that build the maps of one output folder.
+
+    The telemetry of every step is added to the pipeline as soon as the step finished (or failed).
+    """
+    name: str
+    steps: list[Step]
+    cache: StepCache | None = None
+    journal: run_journal.RunJournal | None = None
+    # Environment variables set while the steps are running, e.g. to isolate their ROS graphs.
+    environment: dict[str, str] = dataclasses.field(default_factory=dict)
+    telemetry: dict[str, resource_telemetry.Telemetry] = dataclasses.field(default_factory=dict)
+
+
+def check_acyclic(dependencies: dict[str, set[str]]):
+    remaining = dict(dependencies)
+    while remaining:
+        ready = [name for name, deps in remaining.items() if not deps & remaining.keys()]
+        if not ready:
+            raise RuntimeError(f'Circular dependency between steps: {list(remaining)}.')
+        for name in ready:
+            del remaining[name]
+
+
+class _PipelineState:
+
+    def __init__(self, pipeline: Pipeline, cancel_event):
+        self.pipeline = pipeline
+        self.cancel_event = cancel_event
+        self.dependencies = get_dependencies(pipeline.steps)
+        check_acyclic(self.dependencies)
+        self.steps_by_name = {step.name: step for step in pipeline.steps}
+        self.pending = [step.name for step in pipeline.steps]
+        self.completed = set()
+        self.num_running = 0
+        self.error = None
+        self.fingerprints = {}
+
+    @property
+    def started(self) -> bool:
+        return len(self.pending) < len(self.pipeline.steps)
+
+    @property
+    def done(self) -> bool:
+        return (self.error is not None or not self.pending) and self.num_running == 0
+
+    def get_ready_steps(self) -> list[Step]:
+        if self.error is not None:
+            return []
+        return [
+            self.steps_by_name[name] for name in self.pending
+            if self.dependencies[name] <= self.completed
+        ]
+
+    def qualified_name(self, step: Step) -> str:
+        return f'{self.pipeline.name}/{step.name}' if self.pipeline.name else step.name
+
+    def get_input_fingerprints(self, step: Step) -> dict[str, str]:
+        return {i: self.pipeline.cache.get_artifact_fingerprint(i) for i in step.inputs}
+
+    def log(self, event: str, step: Step, **fields):
+        if self.pipeline.journal is not None:
+            self.pipeline.journal.append(event, step=step.name, **fields)
+
+
+def run_pipelines(pipelines: list[Pipeline], num_workers: int,
+                  max_concurrent_pipelines: int | None = None,
+                  budget: ResourceBudget | None = None) -> dict[str, Exception]:
+    """
+    Run the steps of multiple pipelines in a shared process pool.
+
+    Every step is started as soon as its dependencies are done and the budget has room for its
+    resources. Steps of earlier pipelines are started first, and at most max_concurrent_pipelines
+    pipelines are in progress at the same time.
+
+    If a pipeline has a cache, steps whose inputs and parameters did not change since they last
+    finished are skipped. If a step fails no further steps of its pipeline are started and running
+    coroutine steps of the pipeline are cancelled, other pipelines are not affected. If a pipeline
+    has a journal, the start and end of every step is appended to it.
+
+    Returns the first error of every failed pipeline by pipeline name.
+    """
+    running = {}
+
+    with multiprocessing.Manager() as manager, \
+            concurrent.futures.ProcessPoolExecutor(max_workers=num_workers) as executor:
+        states = [_PipelineState(pipeline, manager.Event()) for pipeline in pipelines]
+
+        def start_steps():
+            # Skipping a step can make further steps ready, repeat until nothing changes.
+            changed = True
+            while changed:
+                changed = False
+                num_active = sum(1 for s in states if s.started and not s.done)
+                for state in states:
+                    ready = state.get_ready_steps()
+                    if not ready:
+                        continue
+                    if not state.started:
+                        if max_concurrent_pipelines is not None and \
+                                num_active >= max_concurrent_pipelines:
+                            continue
+                        num_active += 1
+                    for step in ready:
+                        name = state.qualified_name(step)
+                        cache = state.pipeline.cache
+                        if cache is not None:
+                            state.fingerprints[step.name] = fingerprint_step(
+                                step, state.get_input_fingerprints(step))
+                            if cache.is_up_to_date(step, state.fingerprints[step.name]):
+                                print(f"Skipping step '{name}', its outputs are up to date.")
+                                state.pending.remove(step.name)
+                                state.completed.add(step.name)
+                                state.pipeline.telemetry[step.name] = \
+                                    resource_telemetry.Telemetry(status='skipped')
+                                state.log('step_skipped', step,
+                                          fingerprint=state.fingerprints[step.name])
+                                changed = True
+                                continue
+                        if budget is not None and not budget.try_acquire(step.resources):
+                            continue
+                        if cache is not None:
+                            cache.invalidate(step)
+                        state.pending.remove(step.name)
+                        state.num_running += 1
+                        print(f"Starting step '{name}'.")
+                        state.log('step_started', step,
+                                  fingerprint=state.fingerprints.get(step.name))
+                        future = executor.submit(call_step_function, step.function, step.kwargs,
+                                                 step.timeout_s, state.cancel_event,
+                                                 state.pipeline.environment)
+                        running[future] = (state, step)
+
+        def finish_step(future: concurrent.futures.Future, state: _PipelineState, step: Step):
+            name = state.qualified_name(step)
+            state.num_running -= 1
+            if budget is not None:
+                budget.release(step.resources)
+            error = future.exception()
+            if error is not None:
+                print(f"Step '{name}' failed: {error}")
+                state.pipeline.telemetry[step.name] = getattr(
+                    error, 'telemetry', resource_telemetry.Telemetry(status='failed'))
+                state.log('step_failed', step, error=str(error))
+                if state.error is None:
+                    state.error = error
+                    state.cancel_event.set()
+                return
+            telemetry = future.result()
+            state.pipeline.telemetry[step.name] = telemetry
+            print(f"Finished step '{name}' after "
+                  f'{resource_telemetry.format_duration(telemetry.wall_time_s)}.')
+            state.completed.add(step.name)
+            state.log('step_finished', step, wall_time_s=telemetry.wall_time_s)
+            if state.pipeline.cache is not None:
+                state.pipeline.cache.record(step, state.fingerprints[step.name],
+                                            state.get_input_fingerprints(step))
+
+        start_steps()
+        while running:
+            done, _ = concurrent.futures.wait(running,
+                                              return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                finish_step(future, *running.pop(future))
+            start_steps()
+
+    return {state.pipeline.name: state.error for state in states if state.error is not None}
+
+
+def run_steps(steps: list[Step], num_workers: int, cache: StepCache | None = None,
+              telemetry: dict[str, resource_telemetry.Telemetry] | None = None,
+              journal: run_journal.RunJournal | None = None):
+    """
+    Run the steps of a single pipeline, see run_pipelines.
+
+    The first error is re-raised once all running steps stopped. If a telemetry dict is given, the
+    resources used by every step are added to it.
+    """
+    pipeline = Pipeline('', steps, cache, journal)
+    if telemetry is not None:
+        pipeline.telemetry = telemetry
+    errors = run_pipelines([pipeline], num_workers)
+    if errors:
+        raise errors['']
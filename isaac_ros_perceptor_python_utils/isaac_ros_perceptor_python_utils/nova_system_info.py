@@ -0,0 +1,79 @@
+# SPDX-FileCopyrightText: NVIDIA CORPORATION & AFFILIATES
+# Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import dataclasses
+import functools
+import os
+import pathlib
+from typing import Any
+
+import isaac_ros_launch_utils as lu
+import yaml
+
+NOVA_SYSTEM_INFO_FILE = pathlib.Path('/etc/nova/systeminfo.yaml')
+# Environment variable to read the system info from another file, e.g. a stub on a machine that is
+# not a Nova robot.
+NOVA_SYSTEM_INFO_FILE_VARIABLE = 'NOVA_SYSTEM_INFO_FILE'
+
+
+@dataclasses.dataclass(frozen=True)
+class NovaSystemInfo:
+    """
+    Parsed Nova system info with the sensors indexed by their type.
+
+    Instances are cached and shared between all launch files of a launch, so they must not be
+    modified.
+    """
+    info: dict[str, Any]
+    # Sensor configs by sensor name, by sensor type. Sensors keep their order in the system info.
+    sensors_by_type: dict[str, dict[str, dict[str, Any]]]
+
+    @classmethod
+    def from_dict(cls, info: dict[str, Any]) -> 'NovaSystemInfo':
+        sensors_by_type = {}
+        for sensor_name, sensor_config in info.get('sensors', {}).items():
+            sensors_by_type.setdefault(sensor_config['type'], {})[sensor_name] = sensor_config
+        return cls(info, sensors_by_type)
+
+    def get_sensors(self, sensor_type: str) -> dict[str, dict[str, Any]]:
+        return self.sensors_by_type.get(sensor_type, {})
+
+
+def get_nova_system_info_file() -> pathlib.Path:
+    return pathlib.Path(os.environ.get(NOVA_SYSTEM_INFO_FILE_VARIABLE, NOVA_SYSTEM_INFO_FILE))
+
+
+def load_nova_system_info(path: pathlib.Path | None = None) -> NovaSystemInfo:
+    """
+    Load the Nova system info, parsing the file only once per launch.
+
+    The launch files of a launch are loaded by the same process, so the cache is shared between
+    them. It is keyed on the modification time, such that a changed file is read again.
+    """
+    path = pathlib.Path(path or get_nova_system_info_file())
+    if not path.is_file():
+        if path == NOVA_SYSTEM_INFO_FILE:
+            # Fail (or fall back) like the launch files did before the system info was cached.
+            return NovaSystemInfo.from_dict(lu.get_nova_system_info())
+        raise FileNotFoundError(f'Nova system info file {path} does not exist.')
+    path = path.resolve()
+    return _load_nova_system_info(path, path.stat().st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=4)
+def _load_nova_system_info(path: pathlib.Path, mtime_ns: int) -> NovaSystemInfo:
+    return NovaSystemInfo.from_dict(yaml.safe_load(path.read_text()))
@@ -0,0 +1,253 @@
+# SPDX-FileCopyrightText: NVIDIA CORPORATION & AFFILIATES
+# Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import collections
+import dataclasses
+import pathlib
+import shutil
+import tempfile
+import time
+from typing import Any
+
+import numpy as np
+from PIL import Image
+import yaml
+
+INDEX_FILE_NAME = 'index.yaml'
+TILES_FOLDER_NAME = 'tiles'
+
+# Map server defaults for the fields that are optional in a map yaml file.
+DEFAULT_MAP_PARAMETERS = {
+    'negate': 0,
+    'occupied_thresh': 0.65,
+    'free_thresh': 0.25,
+    'mode': 'trinary',
+}
+
+
+@dataclasses.dataclass
+class Tile:
+    row: int
+    col: int
+    file: str
+    # Pixel offset of the top left corner of the tile in the full map image.
+    x_px: int
+    y_px: int
+    width_px: int
+    height_px: int
+    # World coordinates of the bottom left corner of the tile, like the origin of a map yaml file.
+    origin_x: float
+    origin_y: float
+
+
+@dataclasses.dataclass
+class TilingReport:
+    num_tiles: int
+    num_skipped_tiles: int
+    original_bytes: int
+    tiled_bytes: int
+    original_load_time_s: float
+    tiled_load_time_s: float
+
+    @property
+    def compression_ratio(self) -> float:
+        return self.original_bytes / self.tiled_bytes if self.tiled_bytes else 0.0
+
+
+def to_occupancy_values(image: np.ndarray, map_parameters: dict[str, Any]) -> np.ndarray:
+    """Convert map image pixels to occupancy grid values (0 free, 100 occupied, -1 unknown)."""
+    # Interpret the pixels like the map server does in trinary mode.
+    occupancy = image / 255.0 if map_parameters['negate'] else (255 - image) / 255.0
+    values = np.full(image.shape, -1, dtype=np.int8)
+    values[occupancy > map_parameters['occupied_thresh']] = 100
+    values[occupancy < map_parameters['free_thresh']] = 0
+    return values
+
+
+def get_unknown_mask(image: np.ndarray, map_parameters: dict[str, Any]) -> np.ndarray:
+    return to_occupancy_values(image, map_parameters) == -1
+
+
+def get_size(path: pathlib.Path) -> int:
+    if path.is_file():
+        return path.stat().st_size
+    return sum(p.stat().st_size for p in path.rglob('*') if p.is_file())
+
+
+def tile_occupancy_map(map_yaml_file: pathlib.Path, output_folder: pathlib.Path,
+                       tile_size_px: int = 512) -> TilingReport:
+    """
+    Split an occupancy map in map server format (yaml and image) into compressed tiles.
+
+    The tiles are written as losslessly compressed PNG images next to an index listing the pixel
+    and world extent of every tile. Tiles without any free or occupied cell are not written.
+    """
+    map_yaml_file = pathlib.Path(map_yaml_file)
+    map_parameters = {**DEFAULT_MAP_PARAMETERS, **yaml.safe_load(map_yaml_file.read_text())}
+    image_file = map_yaml_file.parent / map_parameters['image']
+
+    start_time = time.monotonic()
+    image = np.asarray(Image.open(image_file).convert('L'))
+    original_load_time_s = time.monotonic() - start_time
+    unknown = get_unknown_mask(image, map_parameters)
+    height_px, width_px = image.shape
+    resolution = map_parameters['resolution']
+    origin_x, origin_y = map_parameters['origin'][:2]
+
+    # Write to a temporary folder first, such that consumers never see a partially written map.
+    output_folder = pathlib.Path(output_folder)
+    output_folder.parent.mkdir(parents=True, exist_ok=True)
+    temporary_folder = pathlib.Path(tempfile.mkdtemp(dir=output_folder.parent,
+                                                     prefix=output_folder.name))
+    (temporary_folder / TILES_FOLDER_NAME).mkdir()
+    tiles = []
+    num_skipped_tiles = 0
+    for row, y_px in enumerate(range(0, height_px, tile_size_px)):
+        for col, x_px in enumerate(range(0, width_px, tile_size_px)):
+            window = np.s_[y_px:y_px + tile_size_px, x_px:x_px + tile_size_px]
+            if unknown[window].all():
+                num_skipped_tiles += 1
+                continue
+            tile_image = image[window]
+            tile = Tile(
+                row=row,
+                col=col,
+                file=f'{TILES_FOLDER_NAME}/{row}_{col}.png',
+                x_px=x_px,
+                y_px=y_px,
+                width_px=tile_image.shape[1],
+                height_px=tile_image.shape[0],
+                # Image rows go from top to bottom, the map origin is its bottom left corner.
+                origin_x=origin_x + x_px * resolution,
+                origin_y=origin_y + (height_px - y_px - tile_image.shape[0]) * resolution,
+            )
+            Image.fromarray(tile_image).save(temporary_folder / tile.file, optimize=True)
+            tiles.append(tile)
+
+    index = {
+        'map': {key: value for key, value in map_parameters.items() if key != 'image'},
+        'width_px': width_px,
+        'height_px': height_px,
+        'tile_size_px': tile_size_px,
+        'tiles': [dataclasses.asdict(tile) for tile in tiles],
+    }
+    (temporary_folder / INDEX_FILE_NAME).write_text(yaml.safe_dump(index, sort_keys=False))
+    if output_folder.exists():
+        shutil.rmtree(output_folder)
+    temporary_folder.rename(output_folder)
+
+    start_time = time.monotonic()
+    TiledOccupancyMap(output_folder).read_region()
+    tiled_load_time_s = time.monotonic() - start_time
+    return TilingReport(
+        num_tiles=len(tiles),
+        num_skipped_tiles=num_skipped_tiles,
+        original_bytes=get_size(map_yaml_file) + get_size(image_file),
+        tiled_bytes=get_size(output_folder),
+        original_load_time_s=original_load_time_s,
+        tiled_load_time_s=tiled_load_time_s,
+    )
+
+
+class TiledOccupancyMap:
+    """
+    Reader for occupancy maps written by tile_occupancy_map, loading only the needed tiles.
+
+    Up to cache_size decoded tiles are kept in memory, the least recently used ones are dropped.
+    """
+
+    def __init__(self, folder: pathlib.Path, cache_size: int = 0):
+        self.folder = pathlib.Path(folder)
+        self.cache_size = cache_size
+        self._cache = collections.OrderedDict()
+        index = yaml.safe_load((self.folder / INDEX_FILE_NAME).read_text())
+        self.map_parameters = index['map']
+        self.width_px = index['width_px']
+        self.height_px = index['height_px']
+        self.tile_size_px = index['tile_size_px']
+        self.tiles = {(t['row'], t['col']): Tile(**t) for t in index['tiles']}
+
+    @property
+    def resolution(self) -> float:
+        return self.map_parameters['resolution']
+
+    @property
+    def origin(self) -> tuple[float, float]:
+        return tuple(self.map_parameters['origin'][:2])
+
+    @property
+    def bounds(self) -> tuple[float, float, float, float]:
+        """Return the region covered by the stored tiles as min_x, min_y, max_x, max_y."""
+        tiles = self.tiles.values()
+        if not tiles:
+            return (*self.origin, *self.origin)
+        return (min(t.origin_x for t in tiles), min(t.origin_y for t in tiles),
+                max(t.origin_x + t.width_px * self.resolution for t in tiles),
+                max(t.origin_y + t.height_px * self.resolution for t in tiles))
+
+    def get_tiles(self, min_x: float = -np.inf, min_y: float = -np.inf, max_x: float = np.inf,
+                  max_y: float = np.inf) -> list[Tile]:
+        """Return the stored tiles overlapping the given region in world coordinates."""
+        return [
+            tile for tile in self.tiles.values()
+            if tile.origin_x <= max_x and tile.origin_y <= max_y
+            and tile.origin_x + tile.width_px * self.resolution >= min_x
+            and tile.origin_y + tile.height_px * self.resolution >= min_y
+        ]
+
+    def read_tile(self, tile: Tile) -> np.ndarray:
+        key = (tile.row, tile.col)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        image = np.asarray(Image.open(self.folder / tile.file).convert('L'))
+        if self.cache_size > 0:
+            self._cache[key] = image
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return image
+
+    def get_unknown_value(self) -> int:
+        # A pixel value the map server interprets as unknown.
+        occupancy = (self.map_parameters['free_thresh'] +
+                     self.map_parameters['occupied_thresh']) / 2
+        value = round(occupancy * 255)
+        return value if self.map_parameters['negate'] else 255 - value
+
+    def read_region(self, min_x: float = -np.inf, min_y: float = -np.inf, max_x: float = np.inf,
+                    max_y: float = np.inf) -> tuple[np.ndarray, tuple[float, float]]:
+        """
+        Assemble the image of the tiles overlapping a region.
+
+        Returns the image, covering whole tiles, and the world coordinates of its bottom left
+        corner. Tiles that were not stored because they are unknown are filled as unknown.
+        """
+        tiles = self.get_tiles(min_x, min_y, max_x, max_y)
+        if not tiles:
+            return np.zeros((0, 0), dtype=np.uint8), self.origin
+        x_px = min(t.x_px for t in tiles)
+        y_px = min(t.y_px for t in tiles)
+        end_x_px = max(t.x_px + t.width_px for t in tiles)
+        end_y_px = max(t.y_px + t.height_px for t in tiles)
+        image = np.full((end_y_px - y_px, end_x_px - x_px), self.get_unknown_value(),
+                        dtype=np.uint8)
+        for tile in tiles:
+            image[tile.y_px - y_px:tile.y_px - y_px + tile.height_px,
+                  tile.x_px - x_px:tile.x_px - x_px + tile.width_px] = self.read_tile(tile)
+        origin = (self.origin[0] + x_px * self.resolution,
+                  self.origin[1] + (self.height_px - end_y_px) * self.resolution)
+        return image, origin
@@ -0,0 +1,189 @@
+# SPDX-FileCopyrightText: NVIDIA CORPORATION & AFFILIATES
+# Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+"""
+Perceptor configurations, i.e. the modules that run for every stereo camera.
+
+Kept free of launch dependencies, such that configurations can be resolved (and tested) without a
+launch context.
+"""
+
+import ast
+import dataclasses
+
+STEREO_CAMERAS = [
+    'front_stereo_camera',
+    'back_stereo_camera',
+    'left_stereo_camera',
+    'right_stereo_camera',
+]
+
+# Modules that can be enabled per stereo camera.
+PERCEPTOR_MODULES = [
+    'driver',
+    'rectify',
+    'resize',
+    'reformat',
+    'ess_full',
+    'ess_light',
+    'ess_skip_frames',
+    'vgl',
+    'cuvslam',
+    'nvblox',
+    'nvblox_people',
+]
+
+# Camera config string is a subset of PERCEPTOR_MODULES.
+perceptor_configurations = {
+    'no_cameras': {
+        'front_stereo_camera': '',
+        'back_stereo_camera': '',
+        'left_stereo_camera': '',
+        'right_stereo_camera': '',
+    },
+    'front_configuration': {
+        'front_stereo_camera': 'driver,rectify,ess_full,vgl,cuvslam,nvblox',
+        'back_stereo_camera': '',
+        'left_stereo_camera': '',
+        'right_stereo_camera': '',
+    },
+    'front_people_configuration': {
+        'front_stereo_camera': 'driver,rectify,ess_full,vgl,cuvslam,nvblox_people',
+        'back_stereo_camera': '',
+        'left_stereo_camera': '',
+        'right_stereo_camera': '',
+    },
+    'front_left_right_configuration': {
+        'front_stereo_camera': 'driver,rectify,ess_full,vgl,cuvslam,nvblox',
+        'back_stereo_camera': '',
+        'left_stereo_camera': 'driver,rectify,ess_light,ess_skip_frames,vgl,cuvslam,nvblox',
+        'right_stereo_camera': 'driver,rectify,ess_light,ess_skip_frames,vgl,cuvslam,nvblox',
+    },
+    'front_left_right_vslam_configuration': {
+        'front_stereo_camera': 'driver,rectify,ess_full,vgl,cuvslam,nvblox',
+        'back_stereo_camera': '',
+        'left_stereo_camera': 'driver,rectify,vgl,cuvslam',
+        'right_stereo_camera': 'driver,rectify,vgl,cuvslam',
+    },
+    'front_back_left_right_vgl_configuration': {
+        'front_stereo_camera': 'driver,rectify,ess_full,vgl,cuvslam,nvblox',
+        'back_stereo_camera': 'driver,rectify,vgl',
+        'left_stereo_camera': 'driver,rectify,ess_full,vgl,cuvslam,nvblox',
+        'right_stereo_camera': 'driver,rectify,ess_full,vgl,cuvslam,nvblox',
+    },
+    'front_driver_rectify': {
+        'front_stereo_camera': 'driver,rectify',
+        'back_stereo_camera': '',
+        'left_stereo_camera': '',
+        'right_stereo_camera': '',
+    },
+    'front_left_right_configuration_nodriver': {
+        'front_stereo_camera': 'ess_full,vgl,cuvslam,nvblox',
+        'back_stereo_camera': '',
+        'left_stereo_camera': 'ess_light,ess_skip_frames,vgl,cuvslam,nvblox',
+        'right_stereo_camera': 'ess_light,ess_skip_frames,vgl,cuvslam,nvblox',
+    },
+    'front_back_left_right_vo_configuration': {
+        'front_stereo_camera': 'driver,cuvslam',
+        'back_stereo_camera': 'driver,cuvslam',
+        'left_stereo_camera': 'driver,cuvslam',
+        'right_stereo_camera': 'driver,cuvslam',
+    },
+    'front_left_right_ess_full_configuration': {
+        'front_stereo_camera': 'driver,rectify,ess_full,cuvslam,nvblox',
+        'back_stereo_camera': '',
+        'left_stereo_camera': 'driver,rectify,ess_full,cuvslam,nvblox',
+        'right_stereo_camera': 'driver,rectify,ess_full,cuvslam,nvblox',
+    },
+}
+
+
+@dataclasses.dataclass(frozen=True)
+class PerceptorConfiguration:
+    """
+    Modules enabled for every stereo camera, parsed from a configuration string once.
+
+    Modules are matched exactly, e.g. 'nvblox' does not match 'nvblox_people'. Running nvblox with
+    people segmentation implies running nvblox, see has_module.
+    """
+    # Enabled modules by camera, in the order they were configured.
+    cameras: dict[str, tuple[str, ...]]
+
+    @classmethod
+    def parse(cls, configuration: str | dict[str, str]) -> 'PerceptorConfiguration':
+        """Parse a configuration dict, or its string representation as passed to launch files."""
+        if isinstance(configuration, str):
+            configuration = ast.literal_eval(configuration)
+        return cls({camera: parse_modules(config) for camera, config in configuration.items()})
+
+    def has_module(self, camera: str, module: str) -> bool:
+        modules = self.cameras.get(camera, ())
+        if module == 'nvblox':
+            return 'nvblox' in modules or 'nvblox_people' in modules
+        return module in modules
+
+    def is_enabled(self, module: str) -> bool:
+        return any(self.has_module(camera, module) for camera in self.cameras)
+
+    def get_cameras_with(self, module: str) -> list[str]:
+        return [camera for camera in self.cameras if self.has_module(camera, module)]
+
+    def get_camera_config(self, camera: str) -> str:
+        return ','.join(self.cameras.get(camera, ()))
+
+    def without(self, modules: list[str]) -> 'PerceptorConfiguration':
+        return PerceptorConfiguration({
+            camera: tuple(m for m in camera_modules if m not in modules)
+            for camera, camera_modules in self.cameras.items()
+        })
+
+    def to_launch_value(self) -> str:
+        # Same format as the configurations of perceptor_configurations.
+        return str({camera: self.get_camera_config(camera) for camera in self.cameras})
+
+
+def parse_modules(config: str) -> tuple[str, ...]:
+    modules = tuple(m.strip() for m in config.split(',') if m.strip())
+    unknown_modules = [m for m in modules if m not in PERCEPTOR_MODULES]
+    if unknown_modules:
+        raise ValueError(f"Unknown perceptor modules {unknown_modules} in '{config}', expected a "
+                         f'subset of {PERCEPTOR_MODULES}.')
+    return modules
+
+
+def resolve_perceptor_configuration(stereo_camera_configuration: str, disable_cuvslam: bool,
+                                    disable_nvblox: bool,
+                                    disable_vgl: bool) -> PerceptorConfiguration:
+    if stereo_camera_configuration not in perceptor_configurations:
+        raise ValueError(f"Unknown stereo camera configuration '{stereo_camera_configuration}', "
+                         f'expected one of {list(perceptor_configurations)}.')
+    configuration = PerceptorConfiguration.parse(
+        perceptor_configurations[stereo_camera_configuration])
+    # Remove cuvslam if cuvslam is disabled (e.g. when enabling wheel odometry).
+    if disable_cuvslam:
+        configuration = configuration.without(['cuvslam'])
+    # Remove nvblox (and ESS) if nvblox is disabled.
+    if disable_nvblox:
+        configuration = configuration.without(
+            ['ess_full', 'ess_light', 'ess_skip_frames', 'nvblox', 'nvblox_people'])
+    # Remove camera localization if camera localization is disabled.
+    if disable_vgl:
+        configuration = configuration.without(['vgl'])
+    # Remove rectify if both nvblox and camera localization are disabled, unless rectification is
+    # all the configuration does.
+    if disable_nvblox and disable_vgl and stereo_camera_configuration != 'front_driver_rectify':
+        configuration = configuration.without(['rectify'])
+    return configuration
@@ -0,0 +1,82 @@
+# SPDX-FileCopyrightText: NVIDIA CORPORATION & AFFILIATES
+# Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import hashlib
+import importlib.metadata
+import pathlib
+import sys
+
+from packaging.requirements import InvalidRequirement, Requirement
+
+from isaac_ros_perceptor_python_utils import cache_utils
+
+
+def get_stamp_file(requirements_file: pathlib.Path) -> pathlib.Path:
+    # The same requirements can be installed for one interpreter (or virtual env) but not another.
+    digest = hashlib.sha256(pathlib.Path(requirements_file).read_bytes())
+    digest.update(sys.executable.encode())
+    return cache_utils.get_cache_folder() / 'pip_requirements' / f'{digest.hexdigest()}.stamp'
+
+
+def check_installed(requirements_file: pathlib.Path) -> bool | None:
+    """
+    Check whether all requirements are installed, without accessing the network.
+
+    Returns None if this can not be decided from the installed distributions, e.g. for requirements
+    given as URLs, editable installs or nested requirement files.
+    """
+    for line in pathlib.Path(requirements_file).read_text().splitlines():
+        line = line.split(' #')[0].strip()
+        if not line or line.startswith('#'):
+            continue
+        if line.startswith('-'):
+            return None
+        try:
+            requirement = Requirement(line)
+        except InvalidRequirement:
+            return None
+        if requirement.url:
+            return None
+        if requirement.marker is not None and not requirement.marker.evaluate():
+            continue
+        try:
+            version = importlib.metadata.version(requirement.name)
+        except importlib.metadata.PackageNotFoundError:
+            return False
+        if not requirement.specifier.contains(version, prereleases=True):
+            return False
+    return True
+
+
+def is_installed(requirements_file: pathlib.Path) -> bool:
+    """
+    Return whether all requirements are installed.
+
+    The installed distributions are checked first, such that requirements that were installed by
+    other means (or uninstalled since) are detected. Only if that is inconclusive, the stamp
+    written by mark_installed is used.
+    """
+    installed = check_installed(requirements_file)
+    if installed is None:
+        return get_stamp_file(requirements_file).exists()
+    return installed
+
+
+def mark_installed(requirements_file: pathlib.Path):
+    stamp_file = get_stamp_file(requirements_file)
+    stamp_file.parent.mkdir(parents=True, exist_ok=True)
+    stamp_file.write_text(f'{pathlib.Path(requirements_file).resolve()}\n')
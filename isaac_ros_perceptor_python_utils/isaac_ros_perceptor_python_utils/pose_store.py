@@ -0,0 +1,208 @@
+# SPDX-FileCopyrightText: NVIDIA CORPORATION & AFFILIATES
+# Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import dataclasses
+import pathlib
+import shutil
+import tempfile
+
+import numpy as np
+
+NANOSECONDS_PER_SECOND = 1_000_000_000
+
+STAMPS_FILE_NAME = 'stamps_ns.npy'
+POSITIONS_FILE_NAME = 'positions.npy'
+ORIENTATIONS_FILE_NAME = 'orientations.npy'
+
+# Quaternions closer than this (cosine of half the angle between them) are interpolated linearly,
+# slerp is numerically unstable for them.
+SLERP_DOT_THRESHOLD = 0.9995
+
+
+def parse_stamp_ns(stamp: str) -> int:
+    # Parse the decimal seconds exactly, a float64 can not represent all nanosecond stamps.
+    seconds, _, fraction = stamp.partition('.')
+    return int(seconds) * NANOSECONDS_PER_SECOND + int(fraction[:9].ljust(9, '0'))
+
+
+@dataclasses.dataclass
+class PoseTable:
+    """
+    Time-sorted poses stored as contiguous arrays.
+
+    A table is saved as a folder of .npy files, which can be memory mapped, such that tables with
+    millions of poses are opened without reading or parsing them. The sorted stamps are the time
+    index of the table.
+
+    stamps_ns: (N,) int64 stamps in nanoseconds.
+    positions: (N, 3) float64 translations x, y, z.
+    orientations: (N, 4) float64 unit quaternions x, y, z, w.
+    """
+    stamps_ns: np.ndarray
+    positions: np.ndarray
+    orientations: np.ndarray
+
+    def __post_init__(self):
+        if not (len(self.stamps_ns) == len(self.positions) == len(self.orientations)):
+            raise ValueError('The stamps, positions and orientations differ in length.')
+
+    def __len__(self) -> int:
+        return len(self.stamps_ns)
+
+    @classmethod
+    def from_tum(cls, tum_file: pathlib.Path) -> 'PoseTable':
+        """Read a file with lines 'timestamp x y z qx qy qz qw', the timestamp in seconds."""
+        stamps_ns = []
+        poses = []
+        with open(tum_file) as file:
+            for line in file:
+                values = line.split()
+                if not values or values[0].startswith('#'):
+                    continue
+                stamps_ns.append(parse_stamp_ns(values[0]))
+                poses.append([float(v) for v in values[1:8]])
+        stamps_ns = np.array(stamps_ns, dtype=np.int64)
+        poses = np.array(poses, dtype=np.float64).reshape(-1, 7)
+        order = np.argsort(stamps_ns, kind='stable')
+        return cls(stamps_ns[order], poses[order, :3], poses[order, 3:])
+
+    def save(self, folder: pathlib.Path):
+        # Write to a temporary folder first, such that readers never see a partially written table.
+        folder = pathlib.Path(folder)
+        folder.parent.mkdir(parents=True, exist_ok=True)
+        temporary_folder = pathlib.Path(tempfile.mkdtemp(dir=folder.parent, prefix=folder.name))
+        np.save(temporary_folder / STAMPS_FILE_NAME, np.ascontiguousarray(self.stamps_ns))
+        np.save(temporary_folder / POSITIONS_FILE_NAME, np.ascontiguousarray(self.positions))
+        np.save(temporary_folder / ORIENTATIONS_FILE_NAME, np.ascontiguousarray(self.orientations))
+        if folder.exists():
+            shutil.rmtree(folder)
+        temporary_folder.rename(folder)
+
+    @classmethod
+    def load(cls, folder: pathlib.Path, mmap: bool = True) -> 'PoseTable':
+        mmap_mode = 'r' if mmap else None
+        folder = pathlib.Path(folder)
+        return cls(
+            np.load(folder / STAMPS_FILE_NAME, mmap_mode=mmap_mode),
+            np.load(folder / POSITIONS_FILE_NAME, mmap_mode=mmap_mode),
+            np.load(folder / ORIENTATIONS_FILE_NAME, mmap_mode=mmap_mode),
+        )
+
+    def get_time_range(self) -> tuple[int, int]:
+        return int(self.stamps_ns[0]), int(self.stamps_ns[-1])
+
+    def lookup(self, stamps_ns: np.ndarray | int) -> np.ndarray | int:
+        """
+        Return the index of the last pose at or before every stamp, -1 for stamps before the first.
+
+        Takes O(log N) per stamp.
+        """
+        return np.searchsorted(self.stamps_ns, stamps_ns, side='right') - 1
+
+    def interpolate(self, stamps_ns: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Interpolate the poses at the given stamps.
+
+        Positions are interpolated linearly and orientations by slerp. The poses of stamps outside
+        of the time range of the table are NaN.
+        """
+        stamps_ns = np.atleast_1d(np.asarray(stamps_ns, dtype=np.int64))
+        positions = np.full((len(stamps_ns), 3), np.nan)
+        orientations = np.full((len(stamps_ns), 4), np.nan)
+        if len(self) == 0:
+            return positions, orientations
+        valid = (stamps_ns >= self.stamps_ns[0]) & (stamps_ns <= self.stamps_ns[-1])
+        stamps_ns = stamps_ns[valid]
+
+        # Interpolate between the poses before and after every stamp.
+        after = np.clip(np.searchsorted(self.stamps_ns, stamps_ns, side='left'), 1,
+                        max(len(self) - 1, 1))
+        before = after - 1
+        if len(self) == 1:
+            after = before
+        duration_ns = self.stamps_ns[after] - self.stamps_ns[before]
+        ratio = np.divide(stamps_ns - self.stamps_ns[before], duration_ns,
+                          out=np.zeros(len(stamps_ns)), where=duration_ns > 0)[:, np.newaxis]
+
+        positions[valid] = (1 - ratio) * self.positions[before] + ratio * self.positions[after]
+        orientations[valid] = slerp(self.orientations[before], self.orientations[after], ratio)
+        return positions, orientations
+
+    def change_frame(self, position: np.ndarray, orientation: np.ndarray) -> 'PoseTable':
+        """
+        Return the poses of another frame that is rigidly attached to the posed frame.
+
+        The pose of the posed frame in the other frame is given, e.g. of a camera rig in base_link.
+        The world frame, which is where the posed frame started, changes along with it, i.e. the
+        returned poses are T * P * T^-1.
+        """
+        inverse_position, inverse_orientation = invert(position, orientation)
+        positions, orientations = compose(self.positions, self.orientations, inverse_position,
+                                          inverse_orientation)
+        positions, orientations = compose(position, orientation, positions, orientations)
+        return PoseTable(np.array(self.stamps_ns), positions, orientations)
+
+
+def multiply_quaternions(q0: np.ndarray, q1: np.ndarray) -> np.ndarray:
+    """Hamilton product of quaternions x, y, z, w, broadcast along the first axis."""
+    x0, y0, z0, w0 = np.moveaxis(np.asarray(q0, dtype=np.float64), -1, 0)
+    x1, y1, z1, w1 = np.moveaxis(np.asarray(q1, dtype=np.float64), -1, 0)
+    return np.stack([
+        w0 * x1 + x0 * w1 + y0 * z1 - z0 * y1,
+        w0 * y1 - x0 * z1 + y0 * w1 + z0 * x1,
+        w0 * z1 + x0 * y1 - y0 * x1 + z0 * w1,
+        w0 * w1 - x0 * x1 - y0 * y1 - z0 * z1,
+    ], axis=-1)
+
+
+def rotate(orientation: np.ndarray, vector: np.ndarray) -> np.ndarray:
+    """Rotate vectors x, y, z by quaternions x, y, z, w, broadcast along the first axis."""
+    orientation = np.asarray(orientation, dtype=np.float64)
+    vector = np.asarray(vector, dtype=np.float64)
+    # v' = v + 2 * u x (u x v + w * v), with u the vector part of the quaternion.
+    u = orientation[..., :3]
+    w = orientation[..., 3:]
+    return vector + 2 * np.cross(u, np.cross(u, vector) + w * vector)
+
+
+def compose(position0: np.ndarray, orientation0: np.ndarray, position1: np.ndarray,
+            orientation1: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Return the transform T0 * T1, broadcast along the first axis."""
+    return (np.asarray(position0) + rotate(orientation0, position1),
+            multiply_quaternions(orientation0, orientation1))
+
+
+def invert(position: np.ndarray, orientation: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    conjugate = np.asarray(orientation, dtype=np.float64) * np.array([-1.0, -1.0, -1.0, 1.0])
+    return -rotate(conjugate, position), conjugate
+
+
+def slerp(q0: np.ndarray, q1: np.ndarray, ratio: np.ndarray) -> np.ndarray:
+    """Spherical linear interpolation of the (N, 4) quaternions q0 and q1 by the (N, 1) ratios."""
+    dot = np.sum(q0 * q1, axis=1, keepdims=True)
+    # q and -q are the same rotation, interpolate along the shorter arc.
+    q1 = np.where(dot < 0, -q1, q1)
+    dot = np.abs(dot)
+
+    angle = np.arccos(np.clip(dot, -1.0, 1.0))
+    sin_angle = np.sin(angle)
+    use_slerp = dot < SLERP_DOT_THRESHOLD
+    safe_sin_angle = np.where(use_slerp, sin_angle, 1.0)
+    weight0 = np.where(use_slerp, np.sin((1 - ratio) * angle) / safe_sin_angle, 1 - ratio)
+    weight1 = np.where(use_slerp, np.sin(ratio * angle) / safe_sin_angle, ratio)
+    result = weight0 * q0 + weight1 * q1
+    return result / np.linalg.norm(result, axis=1, keepdims=True)
@@ -0,0 +1,203 @@
+# SPDX-FileCopyrightText: NVIDIA CORPORATION & AFFILIATES
+# Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import asyncio
+import collections
+import os
+import pathlib
+import re
+import signal
+import subprocess
+from typing import Callable
+
+# Number of output lines printed for a failed process in print mode 'tail'.
+NUM_TAIL_LINES = 20
+# Maximum length of a single output line.
+MAX_LINE_LENGTH = 1024 * 1024
+# Time a process gets after SIGTERM and SIGKILL, and after SIGINT when it is not stopped
+# gracefully (e.g. because the supervisor was cancelled).
+ESCALATION_TIMEOUT_S = 10.0
+
+
+class SupervisedProcess:
+    """A child process whose output is streamed to a log file while it is running."""
+
+    def __init__(self, mnemonic: str, command: list[str], process: asyncio.subprocess.Process,
+                 log_file: pathlib.Path, print_mode: str, shutdown_timeout_s: float):
+        self.mnemonic = mnemonic
+        self.command = command
+        self.process = process
+        self.print_mode = print_mode
+        # Time the process gets after SIGINT when it is stopped gracefully, e.g. to save results.
+        self.shutdown_timeout_s = shutdown_timeout_s
+        self.tail = collections.deque(maxlen=NUM_TAIL_LINES)
+        self._watchers = []
+        self._callbacks = []
+        self._log_file = open(log_file, 'w')
+        self._reader = asyncio.create_task(self._read_output())
+
+    async def _read_output(self):
+        try:
+            async for raw_line in self.process.stdout:
+                line = raw_line.decode(errors='replace').rstrip('\n')
+                self._log_file.write(line + '\n')
+                self._log_file.flush()
+                self.tail.append(line)
+                if self.print_mode == 'all':
+                    print(f'[{self.mnemonic}] {line}')
+                for regex, future in self._watchers:
+                    if not future.done() and regex.search(line):
+                        future.set_result(line)
+                for regex, callback in self._callbacks:
+                    match = regex.search(line)
+                    if match:
+                        callback(match)
+        finally:
+            self._log_file.close()
+            for _, future in self._watchers:
+                if not future.done():
+                    future.set_exception(RuntimeError(f"'{self.mnemonic}' stopped before "
+                                                      'printing the expected output.'))
+
+    async def wait_for_output(self, pattern: str, timeout_s: float) -> str:
+        """Wait until the process prints a line matching the pattern and return the line."""
+        if self._reader.done():
+            raise RuntimeError(f"'{self.mnemonic}' already stopped.")
+        watcher = (re.compile(pattern), asyncio.get_running_loop().create_future())
+        self._watchers.append(watcher)
+        try:
+            return await asyncio.wait_for(watcher[1], timeout_s)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"'{self.mnemonic}' did not print '{pattern}' within "
+                               f'{timeout_s}s.') from None
+        finally:
+            self._watchers.remove(watcher)
+
+    def add_output_callback(self, pattern: str, callback: Callable[[re.Match], None]):
+        """Call the callback with the match of every output line matching the pattern."""
+        self._callbacks.append((re.compile(pattern), callback))
+
+    async def wait(self) -> int:
+        returncode = await self.process.wait()
+        await self._reader
+        return returncode
+
+    async def stop(self, graceful: bool = True) -> bool:
+        """
+        Interrupt the process, then terminate and finally kill its process group.
+
+        Only a graceful stop waits the shutdown timeout of the process after the interrupt.
+        Return whether the process stopped on its own or after the interrupt, i.e. whether it was
+        able to shut down cleanly.
+        """
+        stopped_cleanly = True
+        for sig in [signal.SIGINT, signal.SIGTERM, signal.SIGKILL]:
+            if self.process.returncode is not None:
+                break
+            stopped_cleanly = sig == signal.SIGINT
+            if sig == signal.SIGINT and graceful:
+                timeout_s = self.shutdown_timeout_s
+            else:
+                timeout_s = ESCALATION_TIMEOUT_S
+            try:
+                if sig == signal.SIGINT:
+                    # Only interrupt the process itself to give e.g. ros2 launch the chance to
+                    # shut down its children in order.
+                    self.process.send_signal(sig)
+                else:
+                    os.killpg(self.process.pid, sig)
+            except ProcessLookupError:
+                break
+            try:
+                await asyncio.wait_for(self.process.wait(), timeout_s)
+            except asyncio.TimeoutError:
+                print(f"'{self.mnemonic}' did not stop within {timeout_s}s after {sig.name}.")
+        await self._reader
+        return stopped_cleanly
+
+    def print_tail(self):
+        print(f"Last output of '{self.mnemonic}':")
+        for line in self.tail:
+            print(f'    {line}')
+
+
+class ProcessSupervisor:
+    """
+    Start child processes and stream their output without blocking.
+
+    All processes that are still running when the supervisor is exited (e.g. because a step failed,
+    timed out or was cancelled) are stopped without waiting for them to shut down gracefully.
+    Processes stopped explicitly get their own shutdown timeout after the interrupt, which
+    defaults to the one of the supervisor.
+    """
+
+    def __init__(self, print_mode: str = 'tail', shutdown_timeout_s: float = 30.0):
+        assert print_mode in ['none', 'tail', 'all']
+        self.print_mode = print_mode
+        self.shutdown_timeout_s = shutdown_timeout_s
+        self.processes: list[SupervisedProcess] = []
+
+    async def __aenter__(self) -> 'ProcessSupervisor':
+        return self
+
+    async def __aexit__(self, *_):
+        await self.shutdown()
+
+    async def start(self, mnemonic: str, command: list, log_file: pathlib.Path,
+                    env: dict[str, str] | None = None,
+                    shutdown_timeout_s: float | None = None) -> SupervisedProcess:
+        command = [str(c) for c in command]
+        if self.print_mode != 'none':
+            print(f"Starting '{mnemonic}', logging to {log_file}.")
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            stdin=asyncio.subprocess.DEVNULL,
+            env=env,
+            start_new_session=True,
+            limit=MAX_LINE_LENGTH,
+        )
+        if shutdown_timeout_s is None:
+            shutdown_timeout_s = self.shutdown_timeout_s
+        supervised_process = SupervisedProcess(mnemonic, command, process, log_file,
+                                               self.print_mode, shutdown_timeout_s)
+        self.processes.append(supervised_process)
+        return supervised_process
+
+    async def stop(self, process: SupervisedProcess) -> bool:
+        return await process.stop()
+
+    async def run(self, mnemonic: str, command: list, log_file: pathlib.Path,
+                  allow_failure: bool = False, env: dict[str, str] | None = None,
+                  shutdown_timeout_s: float | None = None) -> int:
+        """Run a process to completion, raise CalledProcessError if it fails."""
+        process = await self.start(mnemonic, command, log_file, env, shutdown_timeout_s)
+        returncode = await process.wait()
+        if returncode != 0:
+            if self.print_mode == 'tail':
+                process.print_tail()
+            if not allow_failure:
+                raise subprocess.CalledProcessError(returncode, process.command)
+            print(f"'{mnemonic}' failed with code {returncode}, continuing.")
+        elif self.print_mode != 'none':
+            print(f"Finished '{mnemonic}'.")
+        return returncode
+
+    async def shutdown(self):
+        running = [p for p in self.processes if p.process.returncode is None]
+        await asyncio.gather(*[p.stop(graceful=False) for p in running])
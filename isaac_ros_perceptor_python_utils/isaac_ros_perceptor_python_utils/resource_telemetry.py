@@ -0,0 +1,150 @@
+# SPDX-FileCopyrightText: NVIDIA CORPORATION & AFFILIATES
+# Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import dataclasses
+import json
+import pathlib
+import resource
+import threading
+import time
+
+import psutil
+
+# Linux reports the block I/O counters of rusage in units of 512 bytes.
+RUSAGE_BLOCK_SIZE = 512
+
+
+@dataclasses.dataclass
+class Telemetry:
+    """Resources used by a process and all its child processes while a step was running."""
+    status: str = 'finished'
+    wall_time_s: float = 0.0
+    cpu_time_s: float = 0.0
+    peak_rss_bytes: int = 0
+    read_bytes: int = 0
+    written_bytes: int = 0
+    num_processes: int = 0
+    peak_num_processes: int = 0
+
+
+def _get_rusage_totals() -> tuple[float, int, int]:
+    cpu_time_s, read_blocks, written_blocks = 0.0, 0, 0
+    for who in [resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN]:
+        usage = resource.getrusage(who)
+        cpu_time_s += usage.ru_utime + usage.ru_stime
+        read_blocks += usage.ru_inblock
+        written_blocks += usage.ru_oublock
+    return cpu_time_s, read_blocks * RUSAGE_BLOCK_SIZE, written_blocks * RUSAGE_BLOCK_SIZE
+
+
+class ResourceMonitor:
+    """
+    Measure the resources used by the current process tree while the monitor is entered.
+
+    CPU time and disk I/O are taken from the rusage of the process and its terminated (and waited
+    for) children, so they are exact once all child processes exited. The peak memory and the
+    number of processes are sampled from the live process tree.
+    """
+
+    def __init__(self, sample_period_s: float = 1.0):
+        self.sample_period_s = sample_period_s
+        self.telemetry = Telemetry()
+        self._process = psutil.Process()
+        self._seen_pids = set()
+        self._stop_event = threading.Event()
+        self._sampler = threading.Thread(target=self._sample_loop, daemon=True)
+
+    def __enter__(self) -> 'ResourceMonitor':
+        self._start_time = time.monotonic()
+        self._start_rusage = _get_rusage_totals()
+        # Sample at the start and the end as well, such that steps shorter than the sample period
+        # are measured too.
+        self._sample()
+        self._sampler.start()
+        return self
+
+    def __exit__(self, exc_type, *_):
+        self._sample()
+        self._stop_event.set()
+        self._sampler.join()
+        cpu_time_s, read_bytes, written_bytes = _get_rusage_totals()
+        self.telemetry.status = 'finished' if exc_type is None else 'failed'
+        self.telemetry.wall_time_s = time.monotonic() - self._start_time
+        self.telemetry.cpu_time_s = cpu_time_s - self._start_rusage[0]
+        self.telemetry.read_bytes = read_bytes - self._start_rusage[1]
+        self.telemetry.written_bytes = written_bytes - self._start_rusage[2]
+        self.telemetry.num_processes = len(self._seen_pids)
+
+    def _sample_loop(self):
+        while not self._stop_event.wait(self.sample_period_s):
+            self._sample()
+
+    def _sample(self):
+        try:
+            children = self._process.children(recursive=True)
+        except psutil.Error:
+            return
+        rss_bytes = self._process.memory_info().rss
+        for child in children:
+            try:
+                rss_bytes += child.memory_info().rss
+            except psutil.Error:
+                # The process exited in the meantime.
+                continue
+            self._seen_pids.add(child.pid)
+        self.telemetry.peak_rss_bytes = max(self.telemetry.peak_rss_bytes, rss_bytes)
+        self.telemetry.peak_num_processes = max(self.telemetry.peak_num_processes,
+                                                len(children))
+
+
+def format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours}:{minutes:02d}:{seconds:02d}'
+
+
+def format_bytes(num_bytes: float) -> str:
+    for unit in ['B', 'KiB', 'MiB', 'GiB']:
+        if num_bytes < 1024:
+            return f'{num_bytes:.1f} {unit}'
+        num_bytes /= 1024
+    return f'{num_bytes:.1f} TiB'
+
+
+def write_report(telemetry: dict[str, Telemetry], output_file: pathlib.Path):
+    report = {name: dataclasses.asdict(t) for name, t in telemetry.items()}
+    output_file.write_text(json.dumps(report, indent=2) + '\n')
+
+
+def print_summary(telemetry: dict[str, Telemetry]):
+    header = ['Step', 'Status', 'Wall time', 'CPU time', 'Peak RSS', 'Read', 'Written',
+              'Processes']
+    rows = [header]
+    for name, t in telemetry.items():
+        rows.append([
+            name,
+            t.status,
+            format_duration(t.wall_time_s),
+            format_duration(t.cpu_time_s),
+            format_bytes(t.peak_rss_bytes),
+            format_bytes(t.read_bytes),
+            format_bytes(t.written_bytes),
+            str(t.num_processes),
+        ])
+    widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+    for row in rows:
+        print('  '.join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip())
@@ -0,0 +1,129 @@
+# SPDX-FileCopyrightText: NVIDIA CORPORATION & AFFILIATES
+# Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import datetime
+import json
+import os
+import pathlib
+from typing import Any
+
+JOURNAL_FILE_NAME = 'journal.jsonl'
+
+
+class RunJournal:
+    """
+    Append-only log of the progress of a mapping run.
+
+    Every event is a single JSON line that is flushed to disk before append returns, such that the
+    journal survives a crash of the process (or the machine) at any point. A line that was only
+    partially written before a crash is ignored when reading the journal.
+
+    The journal only holds a path and can be passed to worker processes, which append to the same
+    file.
+    """
+
+    def __init__(self, journal_file: pathlib.Path):
+        self.journal_file = pathlib.Path(journal_file)
+
+    def append(self, event: str, **fields: Any):
+        entry = {
+            'event': event,
+            'time': datetime.datetime.now().isoformat(timespec='seconds'),
+            **fields,
+        }
+        line = json.dumps(entry, default=str) + '\n'
+        # A single write in append mode is not interleaved with the writes of other processes.
+        fd = os.open(self.journal_file, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            size = os.fstat(fd).st_size
+            if size > 0 and os.pread(fd, 1, size - 1) != b'\n':
+                # Terminate a line that was only partially written before a crash.
+                line = '\n' + line
+            os.write(fd, line.encode())
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def read(self) -> list[dict[str, Any]]:
+        if not self.journal_file.exists():
+            return []
+        events = []
+        for line in self.journal_file.read_text().splitlines():
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        return events
+
+    def get_last_run(self) -> dict[str, Any] | None:
+        """Return the run_started event of the last run, or None if no run was started."""
+        runs = [e for e in self.read() if e['event'] == 'run_started']
+        return runs[-1] if runs else None
+
+    def is_complete(self) -> bool:
+        events = [e for e in self.read() if e['event'] in ['run_started', 'run_finished']]
+        return bool(events) and events[-1]['event'] == 'run_finished'
+
+    def get_resumable_events(self, step_name: str, event_type: str) -> list[dict[str, Any]]:
+        """
+        Return the events of a step that a restarted attempt can build on, oldest first.
+
+        Events (e.g. checkpoints) of interrupted or failed attempts are kept as long as the step is
+        restarted with the same fingerprint. They are discarded once the step finished or its
+        fingerprint changed, e.g. because a parameter was changed.
+        """
+        events = []
+        fingerprint = None
+        for event in self.read():
+            if event.get('step') != step_name:
+                continue
+            if event['event'] == 'step_started':
+                if event.get('fingerprint') is None or event['fingerprint'] != fingerprint:
+                    events = []
+                fingerprint = event.get('fingerprint')
+            elif event['event'] == 'step_finished':
+                events = []
+                fingerprint = None
+            elif event['event'] == event_type:
+                events.append(event)
+        return events
+
+
+def find_incomplete_run(base_folder: pathlib.Path, folder_suffix: str,
+                        sensor_data_bag: pathlib.Path) -> pathlib.Path | None:
+    """
+    Find the most recent output folder in which a run for the same sensor data bag did not finish.
+
+    Output folders are named '<timestamp>_<bag name>', so sorting them by name sorts them by the
+    time the run was started.
+    """
+    if not base_folder.is_dir():
+        return None
+    candidates = sorted((p for p in base_folder.glob(f'*_{folder_suffix}') if p.is_dir()),
+                        reverse=True)
+    for folder in candidates:
+        journal = RunJournal(folder / JOURNAL_FILE_NAME)
+        last_run = journal.get_last_run()
+        if last_run is None:
+            continue
+        if pathlib.Path(last_run['sensor_data_bag']).resolve() != sensor_data_bag.resolve():
+            continue
+        if journal.is_complete():
+            # Only the latest run for the bag is considered, older runs were superseded by it.
+            return None
+        return folder
+    return None
@@ -65,7 +65,7 @@ setup(
     maintainer_email='isaac-ros-maintainers@nvidia.com',
     description='Python ROS utilities used across Isaac Perceptor.',
     license=LICENSE,
-    tests_require=[],
+    tests_require=['pytest'],
     entry_points={},
     cmdclass={
         'build_py': GenerateVersionInfoCommand,
@@ -0,0 +1,38 @@
+# SPDX-FileCopyrightText: NVIDIA CORPORATION & AFFILIATES
+# Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+from isaac_ros_perceptor_python_utils.bow_vocabulary_registry import BowVocabularyRegistry
+
+
+def test_store_and_lookup(tmp_path):
+    registry = BowVocabularyRegistry(tmp_path / 'registry')
+    key = {'site': 'warehouse', 'cameras': 'front_left_right_configuration'}
+    assert registry.lookup(key) is None
+
+    vocabulary = tmp_path / 'vocabulary'
+    vocabulary.mkdir()
+    (vocabulary / 'vocabulary.bin').write_text('first')
+    stored = registry.store(key, vocabulary)
+    assert registry.lookup(key) == stored
+    assert (stored / 'vocabulary.bin').read_text() == 'first'
+
+    # An existing entry is kept, other keys get their own entry.
+    (vocabulary / 'vocabulary.bin').write_text('second')
+    assert registry.store(key, vocabulary) == stored
+    assert (stored / 'vocabulary.bin').read_text() == 'first'
+    assert registry.lookup({**key, 'site': 'office'}) is None
+    assert not list((tmp_path / 'registry').glob('.tmp_*'))
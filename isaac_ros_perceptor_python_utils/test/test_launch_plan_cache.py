@@ -0,0 +1,89 @@
+# SPDX-FileCopyrightText: NVIDIA CORPORATION & AFFILIATES
+# Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import pytest
+
+pytest.importorskip('rclpy')
+pytest.importorskip('composition_interfaces')
+pytest.importorskip('launch_ros')
+
+from isaac_ros_perceptor_python_utils.launch_plan_cache import (  # noqa: E402
+    find_plan_file,
+    get_file_hash,
+    LaunchPlan,
+    load_launch_plan,
+    store_launch_plan,
+)
+
+
+@pytest.fixture
+def plan(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    monkeypatch.setenv('MAP_FOLDER', '/maps')
+    launch_file = tmp_path / 'test.launch.py'
+    launch_file.write_text('# Launch file.\n')
+    parameters_file = tmp_path / 'parameters.yaml'
+    parameters_file.write_text('a: 1\n')
+    return LaunchPlan(
+        launch_file=str(launch_file),
+        launch_arguments={'mode': 'rosbag'},
+        declared_arguments=['mode', 'rosbag'],
+        environment={'MAP_FOLDER': '/maps'},
+        nodes=[],
+        processes=[],
+        input_files={str(path): get_file_hash(path) for path in [launch_file, parameters_file]},
+        package_versions={},
+    )
+
+
+def find_and_load(plan, launch_configurations):
+    plan_file = find_plan_file(plan.launch_file, launch_configurations)
+    return load_launch_plan(plan_file, launch_configurations)
+
+
+def test_plan_is_found_for_the_same_arguments(plan):
+    plan_file = store_launch_plan(plan, {'mode': 'rosbag', 'inherited': '1'})
+    # Configurations that are not declared do not change the plan.
+    assert find_plan_file(plan.launch_file, {'mode': 'rosbag', 'inherited': '2'}) == plan_file
+    loaded, reason = find_and_load(plan, {'mode': 'rosbag'})
+    assert reason == ''
+    assert loaded.launch_arguments == plan.launch_arguments
+
+
+def test_plan_is_invalidated_by_arguments(plan):
+    store_launch_plan(plan, {'mode': 'rosbag'})
+    for launch_configurations in [{'mode': 'real_world'}, {'mode': 'rosbag', 'rosbag': 'bag'}]:
+        loaded, reason = find_and_load(plan, launch_configurations)
+        assert loaded is None
+        assert 'No launch plan' in reason
+
+
+def test_plan_is_invalidated_by_environment(plan, monkeypatch):
+    plan_file = store_launch_plan(plan, {'mode': 'rosbag'})
+    monkeypatch.setenv('MAP_FOLDER', '/other_maps')
+    assert find_plan_file(plan.launch_file, {'mode': 'rosbag'}) != plan_file
+    loaded, reason = load_launch_plan(plan_file, {'mode': 'rosbag'})
+    assert loaded is None
+    assert reason == 'Environment variable MAP_FOLDER changed.'
+
+
+def test_plan_is_invalidated_by_input_files(plan, tmp_path):
+    store_launch_plan(plan, {'mode': 'rosbag'})
+    (tmp_path / 'parameters.yaml').write_text('a: 2\n')
+    loaded, reason = find_and_load(plan, {'mode': 'rosbag'})
+    assert loaded is None
+    assert reason == f'File {tmp_path / "parameters.yaml"} changed.'
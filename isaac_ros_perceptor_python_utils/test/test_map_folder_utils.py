@@ -0,0 +1,128 @@
+# SPDX-FileCopyrightText: NVIDIA CORPORATION & AFFILIATES
+# Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import pytest
+
+from isaac_ros_perceptor_python_utils.map_folder_utils import (
+    get_scalar,
+    merge_keyframe_folders,
+    MergeConflictError,
+    split_text_proto,
+)
+
+CAMERAS = ['front_stereo_camera_left', 'front_stereo_camera_right']
+
+
+def write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+
+
+def write_keyframes(folder, timestamps_us, name_by_id=False):
+    """Write a keyframes folder laid out like the output of rosbag_to_mapping_data."""
+    metadata = []
+    for i, timestamp_us in enumerate(timestamps_us):
+        for j, camera in enumerate(CAMERAS):
+            keyframe_id = i * len(CAMERAS) + j
+            stem = f'{keyframe_id:06d}' if name_by_id else str(timestamp_us)
+            write(folder / camera / f'{stem}.jpg', f'{camera} image {timestamp_us}')
+            write(folder / camera / f'{stem}.pb', f'{camera} features {timestamp_us}')
+            metadata += [
+                'keyframes_metadata {',
+                f'  id: {keyframe_id}',
+                '  camera_to_world {',
+                '    translation {',
+                f'      x: {timestamp_us / 1e6}',
+                '    }',
+                '  }',
+                f'  image_name: "{camera}/{stem}.jpg"',
+                '  camera_params_id: "0"',
+                f'  timestamp_microseconds: {timestamp_us}',
+                '}',
+            ]
+    metadata += [
+        'camera_params_id_to_session_name {',
+        '  key: "0"',
+        f'  value: "{folder.parent.name}"',
+        '}',
+        'initial_pose_type: EIGEN',
+    ]
+    write(folder / 'frames_meta.pbtxt', '\n'.join(metadata) + '\n')
+
+
+def read_keyframes(folder):
+    fields = split_text_proto((folder / 'frames_meta.pbtxt').read_text())
+    return [(int(get_scalar(lines, 'id')), int(get_scalar(lines, 'timestamp_microseconds')),
+             get_scalar(lines, 'image_name'))
+            for name, lines in fields if name == 'keyframes_metadata']
+
+
+@pytest.mark.parametrize('name_by_id', [False, True])
+def test_merge_keyframe_folders_drops_warm_up(tmp_path, name_by_id):
+    # The second shard reads from 1.5s to warm up, but only owns the keyframes from 2s.
+    write_keyframes(tmp_path / 'shard_0' / 'keyframes', [1_000_000, 1_900_000], name_by_id)
+    write_keyframes(tmp_path / 'shard_1' / 'keyframes', [1_600_000, 2_000_000, 2_500_000],
+                    name_by_id)
+    output = tmp_path / 'keyframes'
+    num_keyframes = merge_keyframe_folders(
+        [tmp_path / 'shard_0' / 'keyframes', tmp_path / 'shard_1' / 'keyframes'], output,
+        [(0, 2_000_000_000), (2_000_000_000, 3_000_000_001)])
+
+    assert num_keyframes == 8
+    keyframes = read_keyframes(output)
+    assert [keyframe_id for keyframe_id, _, _ in keyframes] == list(range(8))
+    assert sorted({timestamp for _, timestamp, _ in keyframes}) == [
+        1_000_000, 1_900_000, 2_000_000, 2_500_000]
+    for _, timestamp, image_name in keyframes:
+        assert (output / image_name).read_text().endswith(f'image {timestamp}')
+        assert (output / image_name).with_suffix('.pb').read_text().endswith(
+            f'features {timestamp}')
+    assert len(list(output.rglob('*.jpg'))) == 8
+    assert len(list(output.rglob('*.pb'))) == 8
+    # The remaining metadata is taken from the first shard instead of conflicting.
+    fields = split_text_proto((output / 'frames_meta.pbtxt').read_text())
+    assert [lines for name, lines in fields if name != 'keyframes_metadata'] == [
+        ['camera_params_id_to_session_name {', '  key: "0"', '  value: "shard_0"', '}'],
+        ['initial_pose_type: EIGEN'],
+    ]
+
+
+def test_merge_keyframe_folders_appends_to_existing_map(tmp_path):
+    write_keyframes(tmp_path / 'map' / 'keyframes', [5_000_000], name_by_id=True)
+    write_keyframes(tmp_path / 'update' / 'keyframes', [1_000_000], name_by_id=True)
+    output = tmp_path / 'map' / 'keyframes'
+    assert merge_keyframe_folders([tmp_path / 'update' / 'keyframes'], output) == 4
+    assert read_keyframes(output) == [
+        (0, 1_000_000, 'front_stereo_camera_left/000000.jpg'),
+        (1, 1_000_000, 'front_stereo_camera_right/000001.jpg'),
+        (2, 5_000_000, 'front_stereo_camera_left/000002.jpg'),
+        (3, 5_000_000, 'front_stereo_camera_right/000003.jpg'),
+    ]
+    assert (output / 'front_stereo_camera_left' / '000002.jpg').read_text().endswith('5000000')
+    assert (output / 'front_stereo_camera_right' / '000001.pb').read_text().endswith('1000000')
+    assert len(list(output.rglob('*.jpg'))) == 4
+
+
+def test_merge_keyframe_folders_fails_on_conflict_without_moving(tmp_path):
+    write_keyframes(tmp_path / 'map' / 'keyframes', [1_000_000])
+    write_keyframes(tmp_path / 'update' / 'keyframes', [1_000_000, 2_000_000])
+    output = tmp_path / 'map' / 'keyframes'
+    metadata = (output / 'frames_meta.pbtxt').read_text()
+    with pytest.raises(MergeConflictError):
+        merge_keyframe_folders([tmp_path / 'update' / 'keyframes'], output)
+    assert (output / 'frames_meta.pbtxt').read_text() == metadata
+    assert not (output / 'front_stereo_camera_left' / '2000000.jpg').exists()
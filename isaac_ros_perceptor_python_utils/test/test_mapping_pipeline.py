@@ -0,0 +1,105 @@
+# SPDX-FileCopyrightText: NVIDIA CORPORATION & AFFILIATES
+# Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import pathlib
+
+import pytest
+
+from isaac_ros_perceptor_python_utils.mapping_pipeline import run_steps, Step, StepCache
+from isaac_ros_perceptor_python_utils.run_journal import RunJournal
+
+
+def write_output(log_file: pathlib.Path, name: str, output: pathlib.Path, value: str):
+    # Runs in a worker process, the log file tells the order in which steps ran.
+    with open(log_file, 'a') as file:
+        file.write(name + '\n')
+    output.write_text(value)
+
+
+def fail():
+    raise ValueError('Step failed.')
+
+
+def make_steps(tmp_path, value='a'):
+    log_file = tmp_path / 'log.txt'
+    paths = {name: tmp_path / f'{name}.txt' for name in ['a', 'b', 'c']}
+
+    def make_step(name, inputs, parameters=None):
+        return Step(name, write_output,
+                    dict(log_file=log_file, name=name, output=paths[name], value=name),
+                    inputs=inputs, outputs=[name], parameters=parameters or {})
+
+    # Listed in reverse, the order must follow from the artifacts.
+    steps = [
+        make_step('c', ['a', 'b']),
+        make_step('b', ['a']),
+        make_step('a', ['sensor_data'], {'value': value}),
+    ]
+    return steps, paths, log_file
+
+
+def read_log(log_file):
+    return log_file.read_text().splitlines() if log_file.exists() else []
+
+
+def test_steps_run_in_dependency_order(tmp_path):
+    steps, _, log_file = make_steps(tmp_path)
+    journal = RunJournal(tmp_path / 'journal.jsonl')
+    run_steps(steps, num_workers=2, journal=journal)
+    assert read_log(log_file) == ['a', 'b', 'c']
+    assert [(e['event'], e['step']) for e in journal.read()] == [
+        ('step_started', 'a'), ('step_finished', 'a'),
+        ('step_started', 'b'), ('step_finished', 'b'),
+        ('step_started', 'c'), ('step_finished', 'c'),
+    ]
+
+
+def test_cached_steps_are_skipped(tmp_path):
+    metadata_file = tmp_path / 'metadata.yaml'
+    steps, paths, log_file = make_steps(tmp_path)
+    run_steps(steps, num_workers=2, cache=StepCache(metadata_file, paths))
+    assert read_log(log_file) == ['a', 'b', 'c']
+
+    telemetry = {}
+    run_steps(steps, num_workers=2, cache=StepCache(metadata_file, paths), telemetry=telemetry)
+    assert read_log(log_file) == ['a', 'b', 'c']
+    assert {name: t.status for name, t in telemetry.items()} == {
+        'a': 'skipped', 'b': 'skipped', 'c': 'skipped'}
+
+    # A missing output only re-runs the step producing it, its fingerprint stays the same.
+    paths['b'].unlink()
+    run_steps(steps, num_workers=2, cache=StepCache(metadata_file, paths))
+    assert read_log(log_file) == ['a', 'b', 'c', 'b']
+
+    # A changed parameter invalidates everything downstream.
+    steps, paths, log_file = make_steps(tmp_path, value='changed')
+    run_steps(steps, num_workers=2, cache=StepCache(metadata_file, paths))
+    assert read_log(log_file) == ['a', 'b', 'c', 'b', 'a', 'b', 'c']
+
+
+def test_failed_step_stops_its_dependents(tmp_path):
+    metadata_file = tmp_path / 'metadata.yaml'
+    steps, paths, log_file = make_steps(tmp_path)
+    steps[1] = Step('b', fail, inputs=['a'], outputs=['b'])
+    with pytest.raises(ValueError, match='Step failed.'):
+        run_steps(steps, num_workers=2, cache=StepCache(metadata_file, paths))
+    assert read_log(log_file) == ['a']
+
+    # Only the failed step and its dependents run again.
+    steps, paths, log_file = make_steps(tmp_path)
+    run_steps(steps, num_workers=2, cache=StepCache(metadata_file, paths))
+    assert read_log(log_file) == ['a', 'b', 'c']
@@ -0,0 +1,79 @@
+# SPDX-FileCopyrightText: NVIDIA CORPORATION & AFFILIATES
+# Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import numpy as np
+from PIL import Image
+import pytest
+import yaml
+
+from isaac_ros_perceptor_python_utils.occupancy_map_tiles import (
+    tile_occupancy_map,
+    TiledOccupancyMap,
+    to_occupancy_values,
+)
+
+FREE = 254
+OCCUPIED = 0
+UNKNOWN = 205
+RESOLUTION = 0.05
+ORIGIN = (-10.0, -5.0)
+
+
+@pytest.fixture
+def map_yaml_file(tmp_path):
+    # 300x200 pixels, the top right 100x100 pixels are unknown.
+    image = np.full((200, 300), FREE, dtype=np.uint8)
+    image[150:, :50] = OCCUPIED
+    image[:100, 200:] = UNKNOWN
+    Image.fromarray(image).save(tmp_path / 'map.png')
+    map_yaml_file = tmp_path / 'map.yaml'
+    map_yaml_file.write_text(yaml.safe_dump({
+        'image': 'map.png',
+        'resolution': RESOLUTION,
+        'origin': [*ORIGIN, 0.0],
+        'negate': 0,
+        'occupied_thresh': 0.65,
+        'free_thresh': 0.196,
+    }))
+    return map_yaml_file
+
+
+def test_tiles_reassemble_to_the_map(tmp_path, map_yaml_file):
+    report = tile_occupancy_map(map_yaml_file, tmp_path / 'tiles', tile_size_px=100)
+    # The unknown tile is not written.
+    assert (report.num_tiles, report.num_skipped_tiles) == (5, 1)
+
+    tiled_map = TiledOccupancyMap(tmp_path / 'tiles')
+    original = np.asarray(Image.open(tmp_path / 'map.png'))
+    image, origin = tiled_map.read_region()
+    assert origin == pytest.approx(ORIGIN)
+    assert image.shape == original.shape
+    np.testing.assert_array_equal(to_occupancy_values(image, tiled_map.map_parameters),
+                                  to_occupancy_values(original, tiled_map.map_parameters))
+    assert tiled_map.bounds == pytest.approx((-10.0, -5.0, 5.0, 5.0))
+
+
+def test_read_region_loads_overlapping_tiles(tmp_path, map_yaml_file):
+    tile_occupancy_map(map_yaml_file, tmp_path / 'tiles', tile_size_px=100)
+    tiled_map = TiledOccupancyMap(tmp_path / 'tiles', cache_size=1)
+    # A region within the bottom left tile, whose bottom half is occupied.
+    image, origin = tiled_map.read_region(-9.0, -4.0, -6.0, -1.0)
+    assert image.shape == (100, 100)
+    assert origin == pytest.approx(ORIGIN)
+    assert (image[50:, :50] == OCCUPIED).all()
+    assert (image[:, 50:] == FREE).all()
+    assert len(tiled_map._cache) == 1
@@ -0,0 +1,72 @@
+# SPDX-FileCopyrightText: NVIDIA CORPORATION & AFFILIATES
+# Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import pytest
+
+from isaac_ros_perceptor_python_utils.perceptor_configuration import (
+    PerceptorConfiguration,
+    parse_modules,
+    perceptor_configurations,
+    resolve_perceptor_configuration,
+)
+
+
+def test_parse_modules_matches_exactly():
+    assert parse_modules('driver, rectify,nvblox_people,') == (
+        'driver', 'rectify', 'nvblox_people')
+    assert parse_modules('') == ()
+    with pytest.raises(ValueError):
+        parse_modules('driver,nvblox_peoples')
+
+
+def test_nvblox_people_is_not_nvblox_substring():
+    configuration = PerceptorConfiguration.parse({
+        'front_stereo_camera': 'driver,nvblox_people',
+        'left_stereo_camera': 'driver,nvblox',
+    })
+    # nvblox_people implies nvblox, but nvblox does not imply nvblox_people.
+    assert configuration.get_cameras_with('nvblox') == [
+        'front_stereo_camera', 'left_stereo_camera']
+    assert configuration.get_cameras_with('nvblox_people') == ['front_stereo_camera']
+
+
+def test_disable_nvblox_removes_nvblox_people():
+    configuration = resolve_perceptor_configuration('front_people_configuration',
+                                                    disable_cuvslam=False,
+                                                    disable_nvblox=True,
+                                                    disable_vgl=False)
+    assert configuration.get_camera_config('front_stereo_camera') == 'driver,rectify,vgl,cuvslam'
+    assert not configuration.is_enabled('nvblox')
+    assert not configuration.is_enabled('nvblox_people')
+
+
+def test_disable_nvblox_and_vgl_removes_rectify():
+    configuration = resolve_perceptor_configuration('front_configuration', False, True, True)
+    assert configuration.get_camera_config('front_stereo_camera') == 'driver,cuvslam'
+    configuration = resolve_perceptor_configuration('front_driver_rectify', False, True, True)
+    assert configuration.get_camera_config('front_stereo_camera') == 'driver,rectify'
+
+
+@pytest.mark.parametrize('name', perceptor_configurations)
+def test_launch_value_round_trip(name):
+    configuration = resolve_perceptor_configuration(name, False, False, False)
+    assert PerceptorConfiguration.parse(configuration.to_launch_value()) == configuration
+
+
+def test_unknown_configuration():
+    with pytest.raises(ValueError):
+        resolve_perceptor_configuration('no_such_configuration', False, False, False)
@@ -0,0 +1,49 @@
+# SPDX-FileCopyrightText: NVIDIA CORPORATION & AFFILIATES
+# Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import sys
+
+from isaac_ros_perceptor_python_utils.pip_requirements import (
+    check_installed,
+    is_installed,
+    mark_installed,
+)
+
+
+def test_check_installed(tmp_path):
+    requirements_file = tmp_path / 'requirements.txt'
+    requirements_file.write_text('# Comment\npytest>=1.0  # Inline comment\n')
+    assert check_installed(requirements_file)
+    requirements_file.write_text('pytest<1.0\n')
+    assert check_installed(requirements_file) is False
+    requirements_file.write_text('not-an-installed-distribution\n')
+    assert check_installed(requirements_file) is False
+    requirements_file.write_text(f'pytest; python_version < "{sys.version_info.major}"\n')
+    assert check_installed(requirements_file)
+
+
+def test_inconclusive_requirements_use_the_stamp(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    requirements_file = tmp_path / 'requirements.txt'
+    requirements_file.write_text('-r other_requirements.txt\n')
+    assert check_installed(requirements_file) is None
+    assert not is_installed(requirements_file)
+    mark_installed(requirements_file)
+    assert is_installed(requirements_file)
+    # Changed requirements have to be installed again.
+    requirements_file.write_text('-r other_requirements.txt\nsome-package\n')
+    assert not is_installed(requirements_file)
@@ -0,0 +1,54 @@
+# SPDX-FileCopyrightText: NVIDIA CORPORATION & AFFILIATES
+# Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import numpy as np
+
+from isaac_ros_perceptor_python_utils.pose_store import PoseTable, compose, invert, rotate
+
+IDENTITY = np.array([0.0, 0.0, 0.0, 1.0])
+# 90 degrees around z.
+YAW_90 = np.array([0.0, 0.0, np.sqrt(0.5), np.sqrt(0.5)])
+
+
+def test_compose_and_invert():
+    position, orientation = compose(np.array([1.0, 0.0, 0.0]), YAW_90, np.array([1.0, 0.0, 0.0]),
+                                    IDENTITY)
+    np.testing.assert_allclose(position, [1.0, 1.0, 0.0], atol=1e-12)
+    np.testing.assert_allclose(orientation, YAW_90)
+    position, orientation = compose(position, orientation, *invert(position, orientation))
+    np.testing.assert_allclose(position, [0.0, 0.0, 0.0], atol=1e-12)
+    np.testing.assert_allclose(orientation, IDENTITY, atol=1e-12)
+
+
+def test_ros_axes_in_optical_frame():
+    # The ROS axes x forward, y left and z up are z, -x and -y of an optical frame.
+    orientation = np.array([0.5, -0.5, 0.5, 0.5])
+    np.testing.assert_allclose(rotate(orientation, np.eye(3)),
+                               [[0, 0, 1], [-1, 0, 0], [0, -1, 0]], atol=1e-12)
+
+
+def test_change_frame():
+    # A rig 1m in front of base_link drives 2m forward after turning left.
+    rig_poses = PoseTable(
+        np.array([0, 1], dtype=np.int64),
+        np.array([[0.0, 0.0, 0.0], [0.0, 2.0, 0.0]]),
+        np.array([IDENTITY, YAW_90]),
+    )
+    base_poses = rig_poses.change_frame(np.array([1.0, 0.0, 0.0]), IDENTITY)
+    np.testing.assert_allclose(base_poses.positions, [[0.0, 0.0, 0.0], [1.0, 1.0, 0.0]],
+                               atol=1e-12)
+    np.testing.assert_allclose(base_poses.orientations, rig_poses.orientations)
@@ -0,0 +1,85 @@
+# SPDX-FileCopyrightText: NVIDIA CORPORATION & AFFILIATES
+# Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import asyncio
+import signal
+import subprocess
+import time
+
+import pytest
+
+from isaac_ros_perceptor_python_utils import process_supervisor
+from isaac_ros_perceptor_python_utils.process_supervisor import ProcessSupervisor
+
+
+@pytest.fixture(autouse=True)
+def short_escalation_timeout(monkeypatch):
+    monkeypatch.setattr(process_supervisor, 'ESCALATION_TIMEOUT_S', 0.5)
+
+
+def test_run(tmp_path):
+
+    async def run():
+        async with ProcessSupervisor('none') as supervisor:
+            assert await supervisor.run('true', ['true'], tmp_path / 'true.log') == 0
+            assert await supervisor.run('false', ['false'], tmp_path / 'false.log',
+                                        allow_failure=True) == 1
+            with pytest.raises(subprocess.CalledProcessError):
+                await supervisor.run('false', ['false'], tmp_path / 'false.log')
+            process = await supervisor.start('echo', ['sh', '-c', 'echo ready; exec sleep 10'],
+                                             tmp_path / 'echo.log')
+            assert await process.wait_for_output('rea', timeout_s=5.0) == 'ready'
+
+    asyncio.run(run())
+    assert (tmp_path / 'echo.log').read_text() == 'ready\n'
+
+
+@pytest.mark.parametrize('ignored_signals, returncode', [
+    ('', -signal.SIGINT),
+    ('INT', -signal.SIGTERM),
+    ('INT TERM', -signal.SIGKILL),
+])
+def test_stop_escalates(tmp_path, ignored_signals, returncode):
+
+    async def stop():
+        async with ProcessSupervisor('none', shutdown_timeout_s=0.5) as supervisor:
+            process = await supervisor.start(
+                'sleep', ['sh', '-c', f'trap "" {ignored_signals}; echo ready; exec sleep 10'],
+                tmp_path / 'sleep.log')
+            await process.wait_for_output('ready', timeout_s=5.0)
+            stopped_cleanly = await supervisor.stop(process)
+        return process, stopped_cleanly
+
+    process, stopped_cleanly = asyncio.run(stop())
+    assert stopped_cleanly == (returncode == -signal.SIGINT)
+    assert process.process.returncode == returncode
+
+
+def test_shutdown_does_not_wait_the_shutdown_timeout(tmp_path):
+
+    async def cancel():
+        async with ProcessSupervisor('none', shutdown_timeout_s=60.0) as supervisor:
+            process = await supervisor.start(
+                'sleep', ['sh', '-c', 'trap "" INT; echo ready; exec sleep 60'],
+                tmp_path / 'sleep.log')
+            await process.wait_for_output('ready', timeout_s=5.0)
+        return process
+
+    start_time = time.monotonic()
+    process = asyncio.run(cancel())
+    assert process.process.returncode == -signal.SIGTERM
+    assert time.monotonic() - start_time < 10.0
@@ -0,0 +1,32 @@
+# SPDX-FileCopyrightText: NVIDIA CORPORATION & AFFILIATES
+# Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import subprocess
+
+from isaac_ros_perceptor_python_utils.resource_telemetry import ResourceMonitor
+
+
+def test_resource_monitor_measures_short_steps():
+    with ResourceMonitor(sample_period_s=60.0) as monitor:
+        process = subprocess.Popen(['sleep', '10'])
+    process.kill()
+    process.wait()
+    assert monitor.telemetry.status == 'finished'
+    assert monitor.telemetry.peak_rss_bytes > 0
+    assert monitor.telemetry.num_processes == 1
+    assert monitor.telemetry.peak_num_processes == 1
+    assert monitor.telemetry.wall_time_s < 60.0
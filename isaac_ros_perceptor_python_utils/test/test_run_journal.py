@@ -0,0 +1,71 @@
+# SPDX-FileCopyrightText: NVIDIA CORPORATION & AFFILIATES
+# Copyright (c) 2024 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+from isaac_ros_perceptor_python_utils.run_journal import (
+    find_incomplete_run,
+    JOURNAL_FILE_NAME,
+    RunJournal,
+)
+
+
+def test_partially_written_line_is_ignored(tmp_path):
+    journal = RunJournal(tmp_path / JOURNAL_FILE_NAME)
+    journal.append('run_started', sensor_data_bag='bag')
+    with open(journal.journal_file, 'a') as file:
+        file.write('{"event": "step_sta')
+    journal.append('step_started', step='a')
+    assert [e['event'] for e in journal.read()] == ['run_started', 'step_started']
+
+
+def test_resumable_events(tmp_path):
+    journal = RunJournal(tmp_path / JOURNAL_FILE_NAME)
+    journal.append('step_started', step='occupancy', fingerprint='1')
+    journal.append('checkpoint', step='occupancy', stamp=1)
+    # The process was interrupted and the step restarted with the same fingerprint.
+    journal.append('step_started', step='occupancy', fingerprint='1')
+    journal.append('checkpoint', step='occupancy', stamp=2)
+    journal.append('checkpoint', step='other', stamp=3)
+    assert [e['stamp'] for e in journal.get_resumable_events('occupancy', 'checkpoint')] == [1, 2]
+
+    journal.append('step_started', step='occupancy', fingerprint='2')
+    assert journal.get_resumable_events('occupancy', 'checkpoint') == []
+    journal.append('checkpoint', step='occupancy', stamp=4)
+    journal.append('step_finished', step='occupancy')
+    assert journal.get_resumable_events('occupancy', 'checkpoint') == []
+
+
+def test_find_incomplete_run(tmp_path):
+    bag = tmp_path / 'bag'
+    bag.mkdir()
+
+    def add_run(name, sensor_data_bag, complete):
+        folder = tmp_path / 'maps' / name
+        folder.mkdir(parents=True)
+        journal = RunJournal(folder / JOURNAL_FILE_NAME)
+        journal.append('run_started', sensor_data_bag=str(sensor_data_bag))
+        if complete:
+            journal.append('run_finished')
+        return folder
+
+    assert find_incomplete_run(tmp_path / 'maps', 'bag', bag) is None
+    add_run('2026-01-01_bag', bag, complete=False)
+    latest = add_run('2026-01-02_bag', bag, complete=False)
+    add_run('2026-01-03_bag', tmp_path / 'other' / 'bag', complete=False)
+    assert find_incomplete_run(tmp_path / 'maps', 'bag', bag) == latest
+    # Only the latest run of a bag can be resumed.
+    add_run('2026-01-04_bag', bag, complete=True)
+    assert find_incomplete_run(tmp_path / 'maps', 'bag', bag) is None